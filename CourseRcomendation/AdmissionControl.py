@@ -0,0 +1,186 @@
+"""Admission control and load shedding for the recommender apps.
+
+``AdmissionMiddleware`` wraps a WSGI app and limits how many requests of each
+configured route run at once. A request that finds its route full waits in a
+bounded FIFO queue for up to ``queue_timeout`` seconds; when the queue itself
+is full it is rejected immediately with 429, and when the wait runs out it gets
+503. Both carry a ``Retry-After`` estimated from the route's recent service
+time. Routes marked ``priority`` (cheap, cached lookups) draw on a reserve of
+global slots that ordinary routes cannot use and are dispatched first, so a
+spike of /suggest calls does not starve autocomplete.
+
+Queue depths and counters are served as JSON on ``metrics_path``:
+
+    app.wsgi_app = AdmissionMiddleware(app.wsgi_app, {
+        '/suggest': RouteLimit(max_in_flight=8, max_queue=32, queue_timeout=2.0),
+        '/skills/autocomplete': RouteLimit(16, 64, 0.2, priority=True),
+    })
+"""
+import collections
+import json
+import math
+import threading
+import time
+
+METRICS_PATH = '/admission/metrics'
+# Weight of the newest sample in the per-route service time average
+SERVICE_TIME_ALPHA = 0.2
+
+
+class RouteLimit:
+    def __init__(self, max_in_flight, max_queue=0, queue_timeout=1.0, priority=False):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.priority = priority
+
+
+class _Route:
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters = collections.deque()
+        self.service_time = 0.0
+        self.stats = {'admitted': 0, 'queued': 0, 'rejected': 0, 'timed_out': 0}
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, limits, max_in_flight=32, priority_reserve=8, metrics_path=METRICS_PATH):
+        self.app = app
+        self.routes = {path: _Route(path, limit) for path, limit in limits.items()}
+        # Priority routes are dispatched before ordinary ones when slots free up
+        self.dispatch_order = sorted(self.routes.values(), key=lambda route: not route.limit.priority)
+        self.max_in_flight = max_in_flight
+        self.priority_reserve = priority_reserve
+        self.metrics_path = metrics_path
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def route_for(self, path):
+        """The configured route for path: an exact match, else the longest '/'-terminated prefix."""
+        if path in self.routes:
+            return self.routes[path]
+        prefixes = [name for name in self.routes if name.endswith('/') and path.startswith(name)]
+        return self.routes[max(prefixes, key=len)] if prefixes else None
+
+    def _has_room(self, route):
+        global_limit = self.max_in_flight if route.limit.priority else self.max_in_flight - self.priority_reserve
+        return route.in_flight < route.limit.max_in_flight and self.in_flight < global_limit
+
+    def _take(self, route):
+        route.in_flight += 1
+        self.in_flight += 1
+        route.stats['admitted'] += 1
+
+    def _dispatch(self):
+        # Hand freed slots straight to the oldest waiters so nobody can jump the queue
+        for route in self.dispatch_order:
+            while route.waiters and self._has_room(route):
+                self._take(route)
+                route.waiters.popleft().set()
+
+    def acquire(self, route):
+        """Wait for a slot on route; returns None when admitted, else the HTTP status to reject with."""
+        with self.lock:
+            if not route.waiters and self._has_room(route):
+                self._take(route)
+                return None
+            if len(route.waiters) >= route.limit.max_queue:
+                route.stats['rejected'] += 1
+                return 429
+            waiter = threading.Event()
+            route.waiters.append(waiter)
+            route.stats['queued'] += 1
+        waiter.wait(route.limit.queue_timeout)
+        with self.lock:
+            # The slot may have been handed over between the timeout and taking the lock
+            if waiter.is_set():
+                return None
+            route.waiters.remove(waiter)
+            route.stats['timed_out'] += 1
+            return 503
+
+    def release(self, route, started):
+        with self.lock:
+            route.in_flight -= 1
+            self.in_flight -= 1
+            elapsed = time.monotonic() - started
+            if route.stats['admitted'] == 1:
+                route.service_time = elapsed
+            else:
+                route.service_time += SERVICE_TIME_ALPHA * (elapsed - route.service_time)
+            self._dispatch()
+
+    def retry_after(self, route):
+        """Seconds until the current backlog of route should have drained, at least 1."""
+        backlog = len(route.waiters) + route.in_flight
+        return max(1, math.ceil(route.service_time * backlog / route.limit.max_in_flight))
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "priority_reserve": self.priority_reserve,
+                "routes": {route.name: dict(
+                    route.stats,
+                    in_flight=route.in_flight,
+                    queue_depth=len(route.waiters),
+                    max_in_flight=route.limit.max_in_flight,
+                    max_queue=route.limit.max_queue,
+                    priority=route.limit.priority,
+                    service_time_ms=round(route.service_time * 1000, 3),
+                ) for route in self.routes.values()},
+            }
+
+    def _json_response(self, start_response, status, payload, headers=()):
+        body = json.dumps(payload).encode('utf-8')
+        start_response(status, [('Content-Type', 'application/json'),
+                                ('Content-Length', str(len(body)))] + list(headers))
+        return [body]
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == self.metrics_path:
+            return self._json_response(start_response, '200 OK', self.metrics())
+        route = self.route_for(path)
+        if route is None:
+            return self.app(environ, start_response)
+
+        rejected = self.acquire(route)
+        if rejected is not None:
+            retry_after = self.retry_after(route)
+            status = '429 Too Many Requests' if rejected == 429 else '503 Service Unavailable'
+            return self._json_response(start_response, status, {
+                "error": "server busy, retry later",
+                "retry_after": retry_after,
+            }, [('Retry-After', str(retry_after))])
+
+        started = time.monotonic()
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self.release(route, started)
+            raise
+        # Streaming responses keep their slot until the server closes the iterable
+        return _ReleasingIterable(result, lambda: self.release(route, started))
+
+
+class _ReleasingIterable:
+    def __init__(self, iterable, release):
+        self.iterable = iterable
+        self.release = release
+        self.released = False
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def close(self):
+        try:
+            if hasattr(self.iterable, 'close'):
+                self.iterable.close()
+        finally:
+            if not self.released:
+                self.released = True
+                self.release()
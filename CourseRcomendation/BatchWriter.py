@@ -0,0 +1,158 @@
+"""Background batched writer for analytics and request logs.
+
+Request handlers call ``submit(sql, params)``, which only puts the row on a
+bounded queue. A single writer thread coalesces queued rows into one
+transaction every ``flush_interval_ms`` or ``max_batch`` rows, grouping rows of
+the same statement into one ``executemany``. When the queue is full the
+configured policy applies:
+
+* ``block``: wait up to ``block_timeout`` seconds for room, then drop
+* ``drop_newest``: discard the row being submitted
+* ``drop_oldest``: discard the oldest queued row to make room
+
+If a batch fails because of a bad row (a constraint violation, wrong
+parameters), its rows are retried one at a time so only the bad rows are
+lost. The writer switches the database to WAL mode so its commits do not
+block readers of the same file.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+DROP_POLICIES = ('block', 'drop_newest', 'drop_oldest')
+_STOP = object()
+
+
+class BatchWriter:
+    def __init__(self, database, flush_interval_ms=200, max_batch=5000, max_queue=100000,
+                 policy='drop_newest', block_timeout=0.05):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"policy must be one of {DROP_POLICIES}")
+        self.database = database
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats_lock = threading.Lock()
+        self.stats = {'submitted': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="BatchWriter", daemon=True)
+        self.thread.start()
+
+    def _count(self, key, n=1):
+        with self.stats_lock:
+            self.stats[key] += n
+
+    def submit(self, sql, params=()):
+        """Queue one row for writing; returns False if it was dropped."""
+        if self.closed:
+            self._count('dropped')
+            return False
+        item = (sql, params)
+        self._count('submitted')
+        try:
+            if self.policy == 'block':
+                self.queue.put(item, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        if self.policy == 'drop_oldest':
+            try:
+                self.queue.get_nowait()
+                self._count('dropped')
+                self.queue.put_nowait(item)
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+        self._count('dropped')
+        return False
+
+    def _run(self):
+        conn = sqlite3.connect(self.database)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        # Persistent for the file: readers no longer wait for log commits, nor the writer for them
+        conn.execute("PRAGMA journal_mode = WAL")
+        stopping = False
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    # Drain whatever was queued before close()
+                    while True:
+                        try:
+                            batch.append(self.queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    batch = [entry for entry in batch if entry is not _STOP]
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(conn, batch)
+        conn.close()
+
+    def _write(self, conn, batch):
+        statements = {}
+        for sql, params in batch:
+            statements.setdefault(sql, []).append(params)
+        try:
+            with conn:
+                for sql, rows in statements.items():
+                    conn.executemany(sql, rows)
+            self._count('written', len(batch))
+            self._count('batches')
+        except sqlite3.OperationalError as e:
+            # The database itself is unavailable (locked, disk full); retrying row by row would not help
+            self._count('failed', len(batch))
+            print(f"BatchWriter: dropped batch of {len(batch)} rows: {e}")
+        except sqlite3.Error:
+            self._write_rows(conn, batch)
+
+    def _write_rows(self, conn, batch):
+        """Write batch one row at a time in a single transaction, skipping the rows that fail."""
+        written = 0
+        try:
+            conn.execute("BEGIN")
+            for sql, params in batch:
+                conn.execute("SAVEPOINT row")
+                try:
+                    conn.execute(sql, params)
+                    written += 1
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO row")
+                    print(f"BatchWriter: dropped row: {e}")
+                conn.execute("RELEASE row")
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            written = 0
+            print(f"BatchWriter: dropped batch of {len(batch)} rows: {e}")
+        self._count('written', written)
+        self._count('failed', len(batch) - written)
+        self._count('batches')
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def close(self, timeout=10):
+        """Stop accepting rows, flush everything queued and wait for the writer."""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
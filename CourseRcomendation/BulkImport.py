@@ -0,0 +1,421 @@
+"""Streaming bulk import of catalog data into course_recommendations.db.
+
+Reads CSV, JSONL or Parquet files of courses, learning resources or
+professionals, validates and normalizes each record on the fly and upserts
+them in large batches. Progress is checkpointed with every committed batch, so
+re-running the same command after an interruption resumes where it stopped.
+Invalid records, including JSONL lines that are not a JSON object, are
+rejected and reported with their line number. CareerPath's ``init_db`` keeps
+imported courses; it only upserts its core courses by url.
+
+    python BulkImport.py courses new_courses.csv
+    python BulkImport.py professionals people.parquet --batch-size 100000
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sqlite3
+import time
+
+from DataGenerator import split_skills
+
+DATABASE = 'course_recommendations.db'
+BATCH_SIZE = 50000
+# Loads bigger than this drop secondary indexes first and rebuild them at the end
+LARGE_LOAD_BYTES = 100 * 1024 * 1024
+MAX_REPORTED_ERRORS = 10
+
+DIFFICULTIES = {
+    'beginner': 'Beginner',
+    'intermediate': 'Intermediate',
+    'advanced': 'Advanced',
+    'all levels': 'All Levels',
+    'beginner-intermediate': 'Beginner-Intermediate',
+}
+
+
+def text(value):
+    value = str(value).strip()
+    if not value:
+        raise ValueError("empty value")
+    return value
+
+
+def skill_name(value):
+    return text(value).lower()
+
+
+def skill_list(value):
+    if isinstance(value, (list, tuple)):
+        value = ",".join(str(v) for v in value)
+    skills = list(dict.fromkeys(split_skills(str(value))))
+    if not skills:
+        raise ValueError("no skills")
+    return ",".join(skills)
+
+
+def url(value):
+    value = text(value)
+    if not value.startswith(("http://", "https://")):
+        raise ValueError(f"not an http(s) url: {value!r}")
+    return value
+
+
+def difficulty(value):
+    value = text(value)
+    return DIFFICULTIES.get(value.lower(), value.title())
+
+
+def rating(value):
+    value = float(value)
+    if not 0 <= value <= 5:
+        raise ValueError(f"rating out of range: {value}")
+    return round(value, 2)
+
+
+def integer(value):
+    return int(float(value))
+
+
+def boolean(value):
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('1', 'true', 'yes', 'y'):
+            return 1
+        if value in ('0', 'false', 'no', 'n'):
+            return 0
+        raise ValueError(f"not a boolean: {value!r}")
+    return 1 if value else 0
+
+
+# column -> (normalizer, required); "key" is the natural key used for upserts
+TABLES = {
+    'courses': {
+        'key': ('url',),
+        'columns': {
+            'name': (text, True),
+            'skill': (skill_name, True),
+            'specialization': (text, True),
+            'platform': (text, True),
+            'url': (url, True),
+            'difficulty': (difficulty, True),
+            'instructor': (text, True),
+            'duration': (text, True),
+            'description': (text, True),
+            'rating': (rating, True),
+        },
+        'ddl': '''
+            CREATE TABLE IF NOT EXISTS courses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                skill TEXT NOT NULL,
+                specialization TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                url TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                instructor TEXT NOT NULL,
+                duration TEXT NOT NULL,
+                description TEXT NOT NULL,
+                rating REAL NOT NULL
+            )''',
+    },
+    'learning_resources': {
+        'key': ('skill', 'url'),
+        'columns': {
+            'skill': (skill_name, True),
+            'title': (text, True),
+            'type': (text, True),
+            'platform': (text, True),
+            'url': (url, True),
+            'duration': (text, False),
+            'difficulty': (difficulty, False),
+            'rating': (rating, False),
+            'description': (text, False),
+            'instructor': (text, False),
+            'is_free': (boolean, False),
+            'language': (text, False),
+            'subtitles': (boolean, False),
+            'topics': (text, False),
+        },
+        'ddl': '''
+            CREATE TABLE IF NOT EXISTS learning_resources (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                skill TEXT NOT NULL,
+                title TEXT NOT NULL,
+                type TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                url TEXT NOT NULL,
+                duration TEXT,
+                difficulty TEXT,
+                rating FLOAT,
+                description TEXT,
+                instructor TEXT,
+                is_free BOOLEAN,
+                language TEXT,
+                subtitles BOOLEAN,
+                topics TEXT
+            )''',
+    },
+    'professionals': {
+        'key': ('name', 'company'),
+        'columns': {
+            'name': (text, True),
+            'skills': (skill_list, True),
+            'specialization': (text, True),
+            'experience_years': (integer, False),
+            'company': (text, True),
+            'role': (text, False),
+            'achievements': (text, False),
+            'certifications': (text, False),
+        },
+        'ddl': '''
+            CREATE TABLE IF NOT EXISTS professionals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                skills TEXT NOT NULL,
+                specialization TEXT NOT NULL,
+                experience_years INTEGER,
+                company TEXT,
+                role TEXT,
+                achievements TEXT,
+                certifications TEXT
+            )''',
+    },
+}
+
+
+class InvalidRecord:
+    """Placeholder yielded for an input line that could not be parsed into a record."""
+    def __init__(self, reason):
+        self.reason = reason
+
+
+def normalize(spec, record):
+    """Return the row tuple for a raw record, raising ValueError if it is invalid."""
+    if isinstance(record, InvalidRecord):
+        raise ValueError(record.reason)
+    row = []
+    for column, (normalizer, required) in spec['columns'].items():
+        value = record.get(column)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if required:
+                raise ValueError(f"missing required field {column!r}")
+            row.append(None)
+            continue
+        try:
+            row.append(normalizer(value))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{column}: {e}")
+    return tuple(row)
+
+
+def read_records(path, fmt=None):
+    """Stream records from a CSV, JSONL or Parquet file as dicts."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    elif fmt in ('jsonl', 'ndjson'):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                # Bad lines still yield a record, so they are rejected and counted for resuming
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield InvalidRecord(f"line {line_number}: invalid JSON: {e}")
+                    continue
+                if isinstance(record, dict):
+                    yield record
+                else:
+                    yield InvalidRecord(f"line {line_number}: expected a JSON object, got {type(record).__name__}")
+    elif fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet import requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE):
+            yield from batch.to_pylist()
+    else:
+        raise SystemExit(f"Unsupported input format: {fmt!r} (expected csv, jsonl or parquet)")
+
+
+def ensure_upsert_key(conn, table, spec, dedupe=False):
+    """Create the unique index the upsert conflicts on, optionally removing duplicates first."""
+    key = ", ".join(spec['key'])
+    index = f"ux_{table}_{'_'.join(spec['key'])}"
+    try:
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {table} ({key})")
+    except sqlite3.IntegrityError:
+        if not dedupe:
+            raise SystemExit(f"{table} already contains rows with duplicate ({key}); "
+                             f"re-run with --dedupe to keep only the oldest of each")
+        conn.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {key})")
+        conn.execute(f"CREATE UNIQUE INDEX {index} ON {table} ({key})")
+    return index
+
+
+def secondary_objects(conn, table, keep):
+    """Indexes and FTS sync triggers on table as (type, name, sql), plus the FTS tables fed from it."""
+    objects = [list(row) for row in conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL AND name != ?
+    """, (table, keep))]
+    fts_tables = [name for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND sql LIKE '%USING fts%'"
+    ) if f"content='{table}'" in sql.replace('"', "'").replace(' ', '')]
+    for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+                                  (table,)):
+        if any(fts in sql for fts in fts_tables):
+            objects.append(['trigger', name, sql])
+    return objects, fts_tables
+
+
+def drop_secondary_objects(conn, objects):
+    for kind, name, _ in objects:
+        conn.execute(f"DROP {kind} IF EXISTS {name}")
+
+
+def rebuild_secondary_objects(conn, saved):
+    start = time.perf_counter()
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master")}
+    for _, name, sql in saved['objects']:
+        if name not in existing:
+            conn.execute(sql)
+    for fts in saved['fts']:
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    print(f"Rebuilt {len(saved['objects'])} indexes/triggers and {len(saved['fts'])} FTS tables "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def init_progress(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS import_progress (
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            file_mtime REAL NOT NULL,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            dropped_objects TEXT,
+            finished INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, target)
+        )
+    ''')
+
+
+def import_file(path, table, database=DATABASE, fmt=None, batch_size=BATCH_SIZE,
+                drop_indexes='auto', dedupe=False, restart=False):
+    """Stream path into table, resuming from the last committed batch if possible."""
+    spec = TABLES[table]
+    source = os.path.abspath(path)
+    stat = os.stat(source)
+
+    conn = sqlite3.connect(database, isolation_level=None)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(spec['ddl'])
+    init_progress(conn)
+    key_index = ensure_upsert_key(conn, table, spec, dedupe)
+
+    progress = conn.execute("""
+        SELECT file_size, file_mtime, rows_done, dropped_objects, finished
+        FROM import_progress WHERE source = ? AND target = ?
+    """, (source, table)).fetchone()
+    rows_done, saved = 0, None
+    if progress:
+        saved = json.loads(progress[3]) if progress[3] else None
+        if restart or progress[4] or (progress[0], progress[1]) != (stat.st_size, stat.st_mtime):
+            if not progress[4] and not restart:
+                print(f"{path} changed since the interrupted import; starting over")
+        else:
+            rows_done = progress[2]
+            print(f"Resuming {path} after {rows_done} rows")
+    conn.execute("""
+        INSERT INTO import_progress (source, target, file_size, file_mtime, rows_done, dropped_objects)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (source, target) DO UPDATE SET
+            file_size = excluded.file_size, file_mtime = excluded.file_mtime, rows_done = excluded.rows_done,
+            finished = 0, updated_at = CURRENT_TIMESTAMP
+    """, (source, table, stat.st_size, stat.st_mtime, rows_done, json.dumps(saved) if saved else None))
+
+    large = drop_indexes == 'always' or (drop_indexes == 'auto' and stat.st_size > LARGE_LOAD_BYTES)
+    if large and saved is None:
+        objects, fts_tables = secondary_objects(conn, table, key_index)
+        saved = {'objects': objects, 'fts': fts_tables}
+        conn.execute("BEGIN")
+        drop_secondary_objects(conn, objects)
+        conn.execute("UPDATE import_progress SET dropped_objects = ? WHERE source = ? AND target = ?",
+                     (json.dumps(saved), source, table))
+        conn.execute("COMMIT")
+        print(f"Dropped {len(objects)} secondary indexes/triggers on {table} for the load")
+
+    columns = list(spec['columns'])
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in spec['key'])
+    upsert = f"""
+        INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})
+        ON CONFLICT ({", ".join(spec['key'])}) DO UPDATE SET {updates}
+    """
+
+    records = itertools.islice(read_records(path, fmt), rows_done, None)
+    start = time.perf_counter()
+    loaded = rejected = 0
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            break
+        rows = []
+        for offset, record in enumerate(batch, rows_done + 1):
+            try:
+                rows.append(normalize(spec, record))
+            except ValueError as e:
+                rejected += 1
+                if rejected <= MAX_REPORTED_ERRORS:
+                    print(f"Rejected record {offset}: {e}")
+        conn.execute("BEGIN")
+        conn.executemany(upsert, rows)
+        rows_done += len(batch)
+        conn.execute("""
+            UPDATE import_progress SET rows_done = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE source = ? AND target = ?
+        """, (rows_done, source, table))
+        conn.execute("COMMIT")
+        loaded += len(rows)
+        elapsed = time.perf_counter() - start
+        print(f"{rows_done} records processed, {loaded} upserted, {rejected} rejected "
+              f"({loaded / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    if saved:
+        rebuild_secondary_objects(conn, saved)
+    conn.execute("""
+        UPDATE import_progress SET finished = 1, dropped_objects = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE source = ? AND target = ?
+    """, (source, table))
+    conn.close()
+    print(f"Imported {loaded} {table} rows from {path} ({rejected} rejected)")
+    return loaded, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import catalog data into the course database")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", help="CSV, JSONL or Parquet file to import")
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--format", choices=['csv', 'jsonl', 'parquet'], help="override format detection")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--drop-indexes", choices=['auto', 'always', 'never'], default='auto',
+                        help="drop and rebuild secondary/FTS indexes around the load (auto: files over 100 MB)")
+    parser.add_argument("--dedupe", action="store_true", help="remove existing duplicate rows before upserting")
+    parser.add_argument("--restart", action="store_true", help="ignore a previous interrupted import")
+    args = parser.parse_args()
+
+    import_file(args.path, args.table, args.db, args.format, args.batch_size,
+                args.drop_indexes, args.dedupe, args.restart)
+
+
+if __name__ == '__main__':
+    main()
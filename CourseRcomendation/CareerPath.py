@@ -1,8 +1,160 @@
+import atexit
+import json
+import os
 import sqlite3
-from flask import Flask, request, jsonify, render_template_string
+import threading
+import time
+from flask import Flask, Response, g, request, render_template_string
+
+import QueryAudit
+import RowTypes
+from RowTypes import ProfessionalRow, ProfileComparison
+from SkillIndex import SkillIndex, TOP_PER_NODE
+import ProfessionalLSH
+import CourseEvents
+from BatchWriter import BatchWriter
+import SpecializationStats
+from AdmissionControl import AdmissionMiddleware, RouteLimit
+from ShardedStore import ShardedStore
+import CourseRanker
+import CatalogSnapshot
+import UserRecommendations
 
 app = Flask(__name__)
 DATABASE = 'course_recommendations.db'
+# Set QUERY_AUDIT=<path> to record the query plan of every statement the app runs
+QUERY_AUDIT_LOG = os.environ.get('QUERY_AUDIT')
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Set PROFESSIONAL_SHARDS=<dir> (built by `ShardedStore.py split`) to read professionals from shards
+PROFESSIONAL_SHARDS = os.environ.get('PROFESSIONAL_SHARDS')
+# Set CATALOG_SNAPSHOT=<path> (kept fresh by `CatalogSnapshot.py watch`) to load the skill index and
+# course ranker from the snapshot instead of SQLite while it is current
+CATALOG_SNAPSHOT = os.environ.get('CATALOG_SNAPSHOT')
+
+def get_connection():
+    """Open the app database, auditing query plans when QUERY_AUDIT is set."""
+    if QUERY_AUDIT_LOG:
+        return sqlite3.connect(DATABASE, factory=QueryAudit.AuditingConnection)
+    return sqlite3.connect(DATABASE)
+
+if QUERY_AUDIT_LOG:
+    atexit.register(QueryAudit.QUERY_LOG.save, QUERY_AUDIT_LOG)
+
+_snapshot_handle = None
+_snapshot_handle_lock = threading.Lock()
+
+def current_snapshot():
+    """The catalog snapshot if CATALOG_SNAPSHOT is set and the snapshot is current, else None."""
+    global _snapshot_handle
+    if not CATALOG_SNAPSHOT:
+        return None
+    try:
+        if _snapshot_handle is None:
+            with _snapshot_handle_lock:
+                if _snapshot_handle is None:
+                    _snapshot_handle = CatalogSnapshot.SnapshotHandle(CATALOG_SNAPSHOT)
+        snapshot = _snapshot_handle.current()
+    except (OSError, ValueError):
+        # Missing or in an older format: callers build from SQLite
+        return None
+    return snapshot if CatalogSnapshot.is_current(snapshot, DATABASE) else None
+
+_skill_index = None
+_skill_index_lock = threading.Lock()
+
+def get_skill_index():
+    """Skill trie/trigram index shared by /skills/autocomplete and /suggest."""
+    global _skill_index
+    if _skill_index is None:
+        with _skill_index_lock:
+            if _skill_index is None:
+                snapshot = current_snapshot()
+                _skill_index = SkillIndex.from_snapshot(snapshot) if snapshot is not None \
+                    else SkillIndex.from_database(DATABASE)
+    return _skill_index
+
+def reset_skill_index():
+    global _skill_index
+    _skill_index = None
+
+_course_ranker = None
+_course_ranker_loaded = 0
+_course_ranker_lock = threading.Lock()
+# Reload the ranking features periodically so popularity follows the event log
+COURSE_RANKER_MAX_AGE = 300
+
+def get_course_ranker():
+    """Catalog feature matrix shared by every /suggest request."""
+    global _course_ranker, _course_ranker_loaded
+    if _course_ranker is None or time.monotonic() - _course_ranker_loaded > COURSE_RANKER_MAX_AGE:
+        with _course_ranker_lock:
+            if _course_ranker is None or time.monotonic() - _course_ranker_loaded > COURSE_RANKER_MAX_AGE:
+                snapshot = current_snapshot()
+                _course_ranker = CourseRanker.CourseRanker.from_snapshot(snapshot) if snapshot is not None \
+                    else CourseRanker.CourseRanker.from_database(DATABASE)
+                _course_ranker_loaded = time.monotonic()
+    return _course_ranker
+
+def reset_course_ranker():
+    global _course_ranker
+    _course_ranker = None
+
+_shard_store = None
+_shard_store_lock = threading.Lock()
+
+def get_shard_store():
+    """The sharded professionals store, or None when PROFESSIONAL_SHARDS is unset."""
+    global _shard_store
+    if PROFESSIONAL_SHARDS and _shard_store is None:
+        with _shard_store_lock:
+            if _shard_store is None:
+                _shard_store = ShardedStore(PROFESSIONAL_SHARDS)
+    return _shard_store
+
+def professionals_connection(conn, specialization):
+    """Connection holding the specialization's professionals: its shard, else conn itself."""
+    store = get_shard_store()
+    shard_conn = store.connection_for(specialization) if store is not None else None
+    return shard_conn or conn
+
+def find_similar_professionals(conn, user_skills):
+    store = get_shard_store()
+    if store is not None:
+        return store.similar_professionals(user_skills)
+    return ProfessionalLSH.similar_professionals(conn, user_skills)
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+def get_log_writer():
+    """Background writer for request logs and course events; never blocks a request."""
+    global _log_writer
+    if _log_writer is None:
+        with _log_writer_lock:
+            if _log_writer is None:
+                _log_writer = BatchWriter(DATABASE, flush_interval_ms=200, max_batch=5000,
+                                          max_queue=100000, policy='drop_newest')
+                atexit.register(_log_writer.close)
+    return _log_writer
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def log_request(response):
+    start = g.get('request_start')
+    if start is not None:
+        payload = request.get_json(silent=True) if request.is_json else None
+        get_log_writer().submit(
+            "INSERT INTO request_log (path, method, status, latency_ms, specialization, skills) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (request.path, request.method, response.status_code,
+             round((time.perf_counter() - start) * 1000, 3),
+             payload.get("specialization") if isinstance(payload, dict) else None,
+             payload.get("skills") if isinstance(payload, dict) else None)
+        )
+    return response
 
 # Add these routes at the top of the file, after the app initialization
 @app.route('/')
@@ -1018,6 +1170,9 @@ HTML_TEMPLATE = '''
                         </a>
                     `;
                     courses.appendChild(courseDiv);
+                    trackCourseEvent('view', course.url);
+                    courseDiv.querySelector('.course-link')
+                        .addEventListener('click', () => trackCourseEvent('click', course.url));
                 });
             })
             .catch(error => console.error('Error:', error));
@@ -1144,61 +1299,42 @@ HTML_TEMPLATE = '''
             `;
         }
 
-        function displayCourses(courses) {
-            const courseContainer = document.getElementById('courseContainer');
-            courseContainer.innerHTML = ''; // Clear previous results
-            
-            // Add section header for paid courses
-            if (courses.paid_courses && courses.paid_courses.length > 0) {
-                const paidHeader = document.createElement('h3');
-                paidHeader.textContent = 'Premium Courses';
-                paidHeader.className = 'section-header';
-                courseContainer.appendChild(paidHeader);
-                
-                // Display paid courses
-                courses.paid_courses.forEach(course => {
-                    const courseCard = createCourseCard(course, true);
-                    courseContainer.appendChild(courseCard);
-                });
+        // Anonymous per-browser id so course events can be grouped by user
+        function getUserKey() {
+            let key = localStorage.getItem('advisorUserKey');
+            if (!key) {
+                key = Date.now().toString(36) + Math.random().toString(36).slice(2);
+                localStorage.setItem('advisorUserKey', key);
             }
-            
-            // Add section header for free courses
-            if (courses.free_courses && courses.free_courses.length > 0) {
-                const freeHeader = document.createElement('h3');
-                freeHeader.textContent = 'Free Learning Resources';
-                freeHeader.className = 'section-header';
-                courseContainer.appendChild(freeHeader);
-                
-                // Display free courses
-                courses.free_courses.forEach(course => {
-                    const courseCard = createCourseCard(course, false);
-                    courseContainer.appendChild(courseCard);
-                });
+            return key;
+        }
+
+        // Events are batched and sent with sendBeacon so tracking never blocks rendering
+        let pendingEvents = [];
+        let eventFlushTimer = null;
+
+        function flushCourseEvents() {
+            eventFlushTimer = null;
+            if (pendingEvents.length === 0) return;
+            const payload = JSON.stringify({user: getUserKey(), events: pendingEvents});
+            pendingEvents = [];
+            const blob = new Blob([payload], {type: 'application/json'});
+            if (!navigator.sendBeacon || !navigator.sendBeacon('/events', blob)) {
+                fetch('/events', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                                  body: payload, keepalive: true});
             }
         }
 
-        function createCourseCard(course, isPaid) {
-            const card = document.createElement('div');
-            card.className = 'course-card';
-            
-            const title = course.name || course.title;
-            const rating = course.rating ? `${course.rating}/5` : 'Not rated';
-            
-            card.innerHTML = `
-                <h3>${title}</h3>
-                <p><strong>Instructor:</strong> ${course.instructor}</p>
-                <p><strong>Platform:</strong> ${course.platform}</p>
-                <p><strong>Duration:</strong> ${course.duration}</p>
-                <p><strong>Rating:</strong> ${rating}</p>
-                ${isPaid ? `<p><strong>Price:</strong> $${course.price}</p>` : 
-                           `<p><strong>Skill Level:</strong> ${course.skill_level}</p>
-                            <p><a href="${course.url}" target="_blank" class="course-link">Access Course</a></p>`}
-                <p class="course-description">${course.description}</p>
-            `;
-            
-            return card;
+        function trackCourseEvent(event, url) {
+            if (!url) return;
+            pendingEvents.push({event: event, url: url});
+            if (!eventFlushTimer) {
+                eventFlushTimer = setTimeout(flushCourseEvents, 2000);
+            }
         }
 
+        window.addEventListener('pagehide', flushCourseEvents);
+
         function renderLearningResources(resources) {
             const container = document.getElementById('resources-container');
             container.innerHTML = resources.map(resource => `
@@ -1390,7 +1526,7 @@ HTML_TEMPLATE = '''
 
 def init_db():
     """Initialize database with enhanced profiles and courses."""
-    conn = sqlite3.connect(DATABASE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Create tables with proper schema
@@ -1490,11 +1626,8 @@ def init_db():
     cursor.execute("SELECT COUNT(*) FROM users")
     print(f"Inserted {cursor.fetchone()[0]} professionals")
     
-    # Create and populate courses table
-    cursor.execute('''
-    DROP TABLE IF EXISTS courses
-    ''')
-    
+    # Create the courses table and upsert the core courses; rows added with
+    # BulkImport.py are kept across restarts
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS courses (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -1569,92 +1702,260 @@ def init_db():
          "Advanced statistical methods for data science", 4.9)
     ]
     
+    # Same unique key BulkImport.py upserts on
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_courses_url ON courses (url)")
+    except sqlite3.IntegrityError:
+        cursor.execute("DELETE FROM courses WHERE id NOT IN (SELECT MIN(id) FROM courses GROUP BY url)")
+        cursor.execute("CREATE UNIQUE INDEX ux_courses_url ON courses (url)")
     cursor.executemany("""
         INSERT INTO courses (
             name, skill, specialization, platform, url, difficulty, 
             instructor, duration, description, rating
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (url) DO UPDATE SET
+            name = excluded.name, skill = excluded.skill, specialization = excluded.specialization,
+            platform = excluded.platform, difficulty = excluded.difficulty, instructor = excluded.instructor,
+            duration = excluded.duration, description = excluded.description, rating = excluded.rating
     """, core_courses)
     
-    conn.commit()
-    conn.close()
-
-@app.route("/suggest", methods=["POST"])
-def suggest():
-    """Provide skill suggestions and profile comparisons."""
-    data = request.get_json()
-    user_skills = set(skill.strip().lower() for skill in data.get("skills", "").split(","))
-    specialization = data.get("specialization")
-
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
+    # Indexes backing the /suggest lookups so they are searches, not full scans
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_specialization ON users (specialization)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_courses_specialization_rating ON courses (specialization, rating DESC)"
+    )
     
-    # Debug: Print the specialization being queried
-    print(f"Querying for specialization: {specialization}")
+    conn.commit()
     
-    # Get all profiles for the specialization
+    # users was recreated, so its ids no longer match any stored signatures
+    ProfessionalLSH.build_index(conn, 'users', rebuild=True)
+    CourseEvents.init_tables(conn)
+    SpecializationStats.init_tables(conn)
+    SpecializationStats.refresh(conn, all_specializations=True)
+    UserRecommendations.init_tables(conn)
+    # users was recreated without its triggers; reinstalling them also makes older snapshots stale
+    CatalogSnapshot.init_tables(conn)
+    # users (and courses, on a new database) were loaded before their triggers existed
+    UserRecommendations.invalidate_all(conn)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS request_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        path TEXT NOT NULL,
+        method TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        latency_ms REAL NOT NULL,
+        specialization TEXT,
+        skills TEXT,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.commit()
+    conn.close()
+    reset_skill_index()
+    reset_course_ranker()
+
+@app.route("/skills/autocomplete")
+def autocomplete_skills():
+    """Typeahead suggestions for the skills input, ranked by frequency."""
+    query = request.args.get("q", "")
+    # The trie keeps TOP_PER_NODE completions per prefix, so a larger limit could not be filled
+    limit = max(1, min(request.args.get("limit", 10, type=int), TOP_PER_NODE))
+    suggestions = get_skill_index().autocomplete(query, limit) if query.strip() else []
+    return Response(RowTypes.dumps({"query": query, "suggestions": suggestions}), mimetype="application/json")
+
+@app.route("/events", methods=["POST"])
+def ingest_events():
+    """Record course card views/clicks: {"user": key, "events": [{"event": "view", "url": ...}]}."""
+    try:
+        rows = CourseEvents.parse_events(request.get_json(force=True, silent=True) or {})
+    except ValueError as e:
+        return Response(RowTypes.dumps({"error": str(e)}), status=400, mimetype="application/json")
+    writer = get_log_writer()
+    for row in rows:
+        writer.submit(CourseEvents.INSERT_EVENT_SQL, row)
+    return Response(status=204)
+
+@app.route("/recommendations/collaborative")
+def collaborative_recommendations():
+    """Courses liked by users with a similar click history, from the precomputed item-item model."""
+    user_key = request.args.get("user", "")
+    limit = min(request.args.get("limit", 10, type=int), 50)
+    conn = get_connection()
+    recommendations = CourseEvents.recommend(conn, DATABASE, user_key, limit) if user_key else []
+    conn.close()
+    return Response(RowTypes.dumps({"recommendations": recommendations}), mimetype="application/json")
+
+def ranked_missing_skills(conn, specialization, user_skills):
+    """Missing skills ranked by how many professionals in the specialization have them."""
+    # Summary tables live next to the professionals (the shard, if any) and are refreshed by writers
+    stats_conn = professionals_connection(conn, specialization)
+    try:
+        return SpecializationStats.ranked_skills(stats_conn, specialization, exclude=user_skills)
+    finally:
+        if stats_conn is not conn:
+            stats_conn.close()
+
+@app.route("/specializations/<specialization>/stats")
+def specialization_stats(specialization):
+    """Precomputed skill frequencies, top companies and experience histogram."""
+    conn = get_connection()
+    stats_conn = professionals_connection(conn, specialization)
+    stats = SpecializationStats.specialization_stats(stats_conn, specialization)
+    if stats_conn is not conn:
+        stats_conn.close()
+    conn.close()
+    if stats is None:
+        return Response(RowTypes.dumps({"error": "unknown specialization"}), status=404, mimetype="application/json")
+    return Response(RowTypes.dumps(stats), mimetype="application/json")
+
+def parse_skills(raw_skills):
+    """Split the comma separated skills input and map typos onto known skill names."""
+    skill_index = get_skill_index()
+    skills = (skill_index.canonicalize(skill) for skill in raw_skills.split(","))
+    return set(skill for skill in skills if skill)
+
+def compare_profiles(cursor, user_skills, specialization, all_required_skills):
+    """Yield a ProfileComparison per professional, collecting their skills as we go."""
+    cursor.row_factory = ProfessionalRow.from_row
     cursor.execute("""
         SELECT name, skills, experience_years, company 
         FROM users 
         WHERE specialization = ?
     """, (specialization,))
     
-    professionals = cursor.fetchall()
-    
-    # Debug: Print the number of professionals found
-    print(f"Found {len(professionals)} professionals")
-    
-    profile_comparisons = []
-    all_required_skills = set()
-    
-    for prof in professionals:
-        prof_skills = set(skill.strip().lower() for skill in prof[1].split(","))
+    for prof in cursor:
+        prof_skills = set(skill.strip().lower() for skill in prof.skills.split(","))
         all_required_skills.update(prof_skills)
         common_skills = user_skills.intersection(prof_skills)
         similarity_score = len(common_skills) / len(prof_skills) * 100
         
-        profile_comparisons.append({
-            "name": prof[0],
-            "common_skills": list(common_skills),
-            "missing_skills": list(prof_skills - user_skills),
-            "similarity_score": round(similarity_score, 1),
-            "experience_years": prof[2],
-            "company": prof[3]
-        })
-    
-    # Debug: Print the number of profile comparisons
-    print(f"Generated {len(profile_comparisons)} profile comparisons")
+        yield ProfileComparison(
+            prof.name,
+            list(common_skills),
+            list(prof_skills - user_skills),
+            round(similarity_score, 1),
+            prof.experience_years,
+            prof.company
+        )
+
+def recommend_courses(specialization, missing_skills, level=None, weights=None, free=False):
+    """Top paid (or free) courses of the specialization, scored by CourseRanker with the request's weights."""
+    return get_course_ranker().rank(specialization, missing_skills, level, weights, k=3, free=free)
+
+def stream_suggestions(user_skills, specialization, cross_specialization=False, level=None, weights=None):
+    """NDJSON records: each profile comparison, the missing skills, then the ranked courses."""
+    conn = get_connection()
+    try:
+        all_required_skills = set()
+        prof_conn = professionals_connection(conn, specialization)
+        try:
+            for comparison in compare_profiles(prof_conn.cursor(), user_skills, specialization,
+                                               all_required_skills):
+                yield {"profile_comparison": comparison}
+        finally:
+            if prof_conn is not conn:
+                prof_conn.close()
+        missing_skills = all_required_skills - user_skills
+        yield {"missing_skills": list(missing_skills)}
+        for course in recommend_courses(specialization, missing_skills, level, weights):
+            yield {"course_recommendation": course}
+        for course in recommend_courses(specialization, missing_skills, level, weights, free=True):
+            yield {"free_course_recommendation": course}
+        yield {"ranked_missing_skills": ranked_missing_skills(conn, specialization, user_skills)}
+        if cross_specialization:
+            for professional in find_similar_professionals(conn, user_skills):
+                yield {"similar_professional": professional}
+    finally:
+        conn.close()
+
+def build_suggestions(conn, user_skills, specialization, level=None, weights=None):
+    """The /suggest result for one profile; also run by the nightly UserRecommendations batch."""
+    all_required_skills = set()
+    prof_conn = professionals_connection(conn, specialization)
+    profile_comparisons = list(compare_profiles(prof_conn.cursor(), user_skills, specialization,
+                                                all_required_skills))
+    if prof_conn is not conn:
+        prof_conn.close()
     
     # Get course recommendations
     missing_skills = all_required_skills - user_skills
-    cursor.execute("""
-        SELECT name, skill, platform, url, difficulty, instructor, duration, description, rating
-        FROM courses 
-        WHERE specialization = ? 
-        ORDER BY rating DESC
-        LIMIT 3
-    """, (specialization,))
+    course_recommendations = recommend_courses(specialization, missing_skills, level, weights)
+    free_course_recommendations = recommend_courses(specialization, missing_skills, level, weights, free=True)
     
-    courses = cursor.fetchall()
-    course_recommendations = [{
-        "name": course[0],
-        "skill": course[1],
-        "platform": course[2],
-        "url": course[3],
-        "difficulty": course[4],
-        "instructor": course[5],
-        "duration": course[6],
-        "description": course[7],
-        "rating": course[8]
-    } for course in courses]
+    return {
+        "missing_skills": list(missing_skills),
+        "profile_comparisons": profile_comparisons,
+        "course_recommendations": course_recommendations,
+        "free_course_recommendations": free_course_recommendations,
+        "ranked_missing_skills": ranked_missing_skills(conn, specialization, user_skills)
+    }
+
+@app.route("/suggest", methods=["POST"])
+def suggest():
+    """Provide skill suggestions and profile comparisons.
+    
+    Clients that send ``Accept: application/x-ndjson`` (or ``?stream=ndjson``)
+    get the result streamed one record per line instead of one JSON document.
+    With ``"cross_specialization": true`` the response also lists the most
+    similar professionals from every specialization, found via MinHash LSH.
+    Courses are ranked by CourseRanker; ``"level"`` and ``"ranking"`` (a dict
+    of feature weights, see CourseRanker.FEATURES) tune the ordering.
+    ``course_recommendations`` holds the specialization's paid courses and
+    ``free_course_recommendations`` its free_courses items, each ranked on its
+    own; every item carries ``is_free`` and its ranking ``score``.
+    """
+    data = request.get_json()
+    user_skills = parse_skills(data.get("skills", ""))
+    specialization = data.get("specialization")
+    cross_specialization = bool(data.get("cross_specialization"))
+    level = data.get("level")
+    try:
+        weights = CourseRanker.parse_weights(data.get("ranking"))
+    except ValueError as e:
+        return Response(RowTypes.dumps({"error": str(e)}), status=400, mimetype="application/json")
+
+    if request.args.get("stream") == "ndjson" or NDJSON_MIMETYPE in request.headers.get("Accept", ""):
+        return Response(
+            RowTypes.ndjson_lines(stream_suggestions(user_skills, specialization, cross_specialization,
+                                                     level, weights)),
+            mimetype=NDJSON_MIMETYPE
+        )
+
+    conn = get_connection()
+    
+    # Debug: Print the specialization being queried
+    print(f"Querying for specialization: {specialization}")
+    
+    # Known profiles asking for the default ranking are served from the nightly batch
+    precomputed = None
+    if level is None and data.get("ranking") is None:
+        precomputed = UserRecommendations.lookup(conn, user_skills, specialization)
+    if precomputed is not None and not cross_specialization:
+        conn.close()
+        return Response(precomputed, mimetype="application/json")
+
+    if precomputed is not None:
+        result = json.loads(precomputed)
+    else:
+        result = build_suggestions(conn, user_skills, specialization, level, weights)
+    
+    # Debug: Print the number of profile comparisons
+    print(f"Generated {len(result['profile_comparisons'])} profile comparisons")
+    
+    if cross_specialization:
+        result["similar_professionals"] = find_similar_professionals(conn, user_skills)
     
     conn.close()
 
-    return jsonify({
-        "missing_skills": list(missing_skills),
-        "profile_comparisons": profile_comparisons,
-        "course_recommendations": course_recommendations
-    })
+    return Response(RowTypes.dumps(result), mimetype="application/json")
+
+# Shed load instead of queueing without bound; cheap cached lookups get a priority lane
+app.wsgi_app = AdmissionMiddleware(app.wsgi_app, {
+    '/suggest': RouteLimit(max_in_flight=8, max_queue=32, queue_timeout=2.0),
+    '/skills/autocomplete': RouteLimit(max_in_flight=16, max_queue=64, queue_timeout=0.2, priority=True),
+    '/recommendations/collaborative': RouteLimit(max_in_flight=8, max_queue=32, queue_timeout=0.5, priority=True),
+    '/specializations/': RouteLimit(max_in_flight=8, max_queue=32, queue_timeout=0.5, priority=True),
+}, max_in_flight=32, priority_reserve=8)
 
 if __name__ == '__main__':
     init_db()
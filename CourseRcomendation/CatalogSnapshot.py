@@ -0,0 +1,457 @@
+"""Read-only, memory-mapped binary snapshot of the course catalog.
+
+The compiler turns the catalog tables (courses, free_courses, skill_details,
+learning_resources, professionals, users and the cf_item_counts popularity)
+into one versioned file:
+
+* a NumPy structured array per table holding the fixed-width fields, with text
+  columns stored as ids into a shared string table
+* the string table itself (utf-8 blob plus offsets)
+* precomputed skill ids: a skill_id column where a row has one skill, and a
+  CSR pair (skill_offsets, skill_ids) for professionals' skill lists
+
+Workers ``mmap`` the file, so opening it costs a few page faults instead of a
+full SQLite load and every worker shares the same page cache. A new snapshot is
+written next to the old one and swapped in with ``os.replace``; workers pick it
+up through ``SnapshotHandle.current()``. All tables are read in one SQLite
+read transaction, so a snapshot never mixes rows from before and after a write.
+
+Triggers on the source tables bump a version counter, and each snapshot records
+the version it was compiled from. ``is_current`` compares the two, so writes to
+unrelated tables (request logs, events) do not make a snapshot stale.
+CareerPath builds CourseRanker and SkillIndex from the snapshot named by
+CATALOG_SNAPSHOT while it is current, and from SQLite otherwise.
+
+    python CatalogSnapshot.py compile catalog.snap
+    python CatalogSnapshot.py watch catalog.snap --interval 30
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+import numpy as np
+
+DATABASE = 'course_recommendations.db'
+MAGIC = b'CATSNAP1'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+NULL_ID = 0xFFFFFFFF
+BATCH_SIZE = 100000
+
+# column -> kind; "str" columns become string-table ids, "skill" columns become
+# skill ids and "skills" columns (comma separated lists) become CSR skill arrays.
+# Rows are stored in the order of the first column.
+TABLES = {
+    'courses': [
+        ('id', 'int'), ('name', 'str'), ('skill', 'skill'), ('specialization', 'str'),
+        ('platform', 'str'), ('url', 'str'), ('difficulty', 'str'), ('instructor', 'str'),
+        ('duration', 'str'), ('description', 'str'), ('rating', 'float'),
+    ],
+    'free_courses': [
+        ('id', 'int'), ('title', 'str'), ('topic', 'skill'), ('specialization', 'str'),
+        ('platform', 'str'), ('url', 'str'), ('skill_level', 'str'), ('instructor', 'str'),
+        ('duration', 'str'), ('description', 'str'), ('rating', 'float'),
+    ],
+    'skill_details': [
+        ('id', 'int'), ('skill', 'skill'), ('specialization', 'str'), ('description', 'str'),
+        ('difficulty', 'str'), ('estimated_hours', 'int'), ('industry_demand', 'str'),
+        ('salary_impact', 'str'), ('career_impact', 'str'), ('prerequisites', 'str'),
+        ('learning_path', 'str'), ('resources', 'str'), ('tools', 'str'), ('best_practices', 'str'),
+    ],
+    'learning_resources': [
+        ('id', 'int'), ('skill', 'skill'), ('title', 'str'), ('type', 'str'), ('platform', 'str'),
+        ('url', 'str'), ('duration', 'str'), ('difficulty', 'str'), ('rating', 'float'),
+        ('description', 'str'), ('instructor', 'str'), ('is_free', 'bool'), ('language', 'str'),
+        ('subtitles', 'bool'), ('topics', 'str'),
+    ],
+    'professionals': [
+        ('id', 'int'), ('name', 'str'), ('skills', 'skills'), ('specialization', 'str'),
+        ('experience_years', 'int'), ('company', 'str'), ('role', 'str'),
+        ('achievements', 'str'), ('certifications', 'str'),
+    ],
+    'users': [
+        ('id', 'int'), ('name', 'str'), ('skills', 'skills'), ('specialization', 'str'),
+        ('experience_years', 'int'), ('company', 'str'),
+    ],
+    'cf_item_counts': [
+        ('item_url', 'str'), ('users', 'int'),
+    ],
+}
+BUMP_SOURCE_VERSION = """
+    INSERT INTO catalog_snapshot_version (id, version) VALUES (0, 1)
+    ON CONFLICT (id) DO UPDATE SET version = version + 1;
+"""
+
+FIELD_TYPES = {'int': '<i8', 'str': '<u4', 'skill': '<u4', 'float': '<f4', 'bool': '<i1'}
+
+
+def table_dtype(columns):
+    fields = []
+    for column, kind in columns:
+        if kind == 'skill':
+            fields.append(('skill_id', FIELD_TYPES[kind]))
+        elif kind != 'skills':
+            fields.append((column, FIELD_TYPES[kind]))
+    return np.dtype(fields)
+
+
+def init_tables(conn):
+    """Create the source version counter and the triggers that bump it on writes to TABLES."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_snapshot_version (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            version INTEGER NOT NULL
+        )
+    """)
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    missing = [(table, action) for table in TABLES if table in existing
+               for action in ('insert', 'update', 'delete') if f"{table}_snapshot_{action}" not in existing]
+    for table, action in missing:
+        conn.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_snapshot_{action} AFTER {action.upper()} ON {table}
+            BEGIN
+                {BUMP_SOURCE_VERSION}
+            END;
+        ''')
+    if missing:
+        # Writes made before the triggers existed went unseen, so older snapshots no longer count as current
+        conn.execute(BUMP_SOURCE_VERSION)
+    conn.commit()
+
+
+def source_version(conn):
+    """Version of the source tables, or None if change tracking is not installed."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalog_snapshot_version'"
+                        ).fetchone():
+        return None
+    row = conn.execute("SELECT version FROM catalog_snapshot_version WHERE id = 0").fetchone()
+    return row[0] if row else 0
+
+
+def database_version(database):
+    """Fingerprint of the database files; changes whenever SQLite writes to them."""
+    parts = []
+    for path in (database, database + '-wal'):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+    return "-".join(parts)
+
+
+class Interner:
+    """Assigns dense ids to distinct strings."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def __call__(self, value):
+        if value is None:
+            return NULL_ID
+        value = str(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.ids)
+        return string_id
+
+    def arrays(self):
+        encoded = [value.encode('utf-8') for value in self.ids]
+        offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def compile_snapshot(path, database=DATABASE):
+    """Write a snapshot of database to path, atomically replacing any existing one."""
+    version = database_version(database)
+    try:
+        writer = sqlite3.connect(database)
+        init_tables(writer)
+        writer.close()
+    except sqlite3.OperationalError:
+        # Read-only database: is_current falls back to comparing database_version
+        pass
+    conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    strings, skills = Interner(), Interner()
+    sections = {}
+
+    # One read transaction: each COUNT(*) matches the rows read after it, and tables agree with each other
+    conn.execute("BEGIN")
+    tables_version = source_version(conn)
+    for table, columns in TABLES.items():
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if not exists:
+            continue
+        dtype = table_dtype(columns)
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        rows = np.zeros(count, dtype=dtype)
+        skill_offsets = skill_ids = None
+        if any(kind == 'skills' for _, kind in columns):
+            skill_offsets = np.zeros(count + 1, dtype='<u8')
+            skill_ids = []
+
+        cursor = conn.execute(f"SELECT {', '.join(c for c, _ in columns)} FROM {table} ORDER BY {columns[0][0]}")
+        index = 0
+        while True:
+            records = cursor.fetchmany(BATCH_SIZE)
+            if not records:
+                break
+            batch = []
+            for record in records:
+                values = []
+                for (column, kind), value in zip(columns, record):
+                    if kind == 'str':
+                        values.append(strings(value))
+                    elif kind == 'skill':
+                        values.append(skills(value.strip().lower() if value else None))
+                    elif kind == 'skills':
+                        skill_ids.extend(skills(s.strip().lower()) for s in (value or "").split(",") if s.strip())
+                        skill_offsets[index + len(batch) + 1] = len(skill_ids)
+                    elif kind == 'float':
+                        values.append(np.nan if value is None else value)
+                    else:
+                        values.append(-1 if value is None else int(value))
+                batch.append(tuple(values))
+            rows[index:index + len(batch)] = np.array(batch, dtype=dtype)
+            index += len(batch)
+
+        sections[table] = rows
+        if skill_offsets is not None:
+            sections[f"{table}.skill_offsets"] = skill_offsets
+            sections[f"{table}.skill_ids"] = np.asarray(skill_ids, dtype='<u4')
+    conn.rollback()
+    conn.close()
+
+    sections['strings.offsets'], sections['strings.data'] = strings.arrays()
+    sections['skills.offsets'], sections['skills.data'] = skills.arrays()
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write_sections(tmp_path, sections, {'database_version': version, 'source_version': tables_version,
+                                        'created_at': time.time()})
+    os.replace(tmp_path, path)
+    return version
+
+
+def write_sections(path, sections, metadata):
+    """Lay the arrays out back to back, each aligned, behind a JSON header."""
+    index, offset = {}, 0
+    for name, array in sections.items():
+        index[name] = {
+            'offset': offset,
+            'count': len(array),
+            'dtype': array.dtype.descr if array.dtype.names else array.dtype.str,
+        }
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({'format': FORMAT_VERSION, 'sections': index, **metadata}).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 4 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header)) + header)
+        for name, array in sections.items():
+            f.seek(data_start + index[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class Snapshot:
+    """A mapped snapshot; arrays are zero-copy views of the page cache."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        header_len = struct.unpack_from('<I', self.mm, len(MAGIC))[0]
+        header_start = len(MAGIC) + 4
+        self.header = json.loads(self.mm[header_start:header_start + header_len])
+        if self.header['format'] != FORMAT_VERSION:
+            raise ValueError(f"unsupported snapshot format {self.header['format']}")
+        data_start = -(-(header_start + header_len) // ALIGNMENT) * ALIGNMENT
+
+        self.sections = {}
+        for name, info in self.header['sections'].items():
+            descr = info['dtype']
+            dtype = np.dtype([tuple(field) for field in descr] if isinstance(descr, list) else descr)
+            self.sections[name] = np.frombuffer(self.mm, dtype=dtype, count=info['count'],
+                                                offset=data_start + info['offset'])
+        self._skill_lookup = None
+        self._decoded = {}
+
+    @property
+    def database_version(self):
+        return self.header['database_version']
+
+    @property
+    def source_version(self):
+        return self.header['source_version']
+
+    @property
+    def skill_count(self):
+        return len(self.sections['skills.offsets']) - 1
+
+    def has_table(self, name):
+        return name in self.sections
+
+    def table(self, name):
+        return self.sections[name]
+
+    def _strings(self, table):
+        """Every string of the string table (or of skills), decoded once."""
+        if table not in self._decoded:
+            offsets = self.sections[f"{table}.offsets"].tolist()
+            data = bytes(self.sections[f"{table}.data"])
+            self._decoded[table] = [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+        return self._decoded[table]
+
+    def column(self, table, column):
+        """Decoded values of one column of table, as a list in row order."""
+        kind = dict(TABLES[table])[column]
+        rows = self.sections[table]
+        if kind in ('str', 'skill'):
+            strings = self._strings('strings' if kind == 'str' else 'skills')
+            ids = rows[column if kind == 'str' else 'skill_id'].tolist()
+            return [None if string_id == NULL_ID else strings[string_id] for string_id in ids]
+        if kind == 'skills':
+            skills = self._strings('skills')
+            offsets = self.sections[f"{table}.skill_offsets"].tolist()
+            ids = self.sections[f"{table}.skill_ids"].tolist()
+            return [",".join(skills[i] for i in ids[start:end]) for start, end in zip(offsets, offsets[1:])]
+        if kind == 'float':
+            return [None if math.isnan(value) else round(value, 4) for value in rows[column].tolist()]
+        return rows[column].tolist()
+
+    def skill_ids(self, table):
+        """Skill ids used by table: one per row for a skill column, every list entry for a skills column."""
+        if f"{table}.skill_ids" in self.sections:
+            return self.sections[f"{table}.skill_ids"]
+        return self.sections[table]['skill_id']
+
+    def string(self, string_id, table='strings'):
+        if string_id == NULL_ID:
+            return None
+        offsets = self.sections[f"{table}.offsets"]
+        start, end = offsets[string_id], offsets[string_id + 1]
+        return bytes(self.sections[f"{table}.data"][start:end]).decode('utf-8')
+
+    def skill_name(self, skill_id):
+        return self.string(skill_id, 'skills')
+
+    def skill_id(self, name):
+        """Skill id for a (case-insensitive) skill name, or None if unknown."""
+        if self._skill_lookup is None:
+            count = len(self.sections['skills.offsets']) - 1
+            self._skill_lookup = {self.skill_name(i): i for i in range(count)}
+        return self._skill_lookup.get(name.strip().lower())
+
+    def row_skill_ids(self, table, index):
+        offsets = self.sections[f"{table}.skill_offsets"]
+        return self.sections[f"{table}.skill_ids"][offsets[index]:offsets[index + 1]]
+
+    def record(self, table, index):
+        """Decode one row back into a dict shaped like the SQLite row."""
+        row = self.sections[table][index]
+        record = {}
+        for column, kind in TABLES[table]:
+            if kind == 'str':
+                record[column] = self.string(int(row[column]))
+            elif kind == 'skill':
+                record[column] = self.skill_name(int(row['skill_id']))
+            elif kind == 'skills':
+                record[column] = ",".join(self.skill_name(int(i)) for i in self.row_skill_ids(table, index))
+            elif kind == 'float':
+                # float32 storage; round away the representation noise
+                record[column] = None if np.isnan(row[column]) else round(float(row[column]), 4)
+            else:
+                record[column] = row[column].item()
+        return record
+
+    def close(self):
+        self.sections.clear()
+        self.mm.close()
+
+
+class SnapshotHandle:
+    """Per-worker access to the latest snapshot at path.
+
+    ``current()`` re-maps the file only when it has been replaced, so callers
+    can invoke it on every request. Readers holding the previous Snapshot keep
+    a valid mapping until they drop it.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.snapshot = Snapshot(path)
+        self.checked_at = time.monotonic()
+
+    def current(self):
+        now = time.monotonic()
+        if now - self.checked_at >= self.check_interval:
+            with self.lock:
+                self.checked_at = now
+                if os.stat(self.path).st_ino != self.snapshot.inode:
+                    self.snapshot = Snapshot(self.path)
+        return self.snapshot
+
+
+def is_current(snapshot, database=DATABASE):
+    """True if no source table of database changed since snapshot was compiled."""
+    conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    try:
+        version = source_version(conn)
+    finally:
+        conn.close()
+    if version is None or snapshot.source_version is None:
+        return snapshot.database_version == database_version(database)
+    return snapshot.source_version == version
+
+
+def refresh(path, database=DATABASE):
+    """Recompile the snapshot if its source tables changed since it was written."""
+    if os.path.exists(path):
+        try:
+            snapshot = Snapshot(path)
+        except ValueError:
+            # Older format: compile a new one over it
+            snapshot = None
+        if snapshot is not None:
+            up_to_date = is_current(snapshot, database)
+            snapshot.close()
+            if up_to_date:
+                return False
+    compile_snapshot(path, database)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the catalog into a memory-mapped snapshot")
+    parser.add_argument("command", choices=["compile", "refresh", "watch"])
+    parser.add_argument("path", help="snapshot file to write")
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--interval", type=float, default=30.0, help="seconds between checks in watch mode")
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        start = time.perf_counter()
+        compile_snapshot(args.path, args.db)
+        print(f"Wrote {args.path} in {time.perf_counter() - start:.1f}s")
+    elif args.command == "refresh":
+        print("Snapshot rebuilt" if refresh(args.path, args.db) else "Snapshot up to date")
+    else:
+        while True:
+            if refresh(args.path, args.db):
+                print(f"Rebuilt {args.path} for database version {database_version(args.db)}")
+            time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,8 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
 import numpy as np
+from AdmissionControl import AdmissionMiddleware, RouteLimit
+from CourseRanker import CourseRanker
 
 app = Flask(__name__)
 DATABASE = 'course_recommendations.db'
@@ -64,6 +66,14 @@ def find_similar_courses():
     similar_courses = get_similar_courses(course_name, df)
     return jsonify({"similar_courses": similar_courses})
 
+_course_ranker = None
+
+def get_course_ranker():
+    global _course_ranker
+    if _course_ranker is None:
+        _course_ranker = CourseRanker.from_database(DATABASE)
+    return _course_ranker
+
 # Update the suggest route to include skill filtering
 @app.route("/suggest", methods=["POST"])
 def suggest():
@@ -74,16 +84,10 @@ def suggest():
 
     conn = sqlite3.connect(DATABASE)
     cursor = conn.cursor()
-    df = pd.read_sql_query("SELECT * FROM courses", conn)
-    
-    # Filter courses by skills
-    relevant_courses = df[
-        df['skill'].str.lower().isin([s.lower() for s in user_skills]) |
-        df['specialization'].str.lower() == specialization.lower()
-    ]
     
-    # Get course recommendations based on skill match
-    course_recommendations = relevant_courses.sort_values('rating', ascending=False).head(3).to_dict('records')
+    # Courses of the specialization or teaching one of the user's skills, ranked on precomputed features
+    course_recommendations = [course.to_dict() for course in get_course_ranker().rank(
+        specialization, related_skills=user_skills, k=3)]
     
     # ... rest of your existing suggest route code ...
 
@@ -1752,19 +1756,18 @@ def suggest():
 
     conn = sqlite3.connect(DATABASE)
     cursor = conn.cursor()
-    df = pd.read_sql_query("SELECT * FROM courses", conn)
-    
-    # Filter courses by skills
-    relevant_courses = df[
-        df['skill'].str.lower().isin([s.lower() for s in user_skills]) |
-        df['specialization'].str.lower() == specialization.lower()
-    ]
     
-    # Get course recommendations based on skill match
-    course_recommendations = relevant_courses.sort_values('rating', ascending=False).head(3).to_dict('records')
+    # Courses of the specialization or teaching one of the user's skills, ranked on precomputed features
+    course_recommendations = [course.to_dict() for course in get_course_ranker().rank(
+        specialization, related_skills=user_skills, k=3)]
     
     # ... rest of your existing suggest route code ...
 
+app.wsgi_app = AdmissionMiddleware(app.wsgi_app, {
+    '/suggest': RouteLimit(max_in_flight=8, max_queue=32, queue_timeout=2.0),
+    '/similar_courses': RouteLimit(max_in_flight=4, max_queue=16, queue_timeout=2.0),
+}, max_in_flight=16, priority_reserve=0)
+
 if __name__ == '__main__':
     init_db()
     app.run(debug=True)
@@ -0,0 +1,271 @@
+"""Implicit-feedback event log and item-item collaborative filtering.
+
+The advisor UI reports which course cards users see and click. Those events
+are turned into an item-item co-occurrence model: two courses co-occur when
+the same user interacted with both, and their similarity is the cosine of the
+co-occurrence count, ``users(a, b) / sqrt(users(a) * users(b))``. The top
+similar courses of every course are stored so serving is a cached lookup.
+
+The full build uses a SciPy sparse user x item matrix; the incremental update
+only folds in events newer than the last build and re-ranks the courses they
+touched.
+
+    python CourseEvents.py build --full
+    python CourseEvents.py build             # fold in new events only
+"""
+import argparse
+import functools
+import math
+import sqlite3
+import time
+
+DATABASE = 'course_recommendations.db'
+EVENT_WEIGHTS = {'view': 1.0, 'click': 3.0, 'complete': 5.0}
+TOP_K = 20
+MAX_EVENTS_PER_REQUEST = 500
+INSERT_EVENT_SQL = "INSERT INTO course_events (user_key, item_url, event_type) VALUES (?, ?, ?)"
+
+
+def init_tables(conn):
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS course_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_key TEXT NOT NULL,
+            item_url TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS cf_user_items (
+            user_key TEXT NOT NULL,
+            item_url TEXT NOT NULL,
+            weight REAL NOT NULL,
+            PRIMARY KEY (user_key, item_url)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS cf_item_counts (
+            item_url TEXT PRIMARY KEY,
+            users INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS cf_cooccurrence (
+            item_a TEXT NOT NULL,
+            item_b TEXT NOT NULL,
+            users INTEGER NOT NULL,
+            PRIMARY KEY (item_a, item_b)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS cf_similar_items (
+            item_url TEXT NOT NULL,
+            similar_url TEXT NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (item_url, similar_url)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS cf_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    ''')
+
+
+def parse_events(payload):
+    """Validate an ingestion payload into (user_key, item_url, event_type) rows."""
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be a JSON object")
+    user_key = str(payload.get("user", "")).strip()
+    if not user_key:
+        raise ValueError("missing user")
+    events = payload.get("events", [])
+    if not isinstance(events, list) or len(events) > MAX_EVENTS_PER_REQUEST:
+        raise ValueError(f"events must be a list of at most {MAX_EVENTS_PER_REQUEST} items")
+    rows = []
+    for event in events:
+        if not isinstance(event, dict):
+            raise ValueError("each event must be a JSON object")
+        event_type = event.get("event")
+        url = str(event.get("url") or "").strip()
+        if event_type not in EVENT_WEIGHTS:
+            raise ValueError(f"unknown event type {event_type!r}")
+        if not url:
+            raise ValueError("event without url")
+        rows.append((user_key, url, event_type))
+    return rows
+
+
+def record_events(conn, rows):
+    conn.executemany(INSERT_EVENT_SQL, rows)
+    conn.commit()
+
+
+def get_state(conn, key, default=0):
+    row = conn.execute("SELECT value FROM cf_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_state(conn, key, value):
+    conn.execute("""
+        INSERT INTO cf_state (key, value) VALUES (?, ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value
+    """, (key, value))
+
+
+def weight_case():
+    return "CASE event_type " + " ".join(
+        f"WHEN '{event}' THEN {weight}" for event, weight in EVENT_WEIGHTS.items()
+    ) + " ELSE 0 END"
+
+
+def rerank_items(conn, items):
+    """Recompute the stored top-k similar items for each of items."""
+    for item in items:
+        item_users = conn.execute("SELECT users FROM cf_item_counts WHERE item_url = ?", (item,)).fetchone()[0]
+        rows = conn.execute("""
+            SELECT c.item_b, c.users, n.users FROM cf_cooccurrence c
+            JOIN cf_item_counts n ON n.item_url = c.item_b
+            WHERE c.item_a = ?
+        """, (item,))
+        neighbours = [(users / math.sqrt(item_users * other_users), other) for other, users, other_users in rows]
+        neighbours.sort(reverse=True)
+        conn.execute("DELETE FROM cf_similar_items WHERE item_url = ?", (item,))
+        conn.executemany("INSERT INTO cf_similar_items (item_url, similar_url, score) VALUES (?, ?, ?)",
+                         [(item, other, score) for score, other in neighbours[:TOP_K]])
+
+
+def build_full(conn):
+    """Rebuild the whole model from the event log with a sparse matrix product."""
+    import numpy as np
+    from scipy import sparse
+
+    last_event_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM course_events").fetchone()[0]
+    pairs = conn.execute(f"""
+        SELECT user_key, item_url, SUM({weight_case()}) FROM course_events
+        WHERE id <= ? GROUP BY user_key, item_url
+    """, (last_event_id,)).fetchall()
+
+    users = {key: i for i, key in enumerate(dict.fromkeys(p[0] for p in pairs))}
+    items = list(dict.fromkeys(p[1] for p in pairs))
+    item_ids = {url: i for i, url in enumerate(items)}
+    rows = np.fromiter((users[p[0]] for p in pairs), dtype=np.int64, count=len(pairs))
+    cols = np.fromiter((item_ids[p[1]] for p in pairs), dtype=np.int64, count=len(pairs))
+    interactions = sparse.csr_matrix((np.ones(len(pairs), dtype=np.float32), (rows, cols)),
+                                     shape=(len(users), len(items)))
+
+    cooccurrence = (interactions.T @ interactions).tocsr()
+    item_users = cooccurrence.diagonal()
+    cooccurrence.setdiag(0)
+    cooccurrence.eliminate_zeros()
+
+    conn.execute("DELETE FROM cf_user_items")
+    conn.execute("DELETE FROM cf_item_counts")
+    conn.execute("DELETE FROM cf_cooccurrence")
+    conn.execute("DELETE FROM cf_similar_items")
+    conn.executemany("INSERT INTO cf_user_items (user_key, item_url, weight) VALUES (?, ?, ?)", pairs)
+    conn.executemany("INSERT INTO cf_item_counts (item_url, users) VALUES (?, ?)",
+                     zip(items, item_users.astype(int).tolist()))
+
+    norms = np.sqrt(item_users)
+    similar_rows = []
+    for i in range(len(items)):
+        start, end = cooccurrence.indptr[i], cooccurrence.indptr[i + 1]
+        neighbours = cooccurrence.indices[start:end]
+        counts = cooccurrence.data[start:end]
+        conn.executemany("INSERT INTO cf_cooccurrence (item_a, item_b, users) VALUES (?, ?, ?)",
+                         ((items[i], items[j], int(c)) for j, c in zip(neighbours, counts)))
+        scores = counts / (norms[i] * norms[neighbours])
+        if len(scores) > TOP_K:
+            top = np.argpartition(-scores, TOP_K)[:TOP_K]
+        else:
+            top = np.arange(len(scores))
+        similar_rows.extend((items[i], items[neighbours[j]], float(scores[j])) for j in top)
+    conn.executemany("INSERT INTO cf_similar_items (item_url, similar_url, score) VALUES (?, ?, ?)", similar_rows)
+    set_state(conn, 'last_event_id', last_event_id)
+    set_state(conn, 'model_version', get_state(conn, 'model_version') + 1)
+    conn.commit()
+    return len(pairs)
+
+
+def build_incremental(conn):
+    """Fold events newer than the last build into the model; returns events processed."""
+    last_event_id = get_state(conn, 'last_event_id')
+    new_last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM course_events").fetchone()[0]
+    if new_last_id == last_event_id:
+        return 0
+    pairs = conn.execute(f"""
+        SELECT user_key, item_url, SUM({weight_case()}) FROM course_events
+        WHERE id > ? AND id <= ? GROUP BY user_key, item_url
+    """, (last_event_id, new_last_id)).fetchall()
+
+    affected = set()
+    for user_key, item, weight in pairs:
+        known = conn.execute("SELECT 1 FROM cf_user_items WHERE user_key = ? AND item_url = ?",
+                             (user_key, item)).fetchone()
+        if known:
+            conn.execute("UPDATE cf_user_items SET weight = weight + ? WHERE user_key = ? AND item_url = ?",
+                         (weight, user_key, item))
+            continue
+        # A new (user, item) pair co-occurs once with each item the user already has
+        others = [row[0] for row in conn.execute("SELECT item_url FROM cf_user_items WHERE user_key = ?",
+                                                 (user_key,))]
+        increments = [(item, other) for other in others] + [(other, item) for other in others]
+        conn.executemany("""
+            INSERT INTO cf_cooccurrence (item_a, item_b, users) VALUES (?, ?, 1)
+            ON CONFLICT (item_a, item_b) DO UPDATE SET users = users + 1
+        """, increments)
+        conn.execute("""
+            INSERT INTO cf_item_counts (item_url, users) VALUES (?, 1)
+            ON CONFLICT (item_url) DO UPDATE SET users = users + 1
+        """, (item,))
+        conn.execute("INSERT INTO cf_user_items (user_key, item_url, weight) VALUES (?, ?, ?)",
+                     (user_key, item, weight))
+        affected.add(item)
+        affected.update(others)
+
+    rerank_items(conn, affected)
+    set_state(conn, 'last_event_id', new_last_id)
+    set_state(conn, 'model_version', get_state(conn, 'model_version') + 1)
+    conn.commit()
+    return new_last_id - last_event_id
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_recommendations(database, user_key, k, model_version):
+    conn = sqlite3.connect(database)
+    try:
+        history = dict(conn.execute("SELECT item_url, weight FROM cf_user_items WHERE user_key = ?", (user_key,)))
+        if not history:
+            return ()
+        scores = {}
+        placeholders = ", ".join("?" * len(history))
+        for item, similar, score in conn.execute(f"""
+            SELECT item_url, similar_url, score FROM cf_similar_items WHERE item_url IN ({placeholders})
+        """, list(history)):
+            if similar not in history:
+                scores[similar] = scores.get(similar, 0.0) + history[item] * score
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:k]
+        return tuple((url, round(score, 4)) for url, score in ranked)
+    finally:
+        conn.close()
+
+
+def recommend(conn, database, user_key, k=10):
+    """Top-k unseen items for user_key, cached until the model is rebuilt."""
+    recommendations = _cached_recommendations(database, user_key, k, get_state(conn, 'model_version'))
+    return [{"url": url, "score": score} for url, score in recommendations]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the course collaborative-filtering model")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--full", action="store_true", help="rebuild from the whole event log")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    init_tables(conn)
+    start = time.perf_counter()
+    if args.full:
+        print(f"Built model from {build_full(conn)} user/item pairs")
+    else:
+        print(f"Folded in {build_incremental(conn)} new events")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
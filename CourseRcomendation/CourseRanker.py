@@ -0,0 +1,221 @@
+"""Vectorized multi-factor ranking of the course catalog.
+
+Paid courses and free courses are loaded once into a float32 feature matrix,
+one row per catalog item, every column scaled to [0, 1]:
+
+* ``rating``: rating / 5
+* ``difficulty_fit``: 1 at the user's level, 0.5 one level away, 0 two away;
+  stored as one column per level so the request just picks which one to weight
+* ``duration``: log-scaled duration in hours (give it a negative weight to
+  prefer short courses)
+* ``is_free``
+* ``popularity``: log-scaled number of users who interacted with the course
+  (from the collaborative-filtering counts, when built)
+
+``skill_coverage`` is the only per-request column: how many of the user's
+missing skills the item teaches, relative to the best item. The score is one
+matrix-vector product with the request's weights and the top k come from
+``np.argpartition``, so trying another ranking policy costs nothing extra.
+
+``rank`` only considers items of the requested specialization, and callers
+rank paid and free items as separate lists (``free=False`` / ``free=True``),
+so a free video never displaces the specialization's paid courses.
+
+    python CourseRanker.py AI --missing "deep learning, nlp" --free
+"""
+import argparse
+import json
+import math
+import re
+import sqlite3
+
+import numpy as np
+
+from DataGenerator import split_skills, table_exists
+from RowTypes import Row
+
+DATABASE = 'course_recommendations.db'
+FEATURES = ('rating', 'difficulty_fit', 'duration', 'is_free', 'skill_coverage', 'popularity')
+DEFAULT_WEIGHTS = {
+    'rating': 1.0,
+    'difficulty_fit': 0.5,
+    'duration': -0.1,
+    'is_free': 0.1,
+    'skill_coverage': 2.0,
+    'popularity': 0.3,
+}
+LEVELS = ('beginner', 'intermediate', 'advanced')
+HOURS_PER_UNIT = {'hour': 1, 'day': 4, 'week': 5, 'month': 20}
+# Columns of the static matrix; difficulty_fit has one column per user level
+STATIC_COLUMNS = ['rating'] + [f'difficulty_fit_{level}' for level in LEVELS] + ['duration', 'is_free', 'popularity']
+ITEM_FIELDS = ('name', 'skill', 'specialization', 'platform', 'url', 'difficulty', 'instructor',
+               'duration', 'description', 'rating')
+# free_courses columns in ITEM_FIELDS order
+FREE_COURSE_COLUMNS = ('title', 'topic', 'specialization', 'platform', 'url', 'skill_level', 'instructor',
+                       'duration', 'description', 'rating')
+
+
+class RankedCourseRow(Row):
+    __slots__ = ('name', 'skill', 'platform', 'url', 'difficulty', 'instructor',
+                 'duration', 'description', 'rating', 'is_free', 'score')
+
+
+def duration_hours(duration):
+    """Hours in a duration string such as '20 weeks' or '7 hours'; None if unparseable."""
+    match = re.match(r'\s*(\d+(?:\.\d+)?)\s*(hour|day|week|month)', str(duration or '').lower())
+    if not match:
+        return None
+    return float(match.group(1)) * HOURS_PER_UNIT[match.group(2)]
+
+
+def level_index(level):
+    level = str(level or '').strip().lower()
+    return LEVELS.index(level) if level in LEVELS else None
+
+
+def parse_weights(raw):
+    """Merge a request's weights over DEFAULT_WEIGHTS; ValueError for anything but an object of finite numbers."""
+    weights = dict(DEFAULT_WEIGHTS)
+    if raw is None:
+        return weights
+    if not isinstance(raw, dict):
+        raise ValueError("ranking must be an object mapping feature names to weights")
+    for feature, weight in raw.items():
+        if feature not in FEATURES:
+            raise ValueError(f"unknown ranking feature {feature!r}; expected one of {FEATURES}")
+        try:
+            weight = float(weight)
+        except (TypeError, ValueError):
+            raise ValueError(f"ranking weight for {feature!r} must be a number")
+        # NaN or infinity would turn every score into NaN and make the top k arbitrary
+        if not math.isfinite(weight):
+            raise ValueError(f"ranking weight for {feature!r} must be a finite number")
+        weights[feature] = weight
+    return weights
+
+
+def log_scale(values):
+    scaled = np.log1p(values)
+    top = scaled.max() if len(scaled) else 0
+    return scaled / top if top > 0 else scaled
+
+
+class CourseRanker:
+    def __init__(self, items, popularity):
+        self.items = items
+        n = len(items)
+        self.specializations = np.array([item['specialization'] for item in items], dtype=object)
+        self.skills = [set(split_skills(item['skill'])) for item in items]
+
+        self.static = np.zeros((n, len(STATIC_COLUMNS)), dtype=np.float32)
+        self.static[:, 0] = [(item['rating'] or 0) / 5 for item in items]
+        levels = np.array([level_index(item['difficulty']) for item in items], dtype=object)
+        for user_level in range(len(LEVELS)):
+            distance = np.array([abs(lv - user_level) if lv is not None else 1 for lv in levels], dtype=np.float32)
+            self.static[:, 1 + user_level] = 1 - distance / (len(LEVELS) - 1)
+        hours = np.array([duration_hours(item['duration']) or 0 for item in items], dtype=np.float32)
+        self.static[:, 4] = log_scale(hours)
+        self.static[:, 5] = [item['is_free'] for item in items]
+        self.static[:, 6] = log_scale(np.array([popularity.get(item['url'], 0) for item in items], dtype=np.float32))
+
+        # skill -> indices of the items teaching it, for the coverage column
+        self.skill_items = {}
+        for i, skills in enumerate(self.skills):
+            for skill in skills:
+                self.skill_items.setdefault(skill, []).append(i)
+
+    @classmethod
+    def from_database(cls, database=DATABASE):
+        conn = sqlite3.connect(database)
+        items = [dict(zip(ITEM_FIELDS, row), is_free=0)
+                 for row in conn.execute("""
+                     SELECT name, skill, specialization, platform, url, difficulty, instructor,
+                            duration, description, rating
+                     FROM courses
+                 """)]
+        if table_exists(conn, 'free_courses'):
+            items += [dict(zip(ITEM_FIELDS, row), is_free=1)
+                      for row in conn.execute("""
+                          SELECT title, LOWER(topic), specialization, platform, url, skill_level, instructor,
+                                 duration, description, rating
+                          FROM free_courses
+                      """)]
+        popularity = dict(conn.execute("SELECT item_url, users FROM cf_item_counts")) \
+            if table_exists(conn, 'cf_item_counts') else {}
+        conn.close()
+        return cls(items, popularity)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """The same catalog as from_database, decoded from a CatalogSnapshot.Snapshot."""
+        items = []
+        for table, columns, is_free in (('courses', ITEM_FIELDS, 0), ('free_courses', FREE_COURSE_COLUMNS, 1)):
+            if snapshot.has_table(table):
+                values = [snapshot.column(table, column) for column in columns]
+                items += [dict(zip(ITEM_FIELDS, row), is_free=is_free) for row in zip(*values)]
+        popularity = {}
+        if snapshot.has_table('cf_item_counts'):
+            popularity = dict(zip(snapshot.column('cf_item_counts', 'item_url'),
+                                  snapshot.column('cf_item_counts', 'users')))
+        return cls(items, popularity)
+
+    def coverage(self, missing_skills):
+        """Per-item count of missing skills taught, scaled so the best item is 1."""
+        covered = np.zeros(len(self.items), dtype=np.float32)
+        for skill in missing_skills:
+            covered[self.skill_items.get(skill, [])] += 1
+        top = covered.max() if len(covered) else 0
+        return covered / top if top > 0 else covered
+
+    def scores(self, missing_skills=(), level=None, weights=None):
+        """Score of every catalog item under weights (a dict over FEATURES)."""
+        weights = weights or DEFAULT_WEIGHTS
+        user_level = level_index(level)
+        w = np.zeros(len(STATIC_COLUMNS), dtype=np.float32)
+        w[0] = weights['rating']
+        # Without a known level every item fits equally well, so the column is left out
+        if user_level is not None:
+            w[1 + user_level] = weights['difficulty_fit']
+        w[4] = weights['duration']
+        w[5] = weights['is_free']
+        w[6] = weights['popularity']
+        return self.static @ w + weights['skill_coverage'] * self.coverage(missing_skills)
+
+    def rank(self, specialization=None, missing_skills=(), level=None, weights=None, k=3, free=None):
+        """Top-k items of the specialization (all if None), only free or only paid ones unless free is None."""
+        scores = self.scores(set(missing_skills), level, weights)
+        candidates = np.ones(len(self.items), dtype=bool)
+        if specialization is not None:
+            candidates &= self.specializations == specialization
+        if free is not None:
+            candidates &= self.static[:, 5] == (1 if free else 0)
+        scores = np.where(candidates, scores, -np.inf)
+
+        k = min(k, int(candidates.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [RankedCourseRow(*(self.items[i][field] for field in RankedCourseRow.__slots__[:-1]),
+                                round(float(scores[i]), 4)) for i in top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank catalog courses for a specialization")
+    parser.add_argument("specialization")
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--missing", default="", help="comma separated missing skills")
+    parser.add_argument("--level", choices=LEVELS)
+    parser.add_argument("--weights", default="{}", help="JSON object of feature weights")
+    parser.add_argument("--free", action="store_true", help="rank free courses instead of paid ones")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    ranker = CourseRanker.from_database(args.db)
+    for course in ranker.rank(args.specialization, split_skills(args.missing), args.level,
+                              parse_weights(json.loads(args.weights)), args.k, free=args.free):
+        print(f"{course.score:7.3f}  {course.name} [{course.difficulty}, {course.duration}]")
+
+
+if __name__ == '__main__':
+    main()
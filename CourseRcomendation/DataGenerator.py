@@ -0,0 +1,343 @@
+"""Synthetic data generator for scale testing the career advisor.
+
+Copies the schema of an existing course_recommendations.db into a new file and
+fills it with millions of professionals, courses and learning resources whose
+distributions are modelled on the rows already in the source database.
+
+    python DataGenerator.py scale.db --professionals 5000000 --courses 2000000 --resources 3000000
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+DATABASE = 'course_recommendations.db'
+BATCH_SIZE = 50000
+
+# Secondary indexes are created only after the bulk load so SQLite does not
+# have to maintain them row by row while inserting.
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_users_specialization ON users (specialization)",
+    "CREATE INDEX IF NOT EXISTS idx_professionals_specialization ON professionals (specialization)",
+    "CREATE INDEX IF NOT EXISTS idx_courses_specialization_rating ON courses (specialization, rating DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_learning_resources_skill ON learning_resources (skill)",
+    "CREATE INDEX IF NOT EXISTS idx_skill_details_skill ON skill_details (skill)",
+]
+
+# Small reference tables that are copied verbatim instead of being synthesized
+COPIED_TABLES = ['skill_details', 'free_courses', 'profile_details']
+
+COURSE_SUFFIXES = ["Fundamentals", "Masterclass", "Bootcamp", "Specialization",
+                   "in Practice", "for Professionals", "Deep Dive", "Complete Guide"]
+
+
+class Categorical:
+    """Weighted sampler over values observed in the source database."""
+
+    def __init__(self, values):
+        counts = {}
+        for value in values:
+            counts[value] = counts.get(value, 0) + 1
+        if not counts:
+            raise ValueError("cannot model an empty column")
+        self.values = list(counts)
+        self.cum_weights = []
+        total = 0
+        for value in self.values:
+            total += counts[value]
+            self.cum_weights.append(total)
+
+    def sample(self, rng):
+        return rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+    def sample_many(self, rng, k):
+        return rng.choices(self.values, cum_weights=self.cum_weights, k=k)
+
+
+class Gaussian:
+    """Normal distribution fitted to a numeric column and clipped to its range."""
+
+    def __init__(self, values, digits=1):
+        values = [float(v) for v in values if v is not None]
+        if not values:
+            raise ValueError("cannot model an empty column")
+        self.mean = sum(values) / len(values)
+        variance = sum((v - self.mean) ** 2 for v in values) / len(values)
+        self.std = max(variance ** 0.5, 0.05)
+        self.low = min(values)
+        self.high = max(values)
+        self.digits = digits
+
+    def sample(self, rng):
+        value = min(max(rng.gauss(self.mean, self.std), self.low), self.high)
+        return round(value, self.digits)
+
+
+def split_skills(skills):
+    return [skill.strip().lower() for skill in skills.split(",") if skill.strip()]
+
+
+def table_exists(conn, table):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    return row is not None
+
+
+def fit_people(people):
+    """Fit name, skill, experience and company distributions per specialization."""
+    first_names, last_names, specializations = [], [], []
+    skills_by_spec, counts_by_spec, companies_by_spec, experience = {}, {}, {}, []
+    for name, skills, specialization, experience_years, company in people:
+        parts = name.split()
+        first_names.append(parts[0])
+        last_names.append(parts[-1])
+        specializations.append(specialization)
+        prof_skills = split_skills(skills)
+        skills_by_spec.setdefault(specialization, []).extend(prof_skills)
+        counts_by_spec.setdefault(specialization, []).append(len(prof_skills))
+        companies_by_spec.setdefault(specialization, []).append(company or "Independent")
+        if experience_years is not None:
+            experience.append(experience_years)
+
+    return {
+        'first_name': Categorical(first_names),
+        'last_name': Categorical(last_names),
+        'specialization': Categorical(specializations),
+        'skills': {spec: Categorical(values) for spec, values in skills_by_spec.items()},
+        'skill_count': {spec: Categorical(values) for spec, values in counts_by_spec.items()},
+        'company': {spec: Categorical(values) for spec, values in companies_by_spec.items()},
+        'experience_years': Categorical(experience),
+    }
+
+
+def load_profile(conn):
+    """Fit the per-column distributions used by the generators."""
+    profile = {}
+
+    profile['users'] = fit_people(conn.execute(
+        "SELECT name, skills, specialization, experience_years, company FROM users"
+    ).fetchall())
+    profile['professionals'] = profile['users']
+    if table_exists(conn, 'professionals'):
+        profile['professionals'] = fit_people(conn.execute(
+            "SELECT name, skills, specialization, experience_years, company FROM professionals"
+        ).fetchall())
+        rows = conn.execute("SELECT role, achievements, certifications FROM professionals").fetchall()
+        profile['role'] = Categorical([row[0] for row in rows])
+        profile['achievements'] = Categorical([row[1] for row in rows])
+        profile['certifications'] = Categorical([row[2] for row in rows])
+
+    courses = conn.execute(
+        "SELECT skill, specialization, platform, difficulty, instructor, duration, description, rating FROM courses"
+    ).fetchall()
+    course_skills = {}
+    for row in courses:
+        course_skills.setdefault(row[1], []).append(row[0])
+    # skill_details carries far more skills per specialization than courses do
+    if table_exists(conn, 'skill_details'):
+        for skill, specialization in conn.execute("SELECT skill, specialization FROM skill_details"):
+            course_skills.setdefault(specialization, []).append(skill.lower())
+    profile['course_skill'] = {spec: Categorical(values) for spec, values in course_skills.items()}
+    profile['course_specialization'] = Categorical([row[1] for row in courses])
+    profile['course_platform'] = Categorical([row[2] for row in courses])
+    profile['course_difficulty'] = Categorical([row[3] for row in courses])
+    profile['course_instructor'] = Categorical([row[4] for row in courses])
+    profile['course_duration'] = Categorical([row[5] for row in courses])
+    profile['course_description'] = Categorical([row[6] for row in courses])
+    profile['course_rating'] = Gaussian([row[7] for row in courses])
+
+    if table_exists(conn, 'learning_resources'):
+        resources = conn.execute("""
+            SELECT skill, type, platform, duration, difficulty, rating, description,
+                   instructor, is_free, language, subtitles, topics
+            FROM learning_resources
+        """).fetchall()
+        columns = ['skill', 'type', 'platform', 'duration', 'difficulty', 'rating', 'description',
+                   'instructor', 'is_free', 'language', 'subtitles', 'topics']
+        for index, column in enumerate(columns):
+            values = [row[index] for row in resources]
+            if column == 'rating':
+                profile['resource_rating'] = Gaussian(values)
+            else:
+                profile['resource_' + column] = Categorical(values)
+
+    return profile
+
+
+def copy_schema(source, target):
+    """Create every table of the source database in the (empty) target database."""
+    tables = source.execute("""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+    """).fetchall()
+    for name, sql in tables:
+        target.execute(f"DROP TABLE IF EXISTS {name}")
+        target.execute(sql)
+    return [name for name, _ in tables]
+
+
+def generate_people(profile, rng, count, with_details=False):
+    details = profile
+    profile = profile['professionals' if with_details else 'users']
+    for _ in range(count):
+        specialization = profile['specialization'].sample(rng)
+        skill_count = profile['skill_count'][specialization].sample(rng)
+        skills = dict.fromkeys(profile['skills'][specialization].sample_many(rng, skill_count * 2))
+        row = (
+            f"{profile['first_name'].sample(rng)} {profile['last_name'].sample(rng)}",
+            ",".join(list(skills)[:skill_count]),
+            specialization,
+            profile['experience_years'].sample(rng),
+            profile['company'][specialization].sample(rng),
+        )
+        if with_details:
+            row += (
+                details['role'].sample(rng),
+                details['achievements'].sample(rng),
+                details['certifications'].sample(rng),
+            )
+        yield row
+
+
+def generate_courses(profile, rng, count):
+    for index in range(count):
+        specialization = profile['course_specialization'].sample(rng)
+        skill = profile['course_skill'][specialization].sample(rng)
+        platform = profile['course_platform'].sample(rng)
+        yield (
+            f"{skill.title()} {rng.choice(COURSE_SUFFIXES)}",
+            skill,
+            specialization,
+            platform,
+            f"https://courses.example.com/{platform.lower().replace(' ', '-')}/{index}",
+            profile['course_difficulty'].sample(rng),
+            profile['course_instructor'].sample(rng),
+            profile['course_duration'].sample(rng),
+            profile['course_description'].sample(rng),
+            profile['course_rating'].sample(rng),
+        )
+
+
+def generate_resources(profile, rng, count):
+    for index in range(count):
+        skill = profile['resource_skill'].sample(rng)
+        platform = profile['resource_platform'].sample(rng)
+        yield (
+            skill,
+            f"{skill.title()} {rng.choice(COURSE_SUFFIXES)}",
+            profile['resource_type'].sample(rng),
+            platform,
+            f"https://learn.example.com/{platform.lower().replace(' ', '-')}/{index}",
+            profile['resource_duration'].sample(rng),
+            profile['resource_difficulty'].sample(rng),
+            profile['resource_rating'].sample(rng),
+            profile['resource_description'].sample(rng),
+            profile['resource_instructor'].sample(rng),
+            profile['resource_is_free'].sample(rng),
+            profile['resource_language'].sample(rng),
+            profile['resource_subtitles'].sample(rng),
+            profile['resource_topics'].sample(rng),
+        )
+
+
+def bulk_insert(conn, sql, rows, batch_size=BATCH_SIZE):
+    """Insert rows with executemany in fixed-size batches; returns the row count."""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        total += len(batch)
+    return total
+
+
+def generate(target_path, source_path=DATABASE, users=0, professionals=0, courses=0,
+             resources=0, seed=0, batch_size=BATCH_SIZE):
+    """Build a synthetic database at target_path modelled on source_path."""
+    rng = random.Random(seed)
+    source = sqlite3.connect(source_path)
+    profile = load_profile(source)
+
+    # isolation_level=None lets us manage the single bulk transaction ourselves
+    conn = sqlite3.connect(target_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+    conn.execute("BEGIN")
+    tables = copy_schema(source, conn)
+    for table in COPIED_TABLES:
+        if table in tables:
+            rows = source.execute(f"SELECT * FROM {table}").fetchall()
+            if rows:
+                placeholders = ", ".join("?" * len(rows[0]))
+                conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+    source.close()
+
+    jobs = [
+        ('users', users, generate_people(profile, rng, users),
+         "INSERT INTO users (name, skills, specialization, experience_years, company) VALUES (?, ?, ?, ?, ?)"),
+        ('courses', courses, generate_courses(profile, rng, courses),
+         """INSERT INTO courses (name, skill, specialization, platform, url, difficulty,
+                instructor, duration, description, rating) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""),
+    ]
+    if 'professionals' in tables:
+        jobs.append(('professionals', professionals, generate_people(profile, rng, professionals, True),
+                     """INSERT INTO professionals (name, skills, specialization, experience_years, company,
+                            role, achievements, certifications) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""))
+    if 'learning_resources' in tables:
+        jobs.append(('learning_resources', resources, generate_resources(profile, rng, resources),
+                     """INSERT INTO learning_resources (skill, title, type, platform, url, duration, difficulty,
+                            rating, description, instructor, is_free, language, subtitles, topics)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""))
+
+    for table, count, rows, sql in jobs:
+        if not count:
+            continue
+        start = time.perf_counter()
+        inserted = bulk_insert(conn, sql, rows, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"Inserted {inserted} {table} rows in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    start = time.perf_counter()
+    for sql in INDEXES:
+        table = sql.split(" ON ")[1].split()[0]
+        if table in tables:
+            conn.execute(sql)
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    print(f"Built indexes in {time.perf_counter() - start:.1f}s")
+
+    # Imported here: SpecializationStats itself imports split_skills from this module
+    import SpecializationStats
+    start = time.perf_counter()
+    SpecializationStats.init_tables(conn)
+    conn.execute("BEGIN")  # committed by refresh()
+    SpecializationStats.refresh(conn, all_specializations=True)
+    print(f"Refreshed specialization stats in {time.perf_counter() - start:.1f}s")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic course_recommendations database")
+    parser.add_argument("target", help="path of the database to create")
+    parser.add_argument("--source", default=DATABASE, help="database whose schema and data are modelled")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--professionals", type=int, default=1000000)
+    parser.add_argument("--courses", type=int, default=100000)
+    parser.add_argument("--resources", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(args.target, args.source, args.users, args.professionals, args.courses,
+             args.resources, args.seed, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
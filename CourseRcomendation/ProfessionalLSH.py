@@ -0,0 +1,235 @@
+"""MinHash LSH index for finding similar professionals across specializations.
+
+Each professional's skill set gets a MinHash signature stored in the database,
+and the signature is split into bands whose hashes are stored as LSH buckets.
+A query only looks at professionals sharing at least one bucket with the user,
+keeps the ``MAX_CANDIDATES`` sharing the most buckets and re-ranks those by
+exact Jaccard similarity, so lookups stay sublinear as the table grows.
+
+Triggers on the source table queue the ids of inserted, updated and deleted
+rows, so an incremental build only touches the rows that changed.
+
+    python ProfessionalLSH.py build            # index new rows of users
+    python ProfessionalLSH.py build --rebuild --table professionals
+"""
+import argparse
+import sqlite3
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from DataGenerator import split_skills
+
+DATABASE = 'course_recommendations.db'
+NUM_PERM = 64
+# 16 bands of 4 rows put the LSH threshold near Jaccard 0.5; narrower bands let a
+# large share of the table through as candidates. An index built with a different
+# layout is rebuilt automatically.
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Candidates sharing the most bands with the query are scored exactly; the rest are skipped
+MAX_CANDIDATES = 1000
+BATCH_SIZE = 10000
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Fixed seed: signatures stored in the database must stay comparable across runs
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, MAX_HASH, size=NUM_PERM, dtype=np.uint64)
+
+
+def signature(skills):
+    """MinHash signature (uint32[NUM_PERM]) of a set of skill names."""
+    hashes = np.array([zlib.crc32(skill.encode('utf-8')) for skill in skills], dtype=np.uint64)
+    if not len(hashes):
+        return np.full(NUM_PERM, MAX_HASH, dtype=np.uint32)
+    # (a * x + b) mod p, truncated to 32 bits; a < 2**31 keeps a * x + b below 2**64
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % MERSENNE_PRIME & MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(sig):
+    """One bucket hash per band of the signature."""
+    sig = np.ascontiguousarray(sig, dtype='<u4')
+    return [zlib.crc32(sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            for band in range(BANDS)]
+
+
+def jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def init_tables(conn, table):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table}_minhash (
+            professional_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table}_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            professional_id INTEGER NOT NULL
+        )
+    ''')
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table}_lsh_pending (professional_id INTEGER PRIMARY KEY)")
+
+
+def trigger_names(table):
+    return [f"{table}_lsh_{action}" for action in ('insert', 'update', 'delete')]
+
+
+def install_change_tracking(conn, table):
+    """Create the triggers that queue changed row ids for the next incremental build."""
+    insert_trigger, update_trigger, delete_trigger = trigger_names(table)
+    conn.executescript(f'''
+        CREATE TRIGGER IF NOT EXISTS {insert_trigger} AFTER INSERT ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO {table}_lsh_pending VALUES (NEW.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS {update_trigger} AFTER UPDATE OF id, skills ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO {table}_lsh_pending VALUES (OLD.id);
+            INSERT OR IGNORE INTO {table}_lsh_pending VALUES (NEW.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS {delete_trigger} AFTER DELETE ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO {table}_lsh_pending VALUES (OLD.id);
+        END;
+    ''')
+
+
+def tracking_installed(conn, table):
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    return all(name in existing for name in trigger_names(table))
+
+
+def _index_rows(conn, table, cursor):
+    """Sign the (id, skills) rows of cursor and store their buckets; returns the number indexed."""
+    indexed = 0
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        signatures, buckets = [], []
+        for professional_id, skills in rows:
+            sig = signature(set(split_skills(skills)))
+            signatures.append((professional_id, sig.astype('<u4').tobytes()))
+            buckets.extend((band, bucket, professional_id) for band, bucket in enumerate(band_buckets(sig)))
+        conn.executemany(f"INSERT INTO {table}_minhash (professional_id, signature) VALUES (?, ?)", signatures)
+        conn.executemany(f"INSERT INTO {table}_lsh (band, bucket, professional_id) VALUES (?, ?, ?)", buckets)
+        indexed += len(rows)
+    return indexed
+
+
+def _forget(conn, table, ids):
+    """Remove the signatures and buckets of ids, found through their stored signatures."""
+    placeholders = ", ".join("?" * len(ids))
+    buckets = []
+    for professional_id, blob in conn.execute(f"""
+        SELECT professional_id, signature FROM {table}_minhash WHERE professional_id IN ({placeholders})
+    """, ids):
+        sig = np.frombuffer(blob, dtype='<u4')
+        buckets.extend((band, bucket, professional_id) for band, bucket in enumerate(band_buckets(sig)))
+    conn.executemany(f"DELETE FROM {table}_lsh WHERE band = ? AND bucket = ? AND professional_id = ?", buckets)
+    conn.execute(f"DELETE FROM {table}_minhash WHERE professional_id IN ({placeholders})", ids)
+
+
+def build_index(conn, table='users', rebuild=False):
+    """Index the rows of table changed since the last build (or all); returns the number indexed."""
+    init_tables(conn, table)
+    highest_band = conn.execute(f"SELECT MAX(band) FROM {table}_lsh").fetchone()[0]
+    # Superseded by idx_{table}_lsh_lookup, which also covers professional_id
+    conn.execute(f"DROP INDEX IF EXISTS idx_{table}_lsh_bucket")
+    # Buckets of another band layout never match a query, and triggers are needed to know what changed
+    full = rebuild or (highest_band is not None and highest_band != BANDS - 1) or not tracking_installed(conn, table)
+    install_change_tracking(conn, table)
+
+    if full:
+        conn.execute(f"DROP INDEX IF EXISTS idx_{table}_lsh_lookup")
+        conn.execute(f"DELETE FROM {table}_minhash")
+        conn.execute(f"DELETE FROM {table}_lsh")
+        conn.execute(f"DELETE FROM {table}_lsh_pending")
+        indexed = _index_rows(conn, table, conn.execute(f"SELECT id, skills FROM {table}"))
+        conn.execute(f"CREATE INDEX idx_{table}_lsh_lookup ON {table}_lsh (band, bucket, professional_id)")
+        conn.commit()
+        return indexed
+
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_lsh_lookup ON {table}_lsh (band, bucket, professional_id)")
+    # Held from reading the queue to clearing it, so no change queued in between is lost
+    conn.execute("BEGIN IMMEDIATE")
+    pending = [row[0] for row in conn.execute(f"SELECT professional_id FROM {table}_lsh_pending")]
+    indexed = 0
+    for start in range(0, len(pending), 900):
+        ids = pending[start:start + 900]
+        _forget(conn, table, ids)
+        indexed += _index_rows(conn, table, conn.execute(f"""
+            SELECT id, skills FROM {table} WHERE id IN ({", ".join("?" * len(ids))})
+        """, ids))
+    conn.execute(f"DELETE FROM {table}_lsh_pending")
+    conn.commit()
+    return indexed
+
+
+def similar_professionals(conn, skills, k=5, table='users', exclude_specialization=None):
+    """Top-k professionals by Jaccard similarity among the LSH candidates for skills."""
+    skills = set(skills)
+    if not skills:
+        return []
+    buckets = band_buckets(signature(skills))
+    values = ", ".join(["(?, ?)"] * BANDS)
+    params = [value for pair in enumerate(buckets) for value in pair]
+    # Counted here rather than with GROUP BY, which would add a temp B-tree per query;
+    # sharing more bands means a higher estimated similarity
+    shared_bands = Counter(row[0] for row in conn.execute(f"""
+        SELECT l.professional_id FROM {table}_lsh l
+        JOIN (VALUES {values}) q ON l.band = q.column1 AND l.bucket = q.column2
+    """, params))
+    candidate_ids = [professional_id for professional_id, _ in shared_bands.most_common(MAX_CANDIDATES)]
+
+    scored = []
+    for start in range(0, len(candidate_ids), 900):
+        chunk = candidate_ids[start:start + 900]
+        rows = conn.execute(f"""
+            SELECT name, skills, specialization, experience_years, company FROM {table}
+            WHERE id IN ({", ".join("?" * len(chunk))})
+        """, chunk)
+        for name, prof_skills, specialization, experience_years, company in rows:
+            if specialization == exclude_specialization:
+                continue
+            prof_skills = set(split_skills(prof_skills))
+            scored.append((jaccard(skills, prof_skills), name, prof_skills, specialization,
+                           experience_years, company))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [{
+        "name": name,
+        "specialization": specialization,
+        "common_skills": sorted(skills & prof_skills),
+        "jaccard": round(score * 100, 1),
+        "experience_years": experience_years,
+        "company": company,
+    } for score, name, prof_skills, specialization, experience_years, company in scored[:k]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the MinHash LSH index of professionals")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--table", choices=["users", "professionals"], default="users")
+    parser.add_argument("--rebuild", action="store_true", help="discard existing signatures first")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    start = time.perf_counter()
+    indexed = build_index(conn, args.table, args.rebuild)
+    conn.close()
+    print(f"Indexed {indexed} {args.table} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Query-plan auditing for the career advisor's SQLite access.
+
+Connections opened with ``factory=AuditingConnection`` record the
+``EXPLAIN QUERY PLAN`` of every distinct statement they run, together with how
+often it ran and how long it took. The recorded log can be turned into a
+report that flags full table scans and temporary sort B-trees and suggests
+covering indexes, or checked against a database to fail when a hot query has
+regressed to a scan.
+
+    QUERY_AUDIT=query_audit.json python CareerPath.py     # record while serving
+    python QueryAudit.py report query_audit.json
+    python QueryAudit.py check query_audit.json --db course_recommendations.db
+"""
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+DATABASE = 'course_recommendations.db'
+# Statements run at least this often are treated as hot by the check command; one-off
+# init and maintenance statements (index rebuilds, cleanup DELETEs) stay below it
+HOT_QUERY_MIN_CALLS = 5
+# Bookkeeping tables that hold a handful of rows and are meant to be read whole
+SMALL_TABLES = {'spec_stats_dirty', 'static_export_changes', 'user_recommendations_versions',
+                'users_lsh_pending', 'professionals_lsh_pending'}
+PLANNED_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def normalize_sql(sql):
+    return " ".join(sql.split())
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines of a statement."""
+    # A plain cursor keeps the EXPLAIN itself out of the audit log
+    cursor = sqlite3.Cursor(conn)
+    return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def plan_problems(plan):
+    """Plan steps that mean a full scan or an extra sort pass.
+
+    Scans of subqueries, CTEs and VALUES lists (already built in memory) and
+    of the SMALL_TABLES are not problems.
+    """
+    materialized = {step.split(" ", 1)[1] for step in plan if step.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+    problems = []
+    for step in plan:
+        if step.startswith("SCAN") and "USING" not in step and "CONSTANT ROW" not in step:
+            name = step.split(" ")[1] if " " in step else ""
+            if name not in materialized and name not in SMALL_TABLES and not name.startswith("("):
+                problems.append(step)
+        elif "TEMP B-TREE" in step:
+            problems.append(step)
+    return problems
+
+
+class QueryLog:
+    """Thread-safe record of every distinct statement seen by auditing connections."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = {}
+
+    def record(self, conn, sql, params, elapsed):
+        key = normalize_sql(sql)
+        with self.lock:
+            entry = self.queries.get(key)
+            if entry is None:
+                entry = self.queries[key] = {'sql': key, 'calls': 0, 'total_ms': 0.0, 'plan': []}
+                if key.split(" ", 1)[0].upper() in PLANNED_STATEMENTS:
+                    try:
+                        entry['plan'] = explain(conn, sql, params)
+                    except sqlite3.Error as e:
+                        entry['plan'] = [f"EXPLAIN failed: {e}"]
+                entry['problems'] = plan_problems(entry['plan'])
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed * 1000
+
+    def entries(self):
+        with self.lock:
+            return [dict(entry) for entry in self.queries.values()]
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries(), f, indent=2)
+
+    def clear(self):
+        with self.lock:
+            self.queries.clear()
+
+
+QUERY_LOG = QueryLog()
+
+
+class AuditingCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        QUERY_LOG.record(self.connection, sql, parameters, time.perf_counter() - start)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        params = seq_of_parameters[0] if seq_of_parameters else ()
+        QUERY_LOG.record(self.connection, sql, params, time.perf_counter() - start)
+        return result
+
+
+class AuditingConnection(sqlite3.Connection):
+    """Drop-in sqlite3 connection whose cursors record query plans into QUERY_LOG."""
+
+    def cursor(self, factory=AuditingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def suggest_index(sql):
+    """Suggest a covering index for a simple single-table SELECT, or None."""
+    match = re.match(r"SELECT (?P<columns>.+?) FROM (?P<table>\w+)(?P<rest>.*)$", sql, re.IGNORECASE)
+    if not match or re.search(r"\bJOIN\b|,\s*\w+\s+(WHERE|ORDER|$)", match.group('rest'), re.IGNORECASE):
+        return None
+    table, rest = match.group('table'), match.group('rest')
+    where = re.search(r"\bWHERE (.+?)(\bORDER BY\b|\bGROUP BY\b|\bLIMIT\b|$)", rest, re.IGNORECASE)
+    equality = re.findall(r"(\w+)\s*=\s*\?", where.group(1)) if where else []
+    ranges = re.findall(r"(\w+)\s*(?:<|>|<=|>=|BETWEEN|LIKE)\s*", where.group(1)) if where else []
+    order = re.search(r"\bORDER BY (.+?)(\bLIMIT\b|$)", rest, re.IGNORECASE)
+    order_terms = [term.strip() for term in order.group(1).split(",")] if order else []
+
+    key = list(dict.fromkeys(equality))
+    for term in order_terms:
+        column = term.split()[0]
+        if column not in key:
+            key.append(term)
+    for column in ranges:
+        if column not in key:
+            key.append(column)
+    if not key:
+        return None
+
+    covered = [column.split()[0] for column in key]
+    selected = match.group('columns')
+    if selected.strip() != "*":
+        extra = [c.strip() for c in selected.split(",") if re.fullmatch(r"\w+", c.strip())]
+        key += [c for c in extra if c not in covered]
+    name = "idx_{}_{}".format(table, "_".join(column.split()[0] for column in key[:3]))
+    return f"CREATE INDEX {name} ON {table} ({', '.join(key)})"
+
+
+def build_report(entries):
+    """Render the recorded statements, their plans and index suggestions as text."""
+    entries = sorted(entries, key=lambda e: e['total_ms'], reverse=True)
+    flagged = [e for e in entries if e.get('problems')]
+    lines = [f"Query plan audit: {len(entries)} distinct statements, {len(flagged)} flagged", ""]
+    for entry in entries:
+        status = "FLAGGED" if entry.get('problems') else "ok"
+        lines.append(f"[{status}] {entry['calls']} calls, {entry['total_ms']:.1f} ms total")
+        lines.append(f"    {entry['sql']}")
+        for step in entry['plan']:
+            marker = "!!" if step in entry.get('problems', []) else "  "
+            lines.append(f"    {marker} {step}")
+        if entry.get('problems'):
+            suggestion = suggest_index(entry['sql'])
+            if suggestion:
+                lines.append(f"    suggested: {suggestion}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def check(entries, database=DATABASE, min_calls=HOT_QUERY_MIN_CALLS):
+    """Re-plan hot recorded statements against database; return the ones that scan."""
+    conn = sqlite3.connect(database)
+    regressions = []
+    for entry in entries:
+        if entry['calls'] < min_calls or entry['sql'].split(" ", 1)[0].upper() not in PLANNED_STATEMENTS:
+            continue
+        # Plans do not depend on parameter values, so NULL placeholders are enough
+        params = (None,) * entry['sql'].count("?")
+        try:
+            problems = plan_problems(explain(conn, entry['sql'], params))
+        except sqlite3.Error as e:
+            problems = [f"EXPLAIN failed: {e}"]
+        if problems:
+            regressions.append((entry['sql'], problems))
+    conn.close()
+    return regressions
+
+
+def load_entries(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit the query plans of recorded SQL statements")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="print plans, flagged steps and index suggestions")
+    report_parser.add_argument("log", help="JSON log written by an audited run")
+    check_parser = subparsers.add_parser("check", help="exit non-zero if a hot query plans to a scan")
+    check_parser.add_argument("log", help="JSON log written by an audited run")
+    check_parser.add_argument("--db", default=DATABASE)
+    check_parser.add_argument("--min-calls", type=int, default=HOT_QUERY_MIN_CALLS)
+    args = parser.parse_args()
+
+    entries = load_entries(args.log)
+    if args.command == "report":
+        print(build_report(entries))
+        return
+
+    regressions = check(entries, args.db, args.min_calls)
+    for sql, problems in regressions:
+        print(f"SCAN REGRESSION: {sql}")
+        for step in problems:
+            print(f"    {step}")
+    if regressions:
+        sys.exit(1)
+    print("All hot queries use indexes")
+
+
+if __name__ == '__main__':
+    main()
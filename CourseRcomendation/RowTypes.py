@@ -0,0 +1,69 @@
+"""Compact row objects and a fast JSON path for API responses.
+
+Rows come straight out of sqlite as ``__slots__`` objects (via
+``cursor.row_factory = ProfessionalRow.from_row``) instead of tuples that are
+later copied into dicts, and responses are encoded directly into one bytes
+buffer. Ranked courses use CourseRanker.RankedCourseRow, built on ``Row``.
+``ndjson_lines`` encodes one object per line for streamed responses.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Row:
+    """Base class for slot-based rows; subclasses only declare __slots__."""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row_factory building instances of cls."""
+        return cls(*row)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+class ProfessionalRow(Row):
+    __slots__ = ('name', 'skills', 'experience_years', 'company')
+
+
+class ProfileComparison(Row):
+    __slots__ = ('name', 'common_skills', 'missing_skills', 'similarity_score',
+                 'experience_years', 'company')
+
+
+def _default(obj):
+    if isinstance(obj, Row):
+        return obj.to_dict()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Row objects are never self-referencing, so skip the circular-reference bookkeeping
+_encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(',', ':'), default=_default)
+
+
+def dumps(obj):
+    """Encode obj as UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return _encoder.encode(obj).encode('utf-8')
+
+
+def ndjson_lines(objects):
+    """Yield each object as one newline-terminated JSON line."""
+    for obj in objects:
+        yield dumps(obj) + b'\n'
@@ -0,0 +1,277 @@
+"""Professionals split across several SQLite files, routed by specialization.
+
+``split`` copies the users (or professionals) table into shard files, either
+one file per specialization or ``--shards N`` files chosen by a hash of the
+specialization. Either way every specialization lives in exactly one shard, so
+single-specialization reads and writes touch one file. Queries that span all
+specializations (global skill search, cross-specialization LSH matching) run
+on every shard in parallel threads and the per-shard top-k lists are merged.
+
+Each shard keeps its own SpecializationStats summary tables, refreshed by
+``split`` and ``insert``, so per-specialization stats are read from the same
+file as the professionals.
+
+Shard files are numbered (``users-000.db``, ...); ``shards.json`` inside the
+shard directory records which specialization each one holds, along with the
+next free professional id: inserts take ids from that one counter, so
+ids stay unique across shards however many are added later.
+
+    python ShardedStore.py split shards/ --mode specialization
+    python ShardedStore.py split shards/ --mode hash --shards 16 --table professionals
+    python ShardedStore.py search shards/ "python, sql" -k 10
+"""
+import argparse
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import ProfessionalLSH
+import SpecializationStats
+from DataGenerator import BATCH_SIZE, split_skills
+
+DATABASE = 'course_recommendations.db'
+SHARD_MAP = 'shards.json'
+MODES = ('specialization', 'hash')
+
+
+def hash_shard(specialization, shards):
+    return zlib.crc32(str(specialization).encode('utf-8')) % shards
+
+
+def shard_file(table, index):
+    # Named by position rather than by specialization, so distinct values can never share a file
+    return f"{table}-{index:03d}.db"
+
+
+def shard_ddl(source, table):
+    return source.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+
+
+def init_shard(path, ddl, table):
+    conn = sqlite3.connect(path)
+    conn.execute(ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_specialization ON {table} (specialization)")
+    SpecializationStats.init_tables(conn, table)
+    return conn
+
+
+def write_shard_map(directory, shard_map):
+    path = os.path.join(directory, SHARD_MAP)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(shard_map, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def route(shard_map, specialization):
+    """Index of the shard holding specialization, or None if no shard has it yet."""
+    if shard_map['mode'] == 'hash':
+        return hash_shard(specialization, len(shard_map['files']))
+    return shard_map['routes'].get(specialization)
+
+
+def split(source_path, directory, table='users', mode='specialization', shards=8):
+    """Copy table from source_path into shard files under directory; returns the shard map."""
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    os.makedirs(directory, exist_ok=True)
+    source = sqlite3.connect(source_path)
+    ddl = shard_ddl(source, table)
+    columns = [row[1] for row in source.execute(f"PRAGMA table_info({table})")]
+    specializations = [row[0] for row in source.execute(f"SELECT DISTINCT specialization FROM {table}")]
+    max_id = source.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+    if mode == 'hash':
+        files = [shard_file(table, index) for index in range(shards)]
+        routes = {}
+    else:
+        files = [shard_file(table, index) for index in range(len(specializations))]
+        routes = {specialization: index for index, specialization in enumerate(specializations)}
+
+    shard_map = {'table': table, 'mode': mode, 'files': files, 'routes': routes,
+                 'id_floor': max_id, 'next_id': max_id + 1}
+    insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for index, name in enumerate(files):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+        conn = init_shard(path, ddl, table)
+        owned = [s for s in specializations if route(shard_map, s) == index]
+        for specialization in owned:
+            cursor = source.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE specialization = ?",
+                                    (specialization,))
+            while True:
+                rows = cursor.fetchmany(BATCH_SIZE)
+                if not rows:
+                    break
+                conn.executemany(insert_sql, rows)
+        conn.commit()
+        SpecializationStats.refresh(conn, table, all_specializations=True)
+        ProfessionalLSH.build_index(conn, table, rebuild=True)
+        conn.close()
+    source.close()
+    write_shard_map(directory, shard_map)
+    return shard_map
+
+
+class ShardedStore:
+    def __init__(self, directory, max_workers=None):
+        self.directory = directory
+        with open(os.path.join(directory, SHARD_MAP), encoding='utf-8') as f:
+            self.shard_map = json.load(f)
+        self.table = self.shard_map['table']
+        self.executor = ThreadPoolExecutor(max_workers or len(self.shard_map['files']) or 1,
+                                           thread_name_prefix="shard")
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+        if 'next_id' not in self.shard_map:
+            # Maps written before the counter existed: continue above every id in any shard
+            self.shard_map['next_id'] = max([self.shard_map['id_floor']] + self.fan_out(
+                lambda conn: conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self.table}").fetchone()[0])) + 1
+
+    def path(self, index):
+        return os.path.join(self.directory, self.shard_map['files'][index])
+
+    def connection_for(self, specialization):
+        """A new connection to the shard of specialization, or None if it has no shard."""
+        index = route(self.shard_map, specialization)
+        return sqlite3.connect(self.path(index)) if index is not None else None
+
+    def _shard_connection(self, index):
+        # Fan-out workers are long-lived threads, so they keep one connection per shard
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+        if index not in connections:
+            connections[index] = sqlite3.connect(self.path(index))
+        return connections[index]
+
+    def fan_out(self, fn, *args):
+        """Run fn(conn, *args) on every shard in parallel; returns the per-shard results."""
+        futures = [self.executor.submit(lambda i: fn(self._shard_connection(i), *args), index)
+                   for index in range(len(self.shard_map['files']))]
+        return [future.result() for future in futures]
+
+    def professionals(self, specialization):
+        conn = self.connection_for(specialization)
+        if conn is None:
+            return []
+        try:
+            return conn.execute(f"""
+                SELECT name, skills, experience_years, company FROM {self.table} WHERE specialization = ?
+            """, (specialization,)).fetchall()
+        finally:
+            conn.close()
+
+    def _search_shard(self, conn, skills, k):
+        scored = []
+        for name, prof_skills, specialization, experience_years, company in conn.execute(
+            f"SELECT name, skills, specialization, experience_years, company FROM {self.table}"
+        ):
+            prof_skills = set(split_skills(prof_skills))
+            common = skills & prof_skills
+            if common:
+                scored.append((ProfessionalLSH.jaccard(skills, prof_skills), name, sorted(common),
+                               specialization, experience_years, company))
+        return heapq.nlargest(k, scored, key=lambda item: item[0])
+
+    def search(self, skills, k=10):
+        """Top-k professionals of any specialization by exact Jaccard similarity to skills."""
+        skills = set(skills)
+        if not skills:
+            return []
+        merged = heapq.nlargest(k, (item for shard in self.fan_out(self._search_shard, skills, k)
+                                    for item in shard), key=lambda item: item[0])
+        return [{
+            "name": name,
+            "specialization": specialization,
+            "common_skills": common,
+            "jaccard": round(score * 100, 1),
+            "experience_years": experience_years,
+            "company": company,
+        } for score, name, common, specialization, experience_years, company in merged]
+
+    def similar_professionals(self, skills, k=5, exclude_specialization=None):
+        """ProfessionalLSH.similar_professionals over every shard, merged by Jaccard."""
+        results = self.fan_out(ProfessionalLSH.similar_professionals, skills, k, self.table, exclude_specialization)
+        return heapq.nlargest(k, (item for shard in results for item in shard), key=lambda item: item["jaccard"])
+
+    def insert(self, rows):
+        """Insert (name, skills, specialization, experience_years, company) rows into their shards."""
+        columns = ['id', 'name', 'skills', 'specialization', 'experience_years', 'company']
+        by_shard = {}
+        with self.write_lock:
+            next_id = self.shard_map['next_id']
+            for row in rows:
+                index = route(self.shard_map, row[2])
+                if index is None:
+                    index = self._add_shard(row[2])
+                by_shard.setdefault(index, []).append((next_id,) + tuple(row))
+                next_id += 1
+            # The counter is saved before any row is written, so a crash can skip ids but never reuse one
+            self.shard_map['next_id'] = next_id
+            write_shard_map(self.directory, self.shard_map)
+        for index, shard_rows in by_shard.items():
+            conn = sqlite3.connect(self.path(index))
+            # Shards split before they carried summary tables get them here
+            SpecializationStats.init_tables(conn, self.table)
+            with conn:
+                conn.executemany(f"""
+                    INSERT INTO {self.table} ({', '.join(columns)}) VALUES (?, ?, ?, ?, ?, ?)
+                """, shard_rows)
+            SpecializationStats.refresh(conn, self.table)
+            ProfessionalLSH.build_index(conn, self.table)
+            conn.close()
+        return sum(len(shard_rows) for shard_rows in by_shard.values())
+
+    def _add_shard(self, specialization):
+        template = sqlite3.connect(self.path(0))
+        ddl = shard_ddl(template, self.table)
+        template.close()
+        name = shard_file(self.table, len(self.shard_map['files']))
+        path = os.path.join(self.directory, name)
+        # A file by that name is left over from an earlier, larger split and is not part of this map
+        if os.path.exists(path):
+            os.remove(path)
+        init_shard(path, ddl, self.table).close()
+        self.shard_map['files'].append(name)
+        self.shard_map['routes'][specialization] = len(self.shard_map['files']) - 1
+        # Every id below the counter may already be taken in some shard; none is ever handed out again
+        self.shard_map['id_floor'] = max(self.shard_map['id_floor'], self.shard_map['next_id'] - 1)
+        write_shard_map(self.directory, self.shard_map)
+        return self.shard_map['routes'][specialization]
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split professionals into shards and query them")
+    parser.add_argument("command", choices=["split", "search"])
+    parser.add_argument("directory")
+    parser.add_argument("skills", nargs="?", default="", help="comma separated skills for search")
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--table", choices=["users", "professionals"], default="users")
+    parser.add_argument("--mode", choices=MODES, default="specialization")
+    parser.add_argument("--shards", type=int, default=8, help="number of shards in hash mode")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "split":
+        shard_map = split(args.db, args.directory, args.table, args.mode, args.shards)
+        print(f"Split {args.table} into {len(shard_map['files'])} shards in {time.perf_counter() - start:.1f}s")
+    else:
+        store = ShardedStore(args.directory)
+        for match in store.search(split_skills(args.skills), args.k):
+            print(f"{match['jaccard']:5.1f}  {match['name']} ({match['specialization']}, {match['company']})")
+        store.close()
+        print(f"Searched in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""In-memory skill vocabulary index for typeahead and typo correction.
+
+A prefix trie answers autocomplete queries in O(len(prefix)): every node keeps
+the most frequent skills below it, so no subtree walk happens at query time.
+A trigram index finds near matches for misspelt input ("pytorh", "kubernets"),
+which are re-ranked by edit distance and frequency.
+
+The skill frequencies come from SQLite or, counted straight from the skill ids,
+from a CatalogSnapshot.
+"""
+import sqlite3
+
+import numpy as np
+
+from CatalogSnapshot import NULL_ID
+from DataGenerator import split_skills
+
+DATABASE = 'course_recommendations.db'
+# Completions stored per trie node; also the largest limit /skills/autocomplete accepts
+TOP_PER_NODE = 50
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+# (table, column, holds a comma separated list)
+SKILL_SOURCES = [
+    ('skill_details', 'skill', False),
+    ('courses', 'skill', False),
+    ('professionals', 'skills', True),
+    ('users', 'skills', True),
+]
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class TrieNode:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class SkillIndex:
+    def __init__(self, frequencies):
+        self.frequencies = dict(frequencies)
+        self.root = TrieNode()
+        self.trigram_postings = {}
+        self.skill_trigrams = {}
+
+        # Most frequent first, so each node's top list fills in ranked order
+        for skill in sorted(self.frequencies, key=lambda s: (-self.frequencies[s], s)):
+            words = skill.split()
+            # Index every word start so "learning" also completes "machine learning"
+            for start in range(len(words)):
+                self._insert(" ".join(words[start:]), skill)
+            grams = trigrams(skill)
+            self.skill_trigrams[skill] = grams
+            for gram in grams:
+                self.trigram_postings.setdefault(gram, []).append(skill)
+
+    def _insert(self, key, skill):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, TrieNode())
+            if len(node.top) < TOP_PER_NODE and skill not in node.top:
+                node.top.append(skill)
+
+    @classmethod
+    def from_database(cls, database=DATABASE):
+        conn = sqlite3.connect(database)
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        frequencies = {}
+        for table, column, is_list in SKILL_SOURCES:
+            if table not in tables:
+                continue
+            for (value,) in conn.execute(f"SELECT {column} FROM {table}"):
+                for skill in (split_skills(value) if is_list else [value.strip().lower()]):
+                    if skill:
+                        frequencies[skill] = frequencies.get(skill, 0) + 1
+        conn.close()
+        return cls(frequencies)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        counts = np.zeros(snapshot.skill_count, dtype=np.int64)
+        for table, _, _ in SKILL_SOURCES:
+            if snapshot.has_table(table):
+                ids = snapshot.skill_ids(table)
+                counts += np.bincount(ids[ids != NULL_ID], minlength=len(counts))
+        frequencies = {}
+        for skill_id in np.flatnonzero(counts).tolist():
+            skill = snapshot.skill_name(skill_id)
+            if skill:
+                frequencies[skill] = int(counts[skill_id])
+        return cls(frequencies)
+
+    def prefix(self, query, limit=10):
+        node = self.root
+        for char in query.strip().lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top[:limit]
+
+    def fuzzy(self, query, limit=10):
+        """Skills sharing enough trigrams with query, closest and most frequent first."""
+        query = query.strip().lower()
+        grams = trigrams(query)
+        shared = {}
+        for gram in grams:
+            for skill in self.trigram_postings.get(gram, ()):
+                shared[skill] = shared.get(skill, 0) + 1
+        scored = []
+        for skill, count in shared.items():
+            similarity = count / len(grams | self.skill_trigrams[skill])
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored.append((edit_distance(query, skill), -self.frequencies[skill], skill))
+        scored.sort()
+        return [skill for _, _, skill in scored[:limit]]
+
+    def autocomplete(self, query, limit=10):
+        """Prefix matches ranked by frequency, topped up with fuzzy matches for typos."""
+        results = self.prefix(query, limit)
+        if len(results) < limit and len(query.strip()) >= 3:
+            for skill in self.fuzzy(query, limit):
+                if skill not in results:
+                    results.append(skill)
+                    if len(results) == limit:
+                        break
+        return [{"skill": skill, "count": self.frequencies[skill]} for skill in results]
+
+    def canonicalize(self, skill):
+        """Map user input onto a known skill name, leaving unknown skills as typed."""
+        skill = skill.strip().lower()
+        if not skill or skill in self.frequencies:
+            return skill
+        max_distance = max(1, len(skill) // 4)
+        for candidate in self.fuzzy(skill, limit=1):
+            if edit_distance(skill, candidate) <= max_distance:
+                return candidate
+        return skill
@@ -0,0 +1,182 @@
+"""Materialized per-specialization aggregates over the professionals in users.
+
+Summary tables hold, per specialization, how many professionals list each
+skill, the most common companies and an experience histogram. Triggers on the
+source table mark a specialization dirty on every write, and ``refresh()``
+recomputes only dirty specializations. Refreshing is the writers' job (init_db,
+DataGenerator, ShardedStore, the UserRecommendations batch, or this script on a
+schedule for other writes), so readers get the aggregates from a single indexed
+read and never write.
+
+    python SpecializationStats.py refresh          # recompute dirty specializations
+    python SpecializationStats.py refresh --all
+    python SpecializationStats.py refresh --db shards/users-000.db --table users
+"""
+import argparse
+import sqlite3
+
+from DataGenerator import split_skills
+
+DATABASE = 'course_recommendations.db'
+EXPERIENCE_BUCKET_YEARS = 3
+TOP_COMPANIES = 10
+
+
+def init_tables(conn, table='users'):
+    conn.executescript(f'''
+        CREATE TABLE IF NOT EXISTS spec_summary (
+            specialization TEXT PRIMARY KEY,
+            professionals INTEGER NOT NULL,
+            avg_experience REAL
+        );
+        CREATE TABLE IF NOT EXISTS spec_skill_frequency (
+            specialization TEXT NOT NULL,
+            skill TEXT NOT NULL,
+            professionals INTEGER NOT NULL,
+            share REAL NOT NULL,
+            PRIMARY KEY (specialization, skill)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_spec_skill_frequency_rank
+            ON spec_skill_frequency (specialization, professionals DESC);
+        CREATE TABLE IF NOT EXISTS spec_company_counts (
+            specialization TEXT NOT NULL,
+            company TEXT NOT NULL,
+            professionals INTEGER NOT NULL,
+            PRIMARY KEY (specialization, company)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_spec_company_counts_rank
+            ON spec_company_counts (specialization, professionals DESC);
+        CREATE TABLE IF NOT EXISTS spec_experience_histogram (
+            specialization TEXT NOT NULL,
+            min_years INTEGER NOT NULL,
+            professionals INTEGER NOT NULL,
+            PRIMARY KEY (specialization, min_years)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS spec_stats_dirty (
+            specialization TEXT PRIMARY KEY
+        );
+
+        CREATE TRIGGER IF NOT EXISTS {table}_spec_stats_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO spec_stats_dirty (specialization) VALUES (NEW.specialization);
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_spec_stats_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO spec_stats_dirty (specialization) VALUES (OLD.specialization);
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_spec_stats_update AFTER UPDATE ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO spec_stats_dirty (specialization) VALUES (OLD.specialization);
+            INSERT OR IGNORE INTO spec_stats_dirty (specialization) VALUES (NEW.specialization);
+        END;
+    ''')
+
+
+def refresh_specialization(conn, specialization, table='users'):
+    skill_counts, company_counts, histogram = {}, {}, {}
+    total = experience_sum = experience_rows = 0
+    for skills, experience_years, company in conn.execute(
+        f"SELECT skills, experience_years, company FROM {table} WHERE specialization = ?", (specialization,)
+    ):
+        total += 1
+        for skill in set(split_skills(skills)):
+            skill_counts[skill] = skill_counts.get(skill, 0) + 1
+        if company:
+            company_counts[company] = company_counts.get(company, 0) + 1
+        if experience_years is not None:
+            experience_sum += experience_years
+            experience_rows += 1
+            bucket = experience_years // EXPERIENCE_BUCKET_YEARS * EXPERIENCE_BUCKET_YEARS
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    for summary_table in ('spec_summary', 'spec_skill_frequency', 'spec_company_counts', 'spec_experience_histogram'):
+        conn.execute(f"DELETE FROM {summary_table} WHERE specialization = ?", (specialization,))
+    if total:
+        conn.execute("INSERT INTO spec_summary (specialization, professionals, avg_experience) VALUES (?, ?, ?)",
+                     (specialization, total, experience_sum / experience_rows if experience_rows else None))
+        conn.executemany("""
+            INSERT INTO spec_skill_frequency (specialization, skill, professionals, share) VALUES (?, ?, ?, ?)
+        """, [(specialization, skill, count, count / total) for skill, count in skill_counts.items()])
+        top_companies = sorted(company_counts.items(), key=lambda item: item[1], reverse=True)[:TOP_COMPANIES]
+        conn.executemany("INSERT INTO spec_company_counts (specialization, company, professionals) VALUES (?, ?, ?)",
+                         [(specialization, company, count) for company, count in top_companies])
+        conn.executemany("""
+            INSERT INTO spec_experience_histogram (specialization, min_years, professionals) VALUES (?, ?, ?)
+        """, [(specialization, bucket, count) for bucket, count in histogram.items()])
+    conn.execute("DELETE FROM spec_stats_dirty WHERE specialization = ?", (specialization,))
+
+
+def refresh(conn, table='users', all_specializations=False, only=None):
+    """Recompute aggregates for dirty specializations (or all); returns those refreshed."""
+    if all_specializations:
+        specializations = [row[0] for row in conn.execute(f"SELECT DISTINCT specialization FROM {table}")]
+        specializations += [row[0] for row in conn.execute("SELECT specialization FROM spec_summary")]
+    else:
+        specializations = [row[0] for row in conn.execute("SELECT specialization FROM spec_stats_dirty")]
+    if only is not None:
+        specializations = [s for s in specializations if s == only]
+    specializations = list(dict.fromkeys(specializations))
+    for specialization in specializations:
+        refresh_specialization(conn, specialization, table)
+    conn.commit()
+    return specializations
+
+
+def ranked_skills(conn, specialization, exclude=(), limit=20):
+    """Skills of the specialization, most widely held first, skipping those in exclude."""
+    exclude = set(exclude)
+    ranked = []
+    for skill, professionals, share in conn.execute("""
+        SELECT skill, professionals, share FROM spec_skill_frequency
+        WHERE specialization = ? ORDER BY professionals DESC
+    """, (specialization,)):
+        if skill in exclude:
+            continue
+        ranked.append({"skill": skill, "professionals": professionals, "share": round(share * 100, 1)})
+        if len(ranked) == limit:
+            break
+    return ranked
+
+
+def specialization_stats(conn, specialization):
+    summary = conn.execute("SELECT professionals, avg_experience FROM spec_summary WHERE specialization = ?",
+                           (specialization,)).fetchone()
+    if summary is None:
+        return None
+    return {
+        "specialization": specialization,
+        "professionals": summary[0],
+        "avg_experience": round(summary[1], 1) if summary[1] is not None else None,
+        "top_skills": ranked_skills(conn, specialization, limit=10),
+        "top_companies": [{"company": company, "professionals": count} for company, count in conn.execute("""
+            SELECT company, professionals FROM spec_company_counts
+            WHERE specialization = ? ORDER BY professionals DESC
+        """, (specialization,))],
+        "experience_histogram": [{
+            "min_years": min_years,
+            "max_years": min_years + EXPERIENCE_BUCKET_YEARS - 1,
+            "professionals": count,
+        } for min_years, count in conn.execute("""
+            SELECT min_years, professionals FROM spec_experience_histogram
+            WHERE specialization = ? ORDER BY min_years
+        """, (specialization,))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the per-specialization summary tables")
+    parser.add_argument("command", choices=["refresh"])
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--table", choices=["users", "professionals"], default="users")
+    parser.add_argument("--all", action="store_true", help="recompute every specialization")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    init_tables(conn, args.table)
+    refreshed = refresh(conn, args.table, all_specializations=args.all)
+    conn.close()
+    print(f"Refreshed {len(refreshed)} specializations")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""Export user-independent catalog data as precompressed static JSON files.
+
+Per-specialization course lists, per-specialization skill details and per-skill
+learning resources are rendered into content-hashed files
+(``courses/ai.3f9c1a2b4d5e.json``) with a ``.gz`` sibling, plus ``.br`` when
+the brotli package is installed, so a CDN or static file server can serve them
+without Flask. ``manifest.json`` maps each payload to its current file; it is
+the only file that needs a short cache lifetime.
+
+Exports are incremental. Triggers on the source tables mark the groups they
+touch as changed, and only those payloads are re-rendered; a payload whose
+rendered bytes hash the same as before is not rewritten either. Files replaced
+in one export are deleted by the next one, so clients holding the previous
+manifest keep working in between. Pending changes are cleared only once the
+new files and manifest are written, so an interrupted export loses nothing;
+``--full`` also removes stray payload files that no manifest refers to.
+
+    python StaticExport.py static/
+    python StaticExport.py static/ --full
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DATABASE = 'course_recommendations.db'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+
+# payload kind -> (table, column the payload is grouped by, columns exported)
+PAYLOADS = {
+    'courses': ('courses', 'specialization', [
+        'name', 'skill', 'platform', 'url', 'difficulty', 'instructor', 'duration', 'description', 'rating']),
+    'skills': ('skill_details', 'specialization', [
+        'skill', 'description', 'difficulty', 'estimated_hours', 'industry_demand', 'salary_impact',
+        'career_impact', 'prerequisites', 'learning_path', 'resources', 'tools', 'best_practices']),
+    'resources': ('learning_resources', 'skill', [
+        'title', 'type', 'platform', 'url', 'duration', 'difficulty', 'rating', 'description',
+        'instructor', 'is_free', 'language', 'subtitles', 'topics']),
+}
+
+
+def slug(value):
+    return re.sub(r'[^a-z0-9]+', '-', str(value).lower()).strip('-') or 'default'
+
+
+def trigger_names(kind):
+    return [f"static_export_{kind}_{action}" for action in ('insert', 'update', 'delete')]
+
+
+def install_change_tracking(conn, kind):
+    """Create the triggers that record which groups of kind changed."""
+    table, group_column, _ = PAYLOADS[kind]
+    insert_trigger, update_trigger, delete_trigger = trigger_names(kind)
+    conn.executescript(f'''
+        CREATE TABLE IF NOT EXISTS static_export_changes (
+            kind TEXT NOT NULL,
+            group_key TEXT NOT NULL,
+            PRIMARY KEY (kind, group_key)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS {insert_trigger} AFTER INSERT ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO static_export_changes VALUES ('{kind}', NEW.{group_column});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {update_trigger} AFTER UPDATE ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO static_export_changes VALUES ('{kind}', OLD.{group_column});
+            INSERT OR IGNORE INTO static_export_changes VALUES ('{kind}', NEW.{group_column});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {delete_trigger} AFTER DELETE ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO static_export_changes VALUES ('{kind}', OLD.{group_column});
+        END;
+    ''')
+
+
+def tracking_installed(conn, kind):
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    return all(name in existing for name in trigger_names(kind))
+
+
+def render(conn, kind, group):
+    table, group_column, columns = PAYLOADS[kind]
+    rows = conn.execute(f"""
+        SELECT {", ".join(columns)} FROM {table} WHERE {group_column} = ? ORDER BY id
+    """, (group,)).fetchall()
+    payload = {group_column: group, "items": [dict(zip(columns, row)) for row in rows]}
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), len(rows)
+
+
+def write_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_payload(out_dir, kind, group, data):
+    """Write data and its precompressed variants under a content-hashed name."""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    name = f"{kind}/{slug(group)}.{digest}.json"
+    path = os.path.join(out_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, data)
+    # mtime=0 keeps the .gz bytes identical for identical content
+    write_atomic(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    files = [name, name + '.gz']
+    if brotli is not None:
+        write_atomic(path + '.br', brotli.compress(data, quality=11))
+        files.append(name + '.br')
+    return digest, files
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def sweep_orphans(out_dir, keep):
+    """Delete payload files under the kind directories that are not in keep."""
+    removed = 0
+    for kind in PAYLOADS:
+        directory = os.path.join(out_dir, kind)
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.listdir(directory):
+            if f"{kind}/{entry}" not in keep:
+                os.remove(os.path.join(directory, entry))
+                removed += 1
+    return removed
+
+
+def export(out_dir, database=DATABASE, full=False):
+    """Regenerate changed payloads into out_dir; returns the number of files rewritten."""
+    conn = sqlite3.connect(database)
+    previous = load_manifest(out_dir)
+    manifest = {'payloads': dict(previous['payloads']) if previous and not full else {}}
+    retired = []
+    rewritten = 0
+
+    kinds = {}
+    for kind, (table, _, _) in PAYLOADS.items():
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+            # Without triggers (first run, or the table was recreated) we cannot know what changed
+            kinds[kind] = full or previous is None or not tracking_installed(conn, kind)
+            install_change_tracking(conn, kind)
+
+    # One read snapshot for the pending changes and the rows rendered from them
+    conn.execute("BEGIN")
+    consumed = {}
+    for kind, kind_full in kinds.items():
+        table, group_column, _ = PAYLOADS[kind]
+        current_groups = {row[0] for row in conn.execute(f"SELECT DISTINCT {group_column} FROM {table}")}
+        consumed[kind] = [row[0] for row in conn.execute(
+            "SELECT group_key FROM static_export_changes WHERE kind = ?", (kind,))]
+        if kind_full:
+            changed = current_groups | {p['group'] for p in manifest['payloads'].values() if p['kind'] == kind}
+        else:
+            changed = set(consumed[kind])
+
+        for group in changed:
+            key = f"{kind}/{group}"
+            old = manifest['payloads'].get(key)
+            if group not in current_groups:
+                if old:
+                    retired.extend(old['files'])
+                    del manifest['payloads'][key]
+                continue
+            data, row_count = render(conn, kind, group)
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            if old and old['hash'] == digest:
+                continue
+            digest, files = write_payload(out_dir, kind, group, data)
+            rewritten += 1
+            if old:
+                retired.extend(old['files'])
+            manifest['payloads'][key] = {
+                'kind': kind, 'group': group, 'hash': digest, 'rows': row_count,
+                'file': files[0], 'files': files,
+            }
+
+    live = {name for payload in manifest['payloads'].values() for name in payload['files']}
+    if full and previous:
+        # A full export starts from an empty manifest; what the old one served is retired now
+        retired.extend(name for payload in previous['payloads'].values() for name in payload['files'])
+    # Delete what the previous export retired; this export's retirees stay one more round
+    for name in (previous or {}).get('retired', []):
+        if name not in live and os.path.exists(os.path.join(out_dir, name)):
+            os.remove(os.path.join(out_dir, name))
+    manifest['retired'] = list(dict.fromkeys(name for name in retired if name not in live))
+    if full:
+        # Also files no manifest knows about, e.g. left behind by an interrupted export
+        sweep_orphans(out_dir, live | set(manifest['retired']))
+    manifest['version'] = (previous or {}).get('version', 0) + 1
+    manifest['generated_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    os.makedirs(out_dir, exist_ok=True)
+    write_atomic(os.path.join(out_dir, MANIFEST),
+                 json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8'))
+
+    # Only now that the pages and manifest are on disk are the changes read above done with.
+    # Taking the write lock fails if anything was written after the snapshot; the keys then
+    # stay pending and the next export simply renders those groups again.
+    try:
+        for kind, groups in consumed.items():
+            for start in range(0, len(groups), 500):
+                chunk = groups[start:start + 500]
+                conn.execute(f"""
+                    DELETE FROM static_export_changes WHERE kind = ? AND group_key IN ({", ".join("?" * len(chunk))})
+                """, [kind, *chunk])
+        conn.commit()
+    except sqlite3.OperationalError:
+        conn.rollback()
+    conn.close()
+    return rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export catalog payloads as static precompressed JSON")
+    parser.add_argument("out_dir", help="directory served by the static file server or CDN origin")
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--full", action="store_true", help="re-render every payload")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rewritten = export(args.out_dir, args.db, args.full)
+    print(f"Rewrote {rewritten} payloads in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
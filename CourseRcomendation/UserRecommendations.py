@@ -0,0 +1,202 @@
+"""Nightly precomputation of /suggest results for the professionals in users.
+
+``precompute`` runs the same code path as /suggest for every row of users
+across a process pool and stores the encoded JSON in ``user_recommendations``,
+keyed by specialization plus the sorted skill set, so any visitor whose input
+matches a known profile is served with one lookup. A row is fresh while it is
+younger than ``MAX_AGE``, the specialization's users version (bumped by
+triggers on every write to users) is the one it was computed against, and so
+is the catalog version (bumped by triggers on courses, free_courses and the
+cf_item_counts popularity, and by ``invalidate_all`` when init_db reloads the
+data); otherwise /suggest falls back to live computation.
+
+    python UserRecommendations.py precompute --workers 8
+    python UserRecommendations.py precompute --stale-only
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import RowTypes
+import SpecializationStats
+from DataGenerator import split_skills
+
+DATABASE = 'course_recommendations.db'
+# One nightly run plus some slack
+MAX_AGE = 26 * 3600
+CHUNK_SIZE = 500
+# Tables that feed the ranked course lists; any write to them makes every payload stale
+CATALOG_TABLES = ('courses', 'free_courses', 'cf_item_counts')
+BUMP_CATALOG_VERSION = """
+    INSERT INTO user_recommendations_catalog (id, version) VALUES (0, 1)
+    ON CONFLICT (id) DO UPDATE SET version = version + 1;
+"""
+
+
+def init_tables(conn, table='users'):
+    conn.executescript(f'''
+        CREATE TABLE IF NOT EXISTS user_recommendations (
+            recommendation_key TEXT PRIMARY KEY,
+            specialization TEXT NOT NULL,
+            users_version INTEGER NOT NULL,
+            catalog_version INTEGER NOT NULL DEFAULT 0,
+            computed_at REAL NOT NULL,
+            payload BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS user_recommendations_versions (
+            specialization TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS user_recommendations_catalog (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            version INTEGER NOT NULL
+        );
+
+        CREATE TRIGGER IF NOT EXISTS {table}_recommendations_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO user_recommendations_versions (specialization, version) VALUES (NEW.specialization, 1)
+            ON CONFLICT (specialization) DO UPDATE SET version = version + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_recommendations_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO user_recommendations_versions (specialization, version) VALUES (OLD.specialization, 1)
+            ON CONFLICT (specialization) DO UPDATE SET version = version + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_recommendations_update AFTER UPDATE ON {table}
+        BEGIN
+            INSERT INTO user_recommendations_versions (specialization, version) VALUES (OLD.specialization, 1)
+            ON CONFLICT (specialization) DO UPDATE SET version = version + 1;
+            INSERT INTO user_recommendations_versions (specialization, version) VALUES (NEW.specialization, 1)
+            ON CONFLICT (specialization) DO UPDATE SET version = version + 1;
+        END;
+    ''')
+    if 'catalog_version' not in {row[1] for row in conn.execute("PRAGMA table_info(user_recommendations)")}:
+        conn.execute("ALTER TABLE user_recommendations ADD COLUMN catalog_version INTEGER NOT NULL DEFAULT 0")
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for catalog_table in CATALOG_TABLES:
+        if catalog_table not in existing:
+            continue
+        conn.executescript(''.join(f'''
+            CREATE TRIGGER IF NOT EXISTS {catalog_table}_recommendations_{action} AFTER {action.upper()} ON {catalog_table}
+            BEGIN
+                {BUMP_CATALOG_VERSION}
+            END;
+        ''' for action in ('insert', 'update', 'delete')))
+
+
+def invalidate_all(conn):
+    """Mark every stored recommendation stale, e.g. after tables were dropped and reloaded."""
+    conn.execute(BUMP_CATALOG_VERSION)
+    conn.commit()
+
+
+def catalog_version(conn):
+    row = conn.execute("SELECT version FROM user_recommendations_catalog WHERE id = 0").fetchone()
+    return row[0] if row else 0
+
+
+def recommendation_key(skills, specialization):
+    canonical = f"{specialization}\n" + ",".join(sorted(set(skills)))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def users_versions(conn):
+    return dict(conn.execute("SELECT specialization, version FROM user_recommendations_versions"))
+
+
+def lookup(conn, skills, specialization, max_age=MAX_AGE):
+    """Precomputed /suggest JSON for skills in specialization, or None if missing or stale."""
+    row = conn.execute("""
+        SELECT r.payload FROM user_recommendations r
+        LEFT JOIN user_recommendations_versions v ON v.specialization = r.specialization
+        WHERE r.recommendation_key = ? AND r.computed_at >= ?
+          AND r.users_version = COALESCE(v.version, 0)
+          AND r.catalog_version = ?
+    """, (recommendation_key(skills, specialization), time.time() - max_age, catalog_version(conn))).fetchone()
+    return row[0] if row else None
+
+
+_worker_conn = None
+
+
+def _init_worker(database):
+    global _worker_conn
+    # Imported here so the batch job shares the exact /suggest code path
+    import CareerPath
+    CareerPath.DATABASE = database
+    _worker_conn = CareerPath.get_connection()
+
+
+def _compute_chunk(chunk, versions, catalog):
+    import CareerPath
+    rows = []
+    for skills, specialization in chunk:
+        result = CareerPath.build_suggestions(_worker_conn, skills, specialization)
+        rows.append((recommendation_key(skills, specialization), specialization,
+                     versions.get(specialization, 0), catalog, time.time(), RowTypes.dumps(result)))
+    return rows
+
+
+def precompute(database=DATABASE, workers=None, chunk_size=CHUNK_SIZE, stale_only=False, table='users'):
+    """Compute and store recommendations for every distinct profile in table; returns the count."""
+    database = os.path.abspath(database)
+    conn = sqlite3.connect(database)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    init_tables(conn, table)
+    # Workers only read; settle the specialization aggregates they depend on first
+    SpecializationStats.init_tables(conn, table)
+    SpecializationStats.refresh(conn, table)
+    versions = users_versions(conn)
+    catalog = catalog_version(conn)
+
+    profiles = {}
+    for skills, specialization in conn.execute(f"SELECT skills, specialization FROM {table}"):
+        skills = frozenset(split_skills(skills))
+        profiles.setdefault(recommendation_key(skills, specialization), (skills, specialization))
+    if stale_only:
+        fresh = {key for key, specialization, version, row_catalog, computed_at in conn.execute("""
+            SELECT recommendation_key, specialization, users_version, catalog_version, computed_at
+            FROM user_recommendations
+        """) if version == versions.get(specialization, 0) and row_catalog == catalog
+            and computed_at >= time.time() - MAX_AGE}
+        profiles = {key: profile for key, profile in profiles.items() if key not in fresh}
+
+    profiles = list(profiles.values())
+    chunks = [profiles[i:i + chunk_size] for i in range(0, len(profiles), chunk_size)]
+    written = 0
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(database,)) as pool:
+        for rows in pool.map(_compute_chunk, chunks, [versions] * len(chunks), [catalog] * len(chunks)):
+            with conn:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO user_recommendations
+                        (recommendation_key, specialization, users_version, catalog_version, computed_at, payload)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
+            written += len(rows)
+            print(f"Stored {written}/{len(profiles)} recommendations")
+    if not stale_only:
+        conn.execute("DELETE FROM user_recommendations WHERE computed_at < ?", (time.time() - MAX_AGE,))
+        conn.commit()
+    conn.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute /suggest results for known users")
+    parser.add_argument("command", choices=["precompute"])
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--stale-only", action="store_true", help="skip profiles that are still fresh")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = precompute(args.db, args.workers, args.chunk_size, args.stale_only)
+    print(f"Precomputed {written} profiles in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""Multi-file archives (``.fca``) with a central directory, built and extracted on all cores.
+
+Format::
+
+    MAGIC
+    file data   each file compressed on its own with a Codecs codec
+    directory   per file: offset, compressed size, size, CRC32, codec id,
+                level, mode, mtime, UTF-8 path
+    footer      directory offset, file count, FOOTER_MAGIC
+
+``create`` lists the tree with a thread pool (one ``scandir`` per task) and
+compresses files in a process pool; small results come back in memory and
+large ones through temporary files, so memory stays bounded. The archive is
+written under a temporary name and renamed into place once complete. Reading the
+footer and directory is enough to find any file, so ``extract`` of a single
+path reads only that file's bytes, and a full extract spreads files across
+processes.
+
+    python Archive.py create photos/ photos.fca --codec auto -j 8
+    python Archive.py list photos.fca
+    python Archive.py extract photos.fca out/
+    python Archive.py extract photos.fca out/ 2023/trip/readme.txt
+"""
+import argparse
+import io
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import Codecs
+from FileCompressor import CHUNK_SIZE, default_workers, read_chunks, walk_parallel
+from ParallelGzip import _ordered
+
+MAGIC = b'FCA\x01'
+FOOTER_MAGIC = b'FCAEND\x00\x01'
+# offset, compressed size, size, crc32, codec id, level, mode, mtime, path length
+ENTRY = struct.Struct('<QQQIBBHdH')
+FOOTER = struct.Struct('<QI8s')
+# Files larger than this are compressed to a temporary file instead of memory
+SPOOL_LIMIT = 8 * 1024 * 1024
+
+
+class Entry:
+    def __init__(self, path, offset, compressed_size, size, crc, codec_id, level, mode, mtime):
+        self.path = path
+        self.offset = offset
+        self.compressed_size = compressed_size
+        self.size = size
+        self.crc = crc
+        self.codec_id = codec_id
+        self.level = level
+        self.mode = mode
+        self.mtime = mtime
+
+
+def archive_name(path):
+    return path.replace(os.sep, '/')
+
+
+def compress_member(source, codec, level, tmp_dir):
+    """Compress one file; returns (data or temp path, compressed size, size, crc, codec id, level)."""
+    with open(source, 'rb') as f_in:
+        if codec == 'auto':
+            sample = f_in.read(Codecs.SAMPLE_SIZE)
+            chosen, chosen_level = Codecs.choose(sample)
+            f_in.seek(0)
+        else:
+            chosen = Codecs.get_codec(codec)
+            chosen_level = Codecs.check_level(chosen, level)
+        # Large files go back through a temporary file rather than a pickled result
+        spooled = os.fstat(f_in.fileno()).st_size > SPOOL_LIMIT
+        out = tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) if spooled else io.BytesIO()
+        with out:
+            compressor = chosen.compressor(chosen_level)
+            size = crc = 0
+            for chunk in read_chunks(f_in):
+                size += len(chunk)
+                crc = zlib.crc32(chunk, crc)
+                out.write(compressor.compress(chunk))
+            out.write(compressor.flush())
+            compressed_size = out.tell()
+            result = out.name if spooled else out.getvalue()
+    return result, compressed_size, size, crc, chosen.codec_id, chosen_level
+
+
+def create(root, output, codec='zlib', level=None, workers=None):
+    """Archive every file under root into output; returns the list of entries."""
+    if codec != 'auto':
+        # Checked before anything is written; the level is stored in one byte per entry
+        Codecs.check_level(Codecs.get_codec(codec), level)
+    workers = workers or default_workers()
+    paths = walk_parallel(root, workers)
+    # Written under a temporary name and renamed when complete, so a failure never leaves a truncated archive
+    tmp_output = f"{output}.tmp"
+    try:
+        entries = _write_archive(root, paths, tmp_output, codec, level, workers)
+        os.replace(tmp_output, output)
+    except BaseException:
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
+        raise
+    return entries
+
+
+def _write_archive(root, paths, output, codec, level, workers):
+    entries = []
+    # Temporary files next to the archive, so large members are moved within one filesystem
+    tmp_parent = os.path.dirname(os.path.abspath(output))
+    with open(output, 'wb') as f_out, tempfile.TemporaryDirectory(dir=tmp_parent) as tmp_dir:
+        f_out.write(MAGIC)
+        with ProcessPoolExecutor(workers) as pool:
+            tasks = ((compress_member, (os.path.join(root, path), codec, level, tmp_dir)) for path in paths)
+            for path, (data, compressed_size, size, crc, codec_id, used_level) in zip(
+                    paths, _ordered(pool, tasks, workers * 2)):
+                offset = f_out.tell()
+                if isinstance(data, bytes):
+                    f_out.write(data)
+                else:
+                    with open(data, 'rb') as f_in:
+                        for chunk in read_chunks(f_in):
+                            f_out.write(chunk)
+                    os.remove(data)
+                st = os.stat(os.path.join(root, path))
+                entries.append(Entry(archive_name(path), offset, compressed_size, size, crc, codec_id,
+                                     used_level, st.st_mode & 0o7777, st.st_mtime))
+        directory_offset = f_out.tell()
+        for entry in entries:
+            name = entry.path.encode('utf-8')
+            f_out.write(ENTRY.pack(entry.offset, entry.compressed_size, entry.size, entry.crc, entry.codec_id,
+                                   entry.level, entry.mode, entry.mtime, len(name)) + name)
+        f_out.write(FOOTER.pack(directory_offset, len(entries), FOOTER_MAGIC))
+    return entries
+
+
+def read_directory(f):
+    """Entries of the archive open as f, from the footer and central directory only."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not an archive")
+    f.seek(-FOOTER.size, os.SEEK_END)
+    directory_offset, count, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != FOOTER_MAGIC:
+        raise ValueError("archive footer is missing (truncated archive?)")
+    f.seek(directory_offset)
+    entries = []
+    for _ in range(count):
+        header = f.read(ENTRY.size)
+        if len(header) != ENTRY.size:
+            raise ValueError("archive directory is truncated")
+        *fields, name_length = ENTRY.unpack(header)
+        entries.append(Entry(f.read(name_length).decode('utf-8'), *fields))
+    return entries
+
+
+def safe_target(destination, name):
+    """Output path for an archived name, refusing names that would escape destination."""
+    parts = name.split('/')
+    if name.startswith('/') or '..' in parts or any(':' in part for part in parts):
+        raise ValueError(f"unsafe path in archive: {name!r}")
+    return os.path.join(destination, *parts)
+
+
+def extract_entry(archive, entry, destination):
+    """Decompress one entry (read straight from its offset) under destination."""
+    codec = Codecs.CODEC_IDS.get(entry.codec_id)
+    if codec is None:
+        raise ValueError(f"{entry.path}: codec id {entry.codec_id} is not available here")
+    target = safe_target(destination, entry.path)
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    decompressor = codec.decompressor()
+    crc = size = 0
+    with open(archive, 'rb') as f_in, open(target, 'wb') as f_out:
+        f_in.seek(entry.offset)
+        remaining = entry.compressed_size
+        while remaining:
+            data = f_in.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                raise ValueError(f"{entry.path}: archive is truncated")
+            remaining -= len(data)
+            for output in Codecs.iter_decompress(decompressor, data):
+                crc = zlib.crc32(output, crc)
+                size += len(output)
+                f_out.write(output)
+    if crc != entry.crc or size != entry.size:
+        raise ValueError(f"{entry.path}: CRC mismatch")
+    os.chmod(target, entry.mode)
+    os.utime(target, (entry.mtime, entry.mtime))
+    return size
+
+
+def extract(archive, destination, names=None, workers=None):
+    """Extract names (default: everything) in parallel; returns the entries extracted."""
+    with open(archive, 'rb') as f:
+        entries = read_directory(f)
+    if names:
+        by_name = {entry.path: entry for entry in entries}
+        missing = [name for name in names if name not in by_name]
+        if missing:
+            raise ValueError(f"not in archive: {', '.join(missing)}")
+        entries = [by_name[name] for name in names]
+    if len(entries) == 1:
+        extract_entry(archive, entries[0], destination)
+        return entries
+    with ProcessPoolExecutor(workers or default_workers()) as pool:
+        # Each worker opens the archive itself and seeks to its entries
+        list(pool.map(extract_entry, [archive] * len(entries), entries, [destination] * len(entries),
+                      chunksize=16))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and extract multi-file compressed archives")
+    parser.add_argument("command", choices=["create", "list", "extract"])
+    parser.add_argument("paths", nargs="+",
+                        help="create: DIRECTORY ARCHIVE; list: ARCHIVE; extract: ARCHIVE DESTINATION [NAME ...]")
+    parser.add_argument("--codec", default="zlib", help=f"auto or one of: {', '.join(Codecs.CODECS)}")
+    parser.add_argument("--level", type=int, default=None)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="processes (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        if args.command == "create":
+            if len(args.paths) != 2:
+                parser.error("create needs a directory and an archive")
+            entries = create(args.paths[0], args.paths[1], args.codec, args.level, args.workers)
+            size = sum(entry.size for entry in entries)
+            print(f"{len(entries)} files, {size} -> {os.path.getsize(args.paths[1])} bytes "
+                  f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        elif args.command == "list":
+            with open(args.paths[0], 'rb') as f:
+                for entry in read_directory(f):
+                    codec = Codecs.CODEC_IDS.get(entry.codec_id)
+                    print(f"{entry.size:12} {entry.compressed_size:12}  "
+                          f"{codec.name if codec else entry.codec_id:7}  {entry.path}")
+        else:
+            if len(args.paths) < 2:
+                parser.error("extract needs an archive and a destination")
+            entries = extract(args.paths[0], args.paths[1], args.paths[2:], args.workers)
+            print(f"{len(entries)} files extracted in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    except (OSError, ValueError, zlib.error) as e:
+        sys.exit(f"Error {args.command.rstrip('e')}ing archive: {e}")
+
+
+if __name__ == "__main__":
+    main()
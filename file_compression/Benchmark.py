@@ -0,0 +1,471 @@
+"""Compression benchmark: every codec and level over a corpus of typical file types.
+
+The corpus is generated (text logs, a PPM image, a WAV recording, structured
+binary records and random bytes; cached in ``--corpus-dir``) plus any files
+under ``--corpus``. Each Codecs codec is run at each of its levels, as are the
+plain zlib streaming path of FileCompressor and both ParallelGzip layouts.
+Every run happens in a fresh spawned process, so peak RSS (``ru_maxrss``
+above the idle worker, where the ``resource`` module exists) belongs to that
+run alone; files are streamed from and to disk, and decompressed output is
+checked against the input's CRC.
+
+Results go to ``results.json`` plus ``report.md`` and ``report.html`` in
+``--out``, with the ratio vs compression speed Pareto frontier per file and
+over the whole corpus. ``--baseline`` compares with an earlier results.json.
+
+    python Benchmark.py --quick
+    python Benchmark.py --corpus ~/samples --methods zlib,lzma,pgzip --repeat 3
+    python Benchmark.py --baseline bench_results/results.json --fail-on-regression
+"""
+import argparse
+import array
+import html
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+import zlib
+
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage, peak RSS is reported as unknown
+    resource = None
+
+import Codecs
+import FileCompressor
+import ParallelGzip
+from FileCompressor import read_chunks
+
+CORPUS_DIR = 'bench_corpus'
+OUT_DIR = 'bench_results'
+CORPUS_SIZE = 4 * 1024 * 1024
+SEED = 1234
+# Speed changes within this fraction of the baseline are noise, not regressions
+TOLERANCE = 0.10
+QUICK_LEVELS = [1, 6, 9]
+
+
+class Method:
+    def __init__(self, name, levels, quick_levels, compress, decompress):
+        self.name = name
+        self.levels = levels
+        self.quick_levels = quick_levels
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _codec_method(codec):
+    return Method(codec.name, list(codec.levels), codec.probe_levels or [codec.default_level],
+                  lambda f_in, f_out, level: Codecs.compress_stream(f_in, f_out, codec.name, level),
+                  Codecs.decompress_stream)
+
+
+METHODS = {codec.name: _codec_method(codec) for codec in Codecs.CODECS.values()}
+METHODS['stream'] = Method('stream', list(range(0, 10)), QUICK_LEVELS,
+                           FileCompressor.compress_stream, FileCompressor.decompress_stream)
+METHODS['pgzip'] = Method('pgzip', list(range(1, 10)), QUICK_LEVELS,
+                          ParallelGzip.compress_parallel, ParallelGzip.decompress_parallel)
+METHODS['pgzip-independent'] = Method(
+    'pgzip-independent', list(range(1, 10)), QUICK_LEVELS,
+    lambda f_in, f_out, level: ParallelGzip.compress_parallel(f_in, f_out, level, independent=True),
+    ParallelGzip.decompress_parallel)
+
+
+def generate_text(rng, size):
+    """Application log lines: timestamps, levels, a small vocabulary and numbers."""
+    words = ['request', 'user', 'session', 'cache', 'miss', 'hit', 'timeout', 'retry', 'query',
+             'course', 'upload', 'compress', 'worker', 'queue', 'latency', 'error', 'ok']
+    levels = ['INFO'] * 8 + ['DEBUG'] * 4 + ['WARN', 'ERROR']
+    lines, total, t = [], 0, 1700000000.0
+    while total < size:
+        t += rng.expovariate(50)
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(t))}.{int(t * 1000) % 1000:03d} "
+                f"{rng.choice(levels):5} [{rng.choice(words)}-{rng.randint(1, 16)}] "
+                f"{' '.join(rng.choice(words) for _ in range(rng.randint(3, 9)))} "
+                f"id={rng.randint(1, 99999)} took={rng.randint(1, 900)}ms\n")
+        lines.append(line)
+        total += len(line)
+    return ''.join(lines).encode('ascii')[:size]
+
+
+def generate_image(rng, size):
+    """Binary PPM of smooth gradients and shapes with sensor-like noise."""
+    width = 1024
+    height = max(1, size // (width * 3))
+    pixels = bytearray(width * height * 3)
+    i = 0
+    for y in range(height):
+        for x in range(width):
+            inside = (x - width / 2) ** 2 + (y - height / 2) ** 2 < (height / 3) ** 2
+            noise = rng.randint(-6, 6)
+            base = (200 if inside else x * 255 // width, y * 255 // height, (x + y) % 256)
+            for c in base:
+                pixels[i] = min(255, max(0, c + noise))
+                i += 1
+    return f'P6 {width} {height} 255\n'.encode('ascii') + bytes(pixels)
+
+
+def generate_audio(rng, size, rate=44100):
+    """16-bit mono WAV: a few mixed tones with a little noise."""
+    samples = array.array('h', (int(8000 * math.sin(2 * math.pi * 220 * n / rate)
+                                    + 4000 * math.sin(2 * math.pi * 331 * n / rate)
+                                    + 2000 * math.sin(2 * math.pi * 1375 * n / rate)
+                                    + rng.gauss(0, 300))
+                                for n in range(size // 2)))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    with tempfile.SpooledTemporaryFile() as f:
+        with wave.open(f, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes(samples.tobytes())
+        f.seek(0)
+        return f.read()
+
+
+def generate_binary(rng, size):
+    """Fixed-size records as a database or telemetry dump would hold them."""
+    record = struct.Struct('<IIdHH8s')
+    rows = []
+    for n in range(size // record.size):
+        rows.append(record.pack(n, rng.randint(0, 500), rng.gauss(50, 15), rng.randint(0, 3),
+                                rng.randint(0, 65535), rng.choice([b'ACTIVE\0\0', b'CLOSED\0\0', b'PENDING\0'])))
+    return b''.join(rows)
+
+
+def generate_random(rng, size):
+    """Incompressible bytes, the worst case (already compressed media looks like this)."""
+    return rng.randbytes(size)
+
+
+GENERATORS = [('text', 'log', generate_text), ('image', 'ppm', generate_image), ('audio', 'wav', generate_audio),
+              ('binary', 'bin', generate_binary), ('random', 'bin', generate_random)]
+
+
+def generate_corpus(directory=CORPUS_DIR, size=CORPUS_SIZE, seed=SEED):
+    """Write the generated corpus files that are not cached yet; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for kind, extension, generate in GENERATORS:
+        path = os.path.join(directory, f'{kind}-{size}.{extension}')
+        if not os.path.exists(path):
+            data = generate(random.Random(f'{seed}-{kind}'), size)
+            with open(path + '.part', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.part', path)
+        paths.append(path)
+    return paths
+
+
+def collect_corpus(directory):
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in sorted(files))
+    return sorted(paths)
+
+
+def file_crc(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in read_chunks(f):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+class ChecksumWriter:
+    """Write sink that keeps only the CRC and size of what it receives."""
+    def __init__(self):
+        self.crc = 0
+        self.size = 0
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        return len(data)
+
+
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(method_name, level, path, crc, repeat, tmp_dir):
+    """Run one method/level on path (in a fresh worker process); best times of repeat runs."""
+    method = METHODS[method_name]
+    baseline_rss = peak_rss()
+    size = os.path.getsize(path)
+    handle, compressed_path = tempfile.mkstemp(dir=tmp_dir)
+    os.close(handle)
+    try:
+        compress_time = decompress_time = float('inf')
+        for _ in range(repeat):
+            with open(path, 'rb') as f_in, open(compressed_path, 'wb') as f_out:
+                start = time.perf_counter()
+                method.compress(f_in, f_out, level)
+                compress_time = min(compress_time, time.perf_counter() - start)
+        compressed_size = os.path.getsize(compressed_path)
+        for _ in range(repeat):
+            sink = ChecksumWriter()
+            with open(compressed_path, 'rb') as f_in:
+                start = time.perf_counter()
+                method.decompress(f_in, sink)
+                decompress_time = min(decompress_time, time.perf_counter() - start)
+            if sink.crc != crc or sink.size != size:
+                raise ValueError(f"{method_name} level {level} did not round-trip {path}")
+    finally:
+        os.remove(compressed_path)
+
+    rss = peak_rss()
+    return {
+        'method': method_name,
+        'level': level,
+        'size': size,
+        'compressed_size': compressed_size,
+        'ratio': size / max(compressed_size, 1),
+        'compress_seconds': compress_time,
+        'decompress_seconds': decompress_time,
+        'compress_mbps': size / max(compress_time, 1e-9) / 1e6,
+        'decompress_mbps': size / max(decompress_time, 1e-9) / 1e6,
+        'peak_rss_bytes': None if rss is None else rss - baseline_rss,
+    }
+
+
+def pareto_frontier(results, speed_key='compress_mbps'):
+    """Results no other result beats on both ratio and speed."""
+    frontier = []
+    best_ratio = 0
+    for result in sorted(results, key=lambda r: (-r[speed_key], -r['ratio'])):
+        if result['ratio'] > best_ratio:
+            frontier.append(result)
+            best_ratio = result['ratio']
+    return frontier
+
+
+def summarize(results):
+    """Whole-corpus results per method/level: total bytes over total time."""
+    totals = {}
+    for r in results:
+        total = totals.setdefault((r['method'], r['level']), {
+            'file': 'all', 'method': r['method'], 'level': r['level'], 'size': 0, 'compressed_size': 0,
+            'compress_seconds': 0.0, 'decompress_seconds': 0.0, 'peak_rss_bytes': None})
+        total['size'] += r['size']
+        total['compressed_size'] += r['compressed_size']
+        total['compress_seconds'] += r['compress_seconds']
+        total['decompress_seconds'] += r['decompress_seconds']
+        if r['peak_rss_bytes'] is not None:
+            total['peak_rss_bytes'] = max(total['peak_rss_bytes'] or 0, r['peak_rss_bytes'])
+    for total in totals.values():
+        total['ratio'] = total['size'] / max(total['compressed_size'], 1)
+        total['compress_mbps'] = total['size'] / max(total['compress_seconds'], 1e-9) / 1e6
+        total['decompress_mbps'] = total['size'] / max(total['decompress_seconds'], 1e-9) / 1e6
+    return list(totals.values())
+
+
+def run(paths, methods, quick=False, repeat=1, progress=True):
+    """Benchmark methods on paths; returns the report dict written to results.json."""
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # maxtasksperchild=1: a new process per run keeps ru_maxrss and caches per run
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            for path in paths:
+                crc = file_crc(path)
+                for name in methods:
+                    method = METHODS[name]
+                    for level in (method.quick_levels if quick else method.levels):
+                        result = pool.apply(measure, (name, level, path, crc, repeat, tmp_dir))
+                        result['file'] = os.path.basename(path)
+                        results.append(result)
+                        if progress:
+                            print(f"{result['file']:24} {name:18} level {level:2}  ratio {result['ratio']:6.2f}  "
+                                  f"{result['compress_mbps']:8.1f} / {result['decompress_mbps']:8.1f} MB/s",
+                                  file=sys.stderr)
+    return {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'results': results,
+        'summary': summarize(results),
+    }
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """Per file/method/level changes against a baseline report, flagging regressions."""
+    previous = {(r['file'], r['method'], r['level']): r for r in baseline['results'] + baseline['summary']}
+    rows = []
+    for r in report['results'] + report['summary']:
+        old = previous.get((r['file'], r['method'], r['level']))
+        if old is None:
+            continue
+        change = {key: r[key] / old[key] - 1 for key in ('ratio', 'compress_mbps', 'decompress_mbps')}
+        # Ratios are deterministic: any real drop is a regression; speeds get the tolerance
+        regression = (change['ratio'] < -0.001 or change['compress_mbps'] < -tolerance
+                      or change['decompress_mbps'] < -tolerance)
+        rows.append({'file': r['file'], 'method': r['method'], 'level': r['level'],
+                     'change': change, 'regression': regression})
+    return rows
+
+
+def _format_rss(value):
+    return '?' if value is None else f'{value / 1e6:.1f}'
+
+
+def _groups(report):
+    files = sorted({r['file'] for r in report['results']})
+    groups = [(name, [r for r in report['results'] if r['file'] == name]) for name in files]
+    return groups + [('all files', report['summary'])]
+
+
+def _table_rows(results):
+    frontier = {id(r) for r in pareto_frontier(results)}
+    for r in sorted(results, key=lambda r: -r['ratio']):
+        yield (('*' if id(r) in frontier else ''), r['method'], r['level'], f"{r['ratio']:.2f}",
+               f"{r['compress_mbps']:.1f}", f"{r['decompress_mbps']:.1f}", _format_rss(r['peak_rss_bytes']))
+
+
+HEADINGS = ('Pareto', 'Method', 'Level', 'Ratio', 'Compress MB/s', 'Decompress MB/s', 'Peak RSS MB')
+
+
+def write_markdown(report, path, comparison=None):
+    lines = [f"# Compression benchmark ({report['generated_at']})", '',
+             f"Python {report['python']} on {report['platform']}, {report['cpu_count']} CPUs, "
+             f"best of {report['repeat']}. `*` marks the ratio vs compression speed Pareto frontier.", '']
+    for name, results in _groups(report):
+        lines += [f'## {name}', '', '| ' + ' | '.join(HEADINGS) + ' |', '|' + '---|' * len(HEADINGS)]
+        lines += ['| ' + ' | '.join(str(cell) for cell in row) + ' |' for row in _table_rows(results)]
+        lines.append('')
+    if comparison is not None:
+        lines += ['## Against baseline', '', '| File | Method | Level | Ratio | Compress | Decompress | |',
+                  '|---|---|---|---|---|---|---|']
+        for row in comparison:
+            change = row['change']
+            lines.append(f"| {row['file']} | {row['method']} | {row['level']} | {change['ratio']:+.1%} "
+                         f"| {change['compress_mbps']:+.1%} | {change['decompress_mbps']:+.1%} "
+                         f"| {'REGRESSION' if row['regression'] else ''} |")
+        lines.append('')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+def _scatter_svg(results, width=640, height=360, margin=48):
+    """Ratio against log compression speed, with the frontier drawn as a line."""
+    speeds = [math.log10(max(r['compress_mbps'], 1e-3)) for r in results]
+    ratios = [r['ratio'] for r in results]
+    lo_x, hi_x = min(speeds), max(speeds) + 1e-9
+    lo_y, hi_y = min(ratios), max(ratios) + 1e-9
+
+    def point(r):
+        x = margin + (math.log10(max(r['compress_mbps'], 1e-3)) - lo_x) / (hi_x - lo_x) * (width - 2 * margin)
+        y = height - margin - (r['ratio'] - lo_y) / (hi_y - lo_y) * (height - 2 * margin)
+        return x, y
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">',
+             f'<rect width="{width}" height="{height}" fill="white" stroke="#ccc"/>',
+             f'<text x="{width / 2}" y="{height - 10}" text-anchor="middle">compress MB/s (log scale)</text>',
+             f'<text x="14" y="{height / 2}" transform="rotate(-90 14 {height / 2})" text-anchor="middle">ratio</text>']
+    frontier = pareto_frontier(results)
+    parts.append('<polyline fill="none" stroke="#d33" points="'
+                 + ' '.join(f'{x:.1f},{y:.1f}' for x, y in map(point, frontier)) + '"/>')
+    for r in results:
+        x, y = point(r)
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="#36c">'
+                     f'<title>{html.escape(r["method"])} {r["level"]}: {r["ratio"]:.2f}x, '
+                     f'{r["compress_mbps"]:.1f} MB/s</title></circle>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def write_html(report, path, comparison=None):
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>Compression benchmark</title>',
+             '<style>body{font-family:sans-serif}table{border-collapse:collapse}'
+             'td,th{border:1px solid #ccc;padding:2px 8px;text-align:right}.bad{color:#c00}</style></head><body>',
+             f"<h1>Compression benchmark ({html.escape(report['generated_at'])})</h1>",
+             f"<p>Python {html.escape(report['python'])} on {html.escape(report['platform'])}, "
+             f"{report['cpu_count']} CPUs, best of {report['repeat']}. "
+             '<code>*</code> and the red line mark the ratio vs compression speed Pareto frontier.</p>']
+    for name, results in _groups(report):
+        parts.append(f'<h2>{html.escape(name)}</h2>')
+        parts.append(_scatter_svg(results))
+        parts.append('<table><tr>' + ''.join(f'<th>{h}</th>' for h in HEADINGS) + '</tr>')
+        parts += ['<tr>' + ''.join(f'<td>{html.escape(str(cell))}</td>' for cell in row) + '</tr>'
+                  for row in _table_rows(results)]
+        parts.append('</table>')
+    if comparison is not None:
+        parts.append('<h2>Against baseline</h2><table><tr><th>File</th><th>Method</th><th>Level</th>'
+                     '<th>Ratio</th><th>Compress</th><th>Decompress</th></tr>')
+        for row in comparison:
+            change = row['change']
+            parts.append(f"<tr class=\"{'bad' if row['regression'] else ''}\"><td>{html.escape(row['file'])}</td>"
+                         f"<td>{html.escape(row['method'])}</td><td>{row['level']}</td>"
+                         f"<td>{change['ratio']:+.1%}</td><td>{change['compress_mbps']:+.1%}</td>"
+                         f"<td>{change['decompress_mbps']:+.1%}</td></tr>")
+        parts.append('</table>')
+    parts.append('</body></html>')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every codec and level over a file corpus")
+    parser.add_argument("--corpus", action="append", default=[], help="directory of extra files (repeatable)")
+    parser.add_argument("--corpus-dir", default=CORPUS_DIR, help="where the generated corpus is cached")
+    parser.add_argument("--size", type=int, default=CORPUS_SIZE, help="bytes per generated file")
+    parser.add_argument("--no-generated", action="store_true", help="only benchmark --corpus files")
+    parser.add_argument("--methods", default=None, help=f"comma separated subset of: {', '.join(METHODS)}")
+    parser.add_argument("--quick", action="store_true", help="a few representative levels per method")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per measurement; the best time counts")
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--baseline", default=None, help="earlier results.json to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed fractional speed drop")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    methods = list(METHODS) if args.methods is None else args.methods.split(',')
+    unknown = [name for name in methods if name not in METHODS]
+    if unknown:
+        parser.error(f"unknown or unavailable methods: {', '.join(unknown)}")
+    paths = [] if args.no_generated else generate_corpus(args.corpus_dir, args.size)
+    for directory in args.corpus:
+        paths += collect_corpus(directory)
+    if not paths:
+        parser.error("the corpus is empty")
+
+    try:
+        baseline = None
+        if args.baseline is not None:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        report = run(paths, methods, args.quick, args.repeat)
+        comparison = None if baseline is None else compare(report, baseline, args.tolerance)
+        os.makedirs(args.out, exist_ok=True)
+        with open(os.path.join(args.out, 'results.json'), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        write_markdown(report, os.path.join(args.out, 'report.md'), comparison)
+        write_html(report, os.path.join(args.out, 'report.html'), comparison)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Error benchmarking: {e}")
+
+    print(f"Wrote {len(report['results'])} results to {args.out}", file=sys.stderr)
+    regressions = [row for row in comparison or [] if row['regression']]
+    for row in regressions:
+        print(f"Regression: {row['file']} {row['method']} level {row['level']}", file=sys.stderr)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Codec registry with a common streaming interface and automatic codec choice.
+
+Every codec exposes a streaming compressor (``compress(data)`` / ``flush()``)
+and decompressor (``decompress(data)``). zlib, gzip, bz2 and lzma are always
+available; zstd, lz4 and brotli register themselves when the ``zstandard``,
+``lz4`` and ``brotli`` packages are installed. ``store`` keeps data as is.
+
+Output starts with a 6 byte header (``MAGIC``, codec id, level) so
+``decompress_stream`` needs no options. Decompression never produces more
+than one chunk of output per call for codecs that can bound it (zlib, gzip,
+bz2, lzma, lz4), so a small input that inflates enormously cannot exhaust
+memory. ``--codec auto`` compresses a sample
+of the input with each candidate codec/level and picks the best ratio among
+those at least ``--min-speed`` MB/s fast, or with ``--min-ratio`` the fastest
+one reaching that ratio.
+
+    python Codecs.py list
+    python Codecs.py probe big.log
+    python Codecs.py compress big.log big.fcz --codec auto --min-speed 100
+    python Codecs.py compress big.log big.fcz --codec lzma --level 6
+    python Codecs.py decompress big.fcz big.log
+"""
+import argparse
+import bz2
+import lzma
+import struct
+import sys
+import time
+import zlib
+
+from FileCompressor import CHUNK_SIZE, PrefixedReader, open_binary, read_chunks
+
+MAGIC = b'FCZ\x01'
+HEADER = struct.Struct('<4sBB')
+SAMPLE_SIZE = 1024 * 1024
+# Below this ratio compression is not worth the CPU; the input is stored instead
+MIN_USEFUL_RATIO = 1.05
+DEFAULT_MIN_SPEED = 50.0
+
+CODECS = {}
+CODEC_IDS = {}
+
+
+class Codec:
+    def __init__(self, name, codec_id, levels, default_level, probe_levels, compressor, decompressor):
+        self.name = name
+        self.codec_id = codec_id
+        self.levels = levels
+        self.default_level = default_level
+        # Levels tried by auto selection; the full range would make sampling too slow
+        self.probe_levels = probe_levels
+        self.compressor = compressor
+        self.decompressor = decompressor
+
+
+def register(codec):
+    CODECS[codec.name] = codec
+    CODEC_IDS[codec.codec_id] = codec
+
+
+class _Store:
+    def compress(self, data):
+        return bytes(data)
+
+    def flush(self):
+        return b''
+
+    decompress = compress
+
+
+register(Codec('store', 0, range(0, 1), 0, [0], lambda level: _Store(), _Store))
+register(Codec('zlib', 1, range(0, 10), 6, [1, 6, 9],
+               lambda level: zlib.compressobj(level),
+               lambda: zlib.decompressobj()))
+register(Codec('gzip', 2, range(0, 10), 6, [],
+               lambda level: zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16),
+               lambda: zlib.decompressobj(zlib.MAX_WBITS | 16)))
+register(Codec('bz2', 3, range(1, 10), 9, [1, 9],
+               bz2.BZ2Compressor,
+               bz2.BZ2Decompressor))
+register(Codec('lzma', 4, range(0, 10), 6, [0, 3, 6],
+               lambda level: lzma.LZMACompressor(preset=level),
+               lzma.LZMADecompressor))
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+if zstandard is not None:
+    register(Codec('zstd', 5, range(1, 23), 3, [1, 3, 9, 19],
+                   lambda level: zstandard.ZstdCompressor(level=level).compressobj(),
+                   lambda: zstandard.ZstdDecompressor().decompressobj()))
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+if lz4 is not None:
+    class _Lz4Compressor:
+        def __init__(self, level):
+            self.compressor = lz4.frame.LZ4FrameCompressor(compression_level=level)
+            self.started = False
+
+        def compress(self, data):
+            header = b'' if self.started else self.compressor.begin()
+            self.started = True
+            return header + self.compressor.compress(data)
+
+        def flush(self):
+            return (b'' if self.started else self.compressor.begin()) + self.compressor.flush()
+
+    register(Codec('lz4', 6, range(0, 17), 0, [0, 9],
+                   _Lz4Compressor,
+                   lz4.frame.LZ4FrameDecompressor))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+if brotli is not None:
+    class _BrotliCompressor:
+        def __init__(self, level):
+            self.compressor = brotli.Compressor(quality=level)
+
+        def compress(self, data):
+            return self.compressor.process(bytes(data))
+
+        def flush(self):
+            return self.compressor.finish()
+
+    class _BrotliDecompressor:
+        def __init__(self):
+            self.decompressor = brotli.Decompressor()
+
+        def decompress(self, data):
+            return self.decompressor.process(data)
+
+    register(Codec('brotli', 7, range(0, 12), 6, [1, 5, 9],
+                   _BrotliCompressor,
+                   _BrotliDecompressor))
+
+
+def get_codec(name):
+    if name not in CODECS:
+        raise ValueError(f"unknown or unavailable codec {name!r}; available: {', '.join(CODECS)}")
+    return CODECS[name]
+
+
+def check_level(codec, level=None):
+    """level, or the codec's default when None; ValueError if the codec has no such level."""
+    level = codec.default_level if level is None else level
+    if level not in codec.levels:
+        raise ValueError(f"{codec.name} levels are {codec.levels.start}-{codec.levels.stop - 1}")
+    return level
+
+
+def compress_bytes(codec, level, data):
+    compressor = codec.compressor(level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def probe(sample):
+    """(codec, level, ratio, MB/s) for every auto-selection candidate on sample."""
+    results = []
+    for codec in CODECS.values():
+        for level in codec.probe_levels:
+            start = time.perf_counter()
+            compressed = compress_bytes(codec, level, sample)
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            ratio = len(sample) / max(len(compressed), 1)
+            results.append((codec, level, ratio, len(sample) / elapsed / 1e6))
+    return results
+
+
+def choose(sample, min_speed=None, min_ratio=None):
+    """Pick (codec, level) for data like sample.
+
+    With min_ratio: the fastest candidate reaching it (else the best ratio).
+    Otherwise: the best ratio among candidates at least min_speed MB/s fast
+    (else the fastest).
+    """
+    if not sample:
+        return CODECS['store'], 0
+    candidates = [c for c in probe(sample) if c[0].name != 'store']
+    if max(ratio for _, _, ratio, _ in candidates) < MIN_USEFUL_RATIO:
+        return CODECS['store'], 0
+    if min_ratio is not None:
+        good = [c for c in candidates if c[2] >= min_ratio]
+        best = max(good, key=lambda c: c[3]) if good else max(candidates, key=lambda c: c[2])
+    else:
+        min_speed = DEFAULT_MIN_SPEED if min_speed is None else min_speed
+        fast = [c for c in candidates if c[3] >= min_speed]
+        best = max(fast, key=lambda c: c[2]) if fast else max(candidates, key=lambda c: c[3])
+    return best[0], best[1]
+
+
+def compress_stream(f_in, f_out, codec='auto', level=None, min_speed=None, min_ratio=None,
+                    chunk_size=CHUNK_SIZE):
+    """Write the header and f_in compressed with codec; returns (codec name, level, read, written)."""
+    if codec == 'auto':
+        # The sample is the start of the input; it is replayed before the rest
+        sample = f_in.read(SAMPLE_SIZE)
+        codec, level = choose(sample, min_speed, min_ratio)
+        f_in = PrefixedReader(sample, f_in)
+    else:
+        codec = get_codec(codec)
+    level = check_level(codec, level)
+
+    f_out.write(HEADER.pack(MAGIC, codec.codec_id, level))
+    compressor = codec.compressor(level)
+    read, written = 0, HEADER.size
+    for chunk in read_chunks(f_in, chunk_size):
+        read += len(chunk)
+        data = compressor.compress(chunk)
+        f_out.write(data)
+        written += len(data)
+    data = compressor.flush()
+    f_out.write(data)
+    return codec.name, level, read, written + len(data)
+
+
+def read_header(f_in):
+    """Codec and level from the header at the start of f_in."""
+    header = f_in.read(HEADER.size)
+    if len(header) != HEADER.size or header[:4] != MAGIC:
+        raise ValueError("not a codec container (missing header)")
+    _, codec_id, level = HEADER.unpack(header)
+    if codec_id not in CODEC_IDS:
+        raise ValueError(f"codec id {codec_id} is not available here (optional package missing?)")
+    return CODEC_IDS[codec_id], level
+
+
+def iter_decompress(decompressor, data, max_length=CHUNK_SIZE):
+    """Yield the output of feeding data to decompressor, at most max_length bytes at a time."""
+    if hasattr(decompressor, 'unconsumed_tail'):
+        # zlib: input beyond what fits in max_length comes back as unconsumed_tail
+        while True:
+            output = decompressor.decompress(data, max_length)
+            data = decompressor.unconsumed_tail
+            yield output
+            if decompressor.eof or (not data and len(output) < max_length):
+                return
+    elif hasattr(decompressor, 'needs_input'):
+        # bz2, lzma, lz4: the decompressor buffers the input; empty calls drain pending output
+        output = decompressor.decompress(data, max_length)
+        yield output
+        while not decompressor.eof and not decompressor.needs_input:
+            yield decompressor.decompress(b'', max_length)
+    else:
+        yield decompressor.decompress(data)
+
+
+def decompress_stream(f_in, f_out, chunk_size=CHUNK_SIZE):
+    """Decompress a stream written by compress_stream; returns (codec name, read, written)."""
+    codec, _ = read_header(f_in)
+    decompressor = codec.decompressor()
+    read, written = HEADER.size, 0
+    for chunk in read_chunks(f_in, chunk_size):
+        read += len(chunk)
+        for data in iter_decompress(decompressor, bytes(chunk), chunk_size):
+            f_out.write(data)
+            written += len(data)
+    if getattr(decompressor, 'eof', True) is False:
+        raise ValueError("compressed stream is truncated")
+    return codec.name, read, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress with any registered codec, or pick one automatically")
+    parser.add_argument("command", choices=["compress", "decompress", "probe", "list"])
+    parser.add_argument("input", nargs="?", help="input file, or - for stdin")
+    parser.add_argument("output", nargs="?", help="output file, or - for stdout")
+    parser.add_argument("--codec", default="auto", help=f"auto or one of: {', '.join(CODECS)}")
+    parser.add_argument("--level", type=int, default=None)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--min-speed", type=float, default=None,
+                        help=f"auto: best ratio at or above this MB/s (default {DEFAULT_MIN_SPEED})")
+    target.add_argument("--min-ratio", type=float, default=None, help="auto: fastest codec reaching this ratio")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for codec in CODECS.values():
+            print(f"{codec.name:7} id {codec.codec_id}  levels {codec.levels.start}-{codec.levels.stop - 1}"
+                  f"  default {codec.default_level}")
+        return
+    if args.command == "probe":
+        with open_binary(args.input, 'rb') as f_in:
+            sample = f_in.read(SAMPLE_SIZE)
+        for codec, level, ratio, speed in sorted(probe(sample), key=lambda c: -c[2]):
+            print(f"{codec.name:7} level {level:2}  ratio {ratio:6.2f}  {speed:8.1f} MB/s")
+        codec, level = choose(sample, args.min_speed, args.min_ratio)
+        print(f"auto picks {codec.name} level {level}")
+        return
+    if args.input is None or args.output is None:
+        parser.error(f"{args.command} needs input and output")
+
+    try:
+        with open_binary(args.input, 'rb') as f_in, open_binary(args.output, 'wb') as f_out:
+            if args.command == "compress":
+                name, level, read, written = compress_stream(f_in, f_out, args.codec, args.level,
+                                                             args.min_speed, args.min_ratio)
+                print(f"{name} level {level}: {read} -> {written} bytes", file=sys.stderr)
+            else:
+                name, read, written = decompress_stream(f_in, f_out)
+                print(f"{name}: {read} -> {written} bytes", file=sys.stderr)
+    except (OSError, ValueError, zlib.error, lzma.LZMAError) as e:
+        sys.exit(f"Error {args.command.replace('ss', 'ssing')} file: {e}")
+
+
+if __name__ == "__main__":
+    main()
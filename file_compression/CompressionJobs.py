@@ -0,0 +1,236 @@
+"""Persistent compression job queue for server.py.
+
+``submit`` records an upload already saved under the jobs directory in a
+SQLite queue (``jobs.db``); worker processes started by ``start_workers`` (or
+``python CompressionJobs.py work``) claim queued jobs one at a time, gzip them
+to ``<id>.gz`` and record progress as they go. A running job whose worker has
+not reported progress for ``STALE_AFTER`` seconds (the process died, or the
+server was restarted) is queued again by the next claim, so nothing is lost.
+A job that raises is marked failed with the error and the worker moves on.
+
+    python CompressionJobs.py work --jobs-dir jobs -j 4
+    python CompressionJobs.py list --jobs-dir jobs
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import time
+import uuid
+import zlib
+
+from FileCompressor import GZIP_WBITS, compress_stream
+
+JOBS_DIR = 'jobs'
+POLL_INTERVAL = 0.5
+# How often a worker writes bytes_read back; every chunk would serialise on the database lock
+PROGRESS_INTERVAL = 0.5
+# A running job with no progress report for this long has lost its worker
+STALE_AFTER = 60
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def connect(jobs_dir):
+    conn = sqlite3.connect(os.path.join(jobs_dir, 'jobs.db'), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+
+def init_queue(jobs_dir):
+    os.makedirs(jobs_dir, exist_ok=True)
+    conn = connect(jobs_dir)
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            input_size INTEGER NOT NULL,
+            bytes_read INTEGER NOT NULL DEFAULT 0,
+            bytes_written INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            heartbeat_at REAL,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, created_at);
+    ''')
+    if 'heartbeat_at' not in {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}:
+        conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+    conn.close()
+
+
+def requeue_stale(conn, stale_after=STALE_AFTER):
+    """Queue again the running jobs whose worker stopped reporting progress."""
+    conn.execute("UPDATE jobs SET status = ?, bytes_read = 0, bytes_written = 0, started_at = NULL, "
+                 "heartbeat_at = NULL WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+                 (QUEUED, RUNNING, time.time() - stale_after))
+
+
+def input_path(jobs_dir, job_id):
+    return os.path.join(jobs_dir, f'{job_id}.upload')
+
+
+def output_path(jobs_dir, job_id):
+    return os.path.join(jobs_dir, f'{job_id}.gz')
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+def submit(jobs_dir, job_id, filename, level=zlib.Z_DEFAULT_COMPRESSION):
+    """Queue the upload already written to input_path(jobs_dir, job_id)."""
+    conn = connect(jobs_dir)
+    conn.execute("INSERT INTO jobs (id, filename, level, status, input_size, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                 (job_id, filename, level, QUEUED, os.path.getsize(input_path(jobs_dir, job_id)), time.time()))
+    conn.close()
+    return job_id
+
+
+def status(jobs_dir, job_id):
+    """Job state with progress (0-1) and throughput in MB/s, or None for an unknown id."""
+    conn = connect(jobs_dir)
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    position = None
+    if row is not None and row['status'] == QUEUED:
+        position = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?",
+                                (QUEUED, row['created_at'])).fetchone()[0]
+    conn.close()
+    if row is None:
+        return None
+
+    job = dict(row)
+    job['queue_position'] = position
+    job['progress'] = job['bytes_read'] / job['input_size'] if job['input_size'] else float(job['status'] == DONE)
+    elapsed = None
+    if job['started_at'] is not None:
+        elapsed = (job['finished_at'] or time.time()) - job['started_at']
+    job['elapsed'] = elapsed
+    # Time spent waiting for a worker; keeps growing if no worker is running
+    job['queued_for'] = (job['started_at'] or time.time()) - job['created_at']
+    job['throughput'] = job['bytes_read'] / elapsed / 1e6 if elapsed else None
+    return job
+
+
+def list_jobs(jobs_dir, limit=50):
+    conn = connect(jobs_dir)
+    rows = [dict(row) for row in conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))]
+    conn.close()
+    return rows
+
+
+def claim(conn):
+    """Mark the oldest queued job as running and return it, or None if the queue is empty."""
+    # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same job
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        requeue_stale(conn)
+        row = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                           (QUEUED,)).fetchone()
+        if row is not None:
+            now = time.time()
+            conn.execute("UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                         (RUNNING, now, now, row['id']))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+class ProgressReader:
+    """File-like wrapper that stores bytes read so far (and a heartbeat) on the job row every PROGRESS_INTERVAL."""
+    def __init__(self, f, conn, job_id):
+        self.f = f
+        self.conn = conn
+        self.job_id = job_id
+        self.read_bytes = 0
+        self.reported_at = time.monotonic()
+
+    def readinto(self, buffer):
+        n = self.f.readinto(buffer)
+        self.read_bytes += n
+        if time.monotonic() - self.reported_at >= PROGRESS_INTERVAL:
+            self.conn.execute("UPDATE jobs SET bytes_read = ?, heartbeat_at = ? WHERE id = ?",
+                              (self.read_bytes, time.time(), self.job_id))
+            self.reported_at = time.monotonic()
+        return n
+
+
+def run_job(conn, jobs_dir, job):
+    job_id = job['id']
+    target = output_path(jobs_dir, job_id)
+    partial = target + '.part'
+    try:
+        with open(input_path(jobs_dir, job_id), 'rb') as f_in, open(partial, 'wb') as f_out:
+            read, written = compress_stream(ProgressReader(f_in, conn, job_id), f_out, job['level'], GZIP_WBITS)
+        os.replace(partial, target)
+    except Exception as e:
+        # Any error (including a locked jobs.db while reporting progress) fails just this job
+        if os.path.exists(partial):
+            os.remove(partial)
+        conn.execute("UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                     (FAILED, time.time(), f"{type(e).__name__}: {e}", job_id))
+        return
+    conn.execute("UPDATE jobs SET status = ?, finished_at = ?, bytes_read = ?, bytes_written = ? WHERE id = ?",
+                 (DONE, time.time(), read, written, job_id))
+    os.remove(input_path(jobs_dir, job_id))
+
+
+def worker(jobs_dir, stop=None):
+    """Claim and run jobs until stop is set, polling the queue when it is empty."""
+    conn = connect(jobs_dir)
+    while stop is None or not stop.is_set():
+        job = claim(conn)
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        run_job(conn, jobs_dir, job)
+    conn.close()
+
+
+def start_workers(jobs_dir=JOBS_DIR, workers=None):
+    """Start worker processes in the background; returns (processes, stop event)."""
+    init_queue(jobs_dir)
+    stop = multiprocessing.Event()
+    processes = []
+    for _ in range(workers or os.cpu_count() or 1):
+        process = multiprocessing.Process(target=worker, args=(jobs_dir, stop), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes, stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run or inspect the compression job queue")
+    parser.add_argument("command", choices=["work", "list"])
+    parser.add_argument("--jobs-dir", default=JOBS_DIR)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        init_queue(args.jobs_dir)
+        for job in list_jobs(args.jobs_dir):
+            print(f"{job['id']}  {job['status']:7}  {job['bytes_read']}/{job['input_size']} -> "
+                  f"{job['bytes_written']} bytes  {job['filename']}")
+        return
+
+    processes, stop = start_workers(args.jobs_dir, args.workers)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Deduplicating compression: content-defined chunks in a content-addressed store.
+
+``add`` cuts the input with a FastCDC-style rolling gear hash (cut points
+depend on the content, so an insertion only changes the chunks around it).
+The hash at every position is computed for a whole read buffer at once with
+NumPy, so chunking runs far faster than a per-byte Python loop;
+compresses each chunk not yet in the store with a Codecs codec and writes a
+small JSON manifest listing the chunk hashes in order. Re-adding a slightly
+changed file only compresses and stores the changed chunks. ``restore``
+fetches, decompresses and verifies chunks on a thread pool and writes them in
+order.
+
+Store layout: ``<store>/<first 2 hex digits>/<sha256>``, each chunk file
+starting with the Codecs header so any codec can be mixed in one store.
+
+    python DedupStore.py add dump-0601.log dump-0601.fcm --store chunks
+    python DedupStore.py add dump-0602.log dump-0602.fcm --store chunks --codec lzma
+    python DedupStore.py restore dump-0602.fcm dump-0602.log --store chunks -j 8
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import Codecs
+from FileCompressor import open_binary
+from ParallelGzip import _ordered, default_workers
+
+STORE_DIR = 'dedup_store'
+MANIFEST_FORMAT = 'fcdedup-1'
+MIN_SIZE = 4 * 1024
+AVG_SIZE = 16 * 1024
+MAX_SIZE = 64 * 1024
+READ_SIZE = 1024 * 1024
+MASK64 = (1 << 64) - 1
+# One fixed pseudo-random 64-bit value per byte; derived from SHA-256 so it never changes,
+# since different values would move every cut point and defeat dedup against older manifests
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'little') for i in range(256)]
+GEAR_ARRAY = np.array(GEAR, dtype=np.uint64)
+# The hash shifts one bit per byte, so only the last 64 bytes reach its value
+WINDOW = 64
+HASH_BLOCK = 32 * 1024
+
+
+def _mask(bits):
+    # The hash shifts left, so its top bits depend on the most recent 64 bytes
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+def _window_hashes(values):
+    """Gear hash over the WINDOW bytes ending at each position, from per-byte GEAR values.
+
+    Built by doubling: the hash of 2w bytes is the hash of the last w bytes plus
+    the hash of the w before them shifted left by w (uint64 arithmetic wraps).
+    """
+    hashes = GEAR_ARRAY[values]
+    width = 1
+    while width < WINDOW:
+        hashes[width:] += hashes[:-width] << np.uint64(width)
+        width *= 2
+    return hashes
+
+
+def gear_hashes(data):
+    """Gear hash over the WINDOW bytes ending at each position of data, as a uint64 array."""
+    values = np.frombuffer(bytes(data), dtype=np.uint8)
+    hashes = np.empty(len(values), dtype=np.uint64)
+    # Blocks small enough to stay in cache; each one starts with the WINDOW - 1 bytes before it
+    for block in range(0, len(values), HASH_BLOCK):
+        lo = max(block - WINDOW + 1, 0)
+        hashes[block:block + HASH_BLOCK] = _window_hashes(values[lo:block + HASH_BLOCK])[block - lo:]
+    return hashes
+
+
+def cut_point(data, start, min_size=MIN_SIZE, avg_size=AVG_SIZE, max_size=MAX_SIZE, hashes=None):
+    """Length of the chunk of data beginning at start.
+
+    Normalized chunking: a stricter mask before avg_size and a looser one
+    after it keep chunk sizes close to avg_size. The hash restarts at
+    start + min_size; hashes (from gear_hashes(data)) answers every position
+    once the restarted hash has seen a full window.
+    """
+    remaining = len(data) - start
+    if remaining <= min_size:
+        return remaining
+    end = start + min(remaining, max_size)
+    normal = start + min(avg_size, remaining)
+    bits = avg_size.bit_length() - 1
+    mask_small, mask_large = _mask(bits + 2), _mask(bits - 2)
+    gear = GEAR
+    h = 0
+    i = start + min_size
+    exact_end = end if hashes is None else min(end, i + WINDOW - 1)
+    while i < exact_end:
+        h = ((h << 1) + gear[data[i]]) & MASK64
+        if not h & (mask_small if i < normal else mask_large):
+            return i + 1 - start
+        i += 1
+    if i < normal:
+        hits = np.flatnonzero((hashes[i:normal] & np.uint64(mask_small)) == 0)
+        if len(hits):
+            return i + int(hits[0]) + 1 - start
+        i = normal
+    if i < end:
+        hits = np.flatnonzero((hashes[i:end] & np.uint64(mask_large)) == 0)
+        if len(hits):
+            return i + int(hits[0]) + 1 - start
+    return end - start
+
+
+def chunk_stream(f_in, min_size=MIN_SIZE, avg_size=AVG_SIZE, max_size=MAX_SIZE):
+    """Yield the content-defined chunks of f_in."""
+    buffer = bytearray()
+    eof = False
+    while not eof:
+        data = f_in.read(READ_SIZE)
+        eof = not data
+        buffer += data
+        hashes = gear_hashes(buffer)
+        start = 0
+        # Only cut where max_size bytes are buffered (or at EOF), so a cut never depends on read sizes
+        while len(buffer) - start >= (1 if eof else max_size):
+            n = cut_point(buffer, start, min_size, avg_size, max_size, hashes)
+            yield bytes(buffer[start:start + n])
+            start += n
+        del buffer[:start]
+
+
+def chunk_path(store, digest):
+    return os.path.join(store, digest[:2], digest)
+
+
+def encode_chunk(chunk, codec, level):
+    """Codecs header plus chunk compressed with codec, or stored if that does not pay off."""
+    compressed = Codecs.compress_bytes(codec, level, chunk)
+    if len(compressed) * Codecs.MIN_USEFUL_RATIO > len(chunk):
+        codec, level, compressed = Codecs.CODECS['store'], 0, chunk
+    return Codecs.HEADER.pack(Codecs.MAGIC, codec.codec_id, level) + compressed
+
+
+def decode_chunk(data):
+    codec, _ = Codecs.read_header(io.BytesIO(data))
+    decompressor = codec.decompressor()
+    return decompressor.decompress(data[Codecs.HEADER.size:])
+
+
+def write_chunk(store, digest, chunk, codec, level):
+    """Store chunk under digest; returns the bytes written."""
+    path = chunk_path(store, digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    encoded = encode_chunk(chunk, codec, level)
+    # Unique temp name: concurrent adds of the same chunk each replace it with identical content
+    partial = f'{path}.{uuid.uuid4().hex}.part'
+    with open(partial, 'wb') as f:
+        f.write(encoded)
+    os.replace(partial, path)
+    return len(encoded)
+
+
+def read_chunk(store, digest, size):
+    with open(chunk_path(store, digest), 'rb') as f:
+        chunk = decode_chunk(f.read())
+    if len(chunk) != size or hashlib.sha256(chunk).hexdigest() != digest:
+        raise ValueError(f"chunk {digest} is corrupt")
+    return chunk
+
+
+def add(f_in, store=STORE_DIR, codec='zlib', level=None, workers=None):
+    """Chunk f_in into store; returns (manifest dict, stats dict)."""
+    codec = Codecs.get_codec(codec)
+    # The level goes into each chunk's header byte, so it must be one the codec accepts
+    level = Codecs.check_level(codec, level)
+    workers = workers or default_workers()
+    os.makedirs(store, exist_ok=True)
+    file_hash = hashlib.sha256()
+    chunks = []
+    stats = {'chunks': 0, 'new_chunks': 0, 'read': 0, 'new_bytes': 0, 'stored_bytes': 0}
+    seen = set()
+
+    def tasks():
+        for chunk in chunk_stream(f_in):
+            digest = hashlib.sha256(chunk).hexdigest()
+            file_hash.update(chunk)
+            chunks.append([digest, len(chunk)])
+            stats['chunks'] += 1
+            stats['read'] += len(chunk)
+            if digest in seen or os.path.exists(chunk_path(store, digest)):
+                continue
+            seen.add(digest)
+            stats['new_chunks'] += 1
+            stats['new_bytes'] += len(chunk)
+            yield write_chunk, (store, digest, chunk, codec, level)
+
+    with ThreadPoolExecutor(workers) as pool:
+        for written in _ordered(pool, tasks(), workers * 2):
+            stats['stored_bytes'] += written
+    manifest = {'format': MANIFEST_FORMAT, 'size': stats['read'], 'sha256': file_hash.hexdigest(),
+                'chunker': {'min': MIN_SIZE, 'avg': AVG_SIZE, 'max': MAX_SIZE}, 'chunks': chunks}
+    return manifest, stats
+
+
+def restore(manifest, f_out, store=STORE_DIR, workers=None):
+    """Write the file described by manifest to f_out; returns the bytes written."""
+    if not isinstance(manifest, dict) or manifest.get('format') != MANIFEST_FORMAT:
+        raise ValueError("not a dedup manifest")
+    workers = workers or default_workers()
+    file_hash = hashlib.sha256()
+    written = 0
+    with ThreadPoolExecutor(workers) as pool:
+        # Reads and decompression overlap on the pool; chunks are still written in order
+        tasks = ((read_chunk, (store, digest, size)) for digest, size in manifest['chunks'])
+        for chunk in _ordered(pool, tasks, workers * 4):
+            file_hash.update(chunk)
+            f_out.write(chunk)
+            written += len(chunk)
+    if written != manifest['size'] or file_hash.hexdigest() != manifest['sha256']:
+        raise ValueError("restored data does not match the manifest")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicating compression into a content-addressed chunk store")
+    parser.add_argument("command", choices=["add", "restore"])
+    parser.add_argument("input", help="file to add (or - for stdin), or manifest to restore")
+    parser.add_argument("output", help="manifest to write, or restored file (- for stdout)")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--codec", default="zlib", help=f"chunk codec, one of: {', '.join(Codecs.CODECS)}")
+    parser.add_argument("--level", type=int, default=None)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="threads (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        if args.command == "add":
+            with open_binary(args.input, 'rb') as f_in:
+                manifest, stats = add(f_in, args.store, args.codec, args.level, args.workers)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, separators=(',', ':'))
+            print(f"{stats['read']} bytes in {stats['chunks']} chunks, {stats['new_chunks']} new "
+                  f"({stats['new_bytes']} -> {stats['stored_bytes']} bytes stored) "
+                  f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        else:
+            with open(args.input, encoding='utf-8') as f:
+                manifest = json.load(f)
+            with open_binary(args.output, 'wb') as f_out:
+                written = restore(manifest, f_out, args.store, args.workers)
+            print(f"{written} bytes restored in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    except (OSError, ValueError, zlib.error) as e:
+        sys.exit(f"Error {'adding' if args.command == 'add' else 'restoring'} file: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Compression of many small files with a shared, trained preset dictionary.
+
+Small files compress badly on their own: every file starts with an empty
+window and pays container overhead. ``train`` builds a dictionary from a
+sample corpus (zstd's trainer when ``zstandard`` is installed, otherwise the
+lines and words found in the most files, packed into a 32 KiB zlib
+``zdict``) and stores it as ``<dict id>.fcd`` in the dictionary directory,
+where ``LATEST`` names the newest one. The id is derived from the content, so
+retraining creates a new version and old outputs keep decompressing.
+
+Each output has a 12 byte header (magic, codec id, level, dictionary id,
+CRC32 of the original) and a raw deflate or zstd frame; ``decompress``
+finds the dictionary by its id. ``batch`` and ``unbatch`` run over whole
+directory trees in a process pool that loads the dictionary once per worker.
+
+    python DictCompressor.py train notes/ --dict-dir dictionaries
+    python DictCompressor.py batch notes/ notes.fcy/ --dict-dir dictionaries -j 8
+    python DictCompressor.py unbatch notes.fcy/ restored/ --dict-dir dictionaries
+    python DictCompressor.py compress note.txt note.txt.fcy --dict-dir dictionaries
+    python DictCompressor.py decompress note.txt.fcy note.txt --dict-dir dictionaries
+"""
+import argparse
+import collections
+import hashlib
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import Codecs
+from FileCompressor import default_workers, open_binary, walk_parallel
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+ERRORS = (OSError, ValueError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+DICT_DIR = 'dictionaries'
+DICT_MAGIC = b'FCD\x01'
+DICT_HEADER = struct.Struct('<4sBI')
+FILE_MAGIC = b'FY'
+# magic, codec id, level, dictionary id, crc32 of the original
+FILE_HEADER = struct.Struct('<2sBBII')
+SUFFIX = '.fcy'
+# zlib can only look 32 KiB back, so a bigger zdict is wasted
+ZLIB_DICT_SIZE = 32 * 1024
+ZSTD_DICT_SIZE = 110 * 1024
+MAX_SAMPLE_SIZE = 64 * 1024
+MAX_SAMPLE_TOTAL = 16 * 1024 * 1024
+MAX_SEGMENT = 256
+WORD = re.compile(rb'\S{4,}\s?')
+VERBS = {'train': 'training dictionary', 'compress': 'compressing file', 'decompress': 'decompressing file',
+         'batch': 'compressing files', 'unbatch': 'decompressing files'}
+
+
+def dictionary_id(codec_id, data):
+    return int.from_bytes(hashlib.sha256(bytes([codec_id]) + data).digest()[:4], 'little')
+
+
+class Dictionary:
+    def __init__(self, codec_name, data):
+        self.codec = Codecs.get_codec(codec_name)
+        self.data = data
+        self.dict_id = dictionary_id(self.codec.codec_id, data)
+        self._compressors = {}
+        self._decompressor = None
+
+    def compress(self, data, level):
+        """Raw compressed body of data (no header)."""
+        if self.codec.name == 'zstd':
+            compressor = self._compressors.get(level)
+            if compressor is None:
+                compressor = self._compressors[level] = zstandard.ZstdCompressor(
+                    level=level, dict_data=zstandard.ZstdCompressionDict(self.data),
+                    write_checksum=False, write_dict_id=False, write_content_size=True)
+            return compressor.compress(data)
+        # Priming a compressobj with a 32 KiB zdict costs more than a small file; copy a primed one
+        primed = self._compressors.get(level)
+        if primed is None:
+            primed = self._compressors[level] = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+                                                                 zdict=self.data)
+        compressor = primed.copy()
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, body):
+        if self.codec.name == 'zstd':
+            if self._decompressor is None:
+                self._decompressor = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(self.data))
+            return self._decompressor.decompress(body)
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.data)
+        data = decompressor.decompress(body) + decompressor.flush()
+        if not decompressor.eof:
+            raise zlib.error("compressed data is truncated")
+        return data
+
+
+def segments(data):
+    """Lines (long ones cut in MAX_SEGMENT pieces) and words of data: the dictionary candidates."""
+    for line in data.splitlines(keepends=True):
+        for start in range(0, len(line), MAX_SEGMENT):
+            yield line[start:start + MAX_SEGMENT]
+    yield from WORD.findall(data)
+
+
+def train_zlib(samples, size=ZLIB_DICT_SIZE):
+    """A zdict of the segments shared by the most samples, weighted by length."""
+    files_containing = collections.Counter()
+    for data in samples:
+        files_containing.update(set(segments(data)))
+    ranked = sorted(((count * len(segment), segment) for segment, count in files_containing.items() if count > 1),
+                    reverse=True)
+    chosen, total = [], 0
+    for _, segment in ranked:
+        if total + len(segment) <= size:
+            chosen.append(segment)
+            total += len(segment)
+    # Nearer matches are cheaper to encode, so the most valuable segments go last, next to the data
+    return b''.join(reversed(chosen))
+
+
+def train(samples, codec=None, size=None):
+    """Train a Dictionary from a list of sample byte strings."""
+    if not samples:
+        raise ValueError("no samples to train on")
+    codec = codec or ('zstd' if zstandard is not None else 'zlib')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd dictionaries need the zstandard package")
+        try:
+            trained = zstandard.train_dictionary(size or ZSTD_DICT_SIZE, samples)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"zstd training failed (too few or too small samples?): {e}")
+        return Dictionary('zstd', trained.as_bytes())
+    if codec != 'zlib':
+        raise ValueError("dictionaries are supported for zlib and zstd")
+    return Dictionary('zlib', train_zlib(samples, size or ZLIB_DICT_SIZE))
+
+
+def load_samples(paths, max_size=MAX_SAMPLE_SIZE, max_total=MAX_SAMPLE_TOTAL):
+    """Sample byte strings from files and directory trees, each capped at max_size."""
+    samples, total = [], 0
+    for path in paths:
+        files = [os.path.join(path, name) for name in walk_parallel(path)] if os.path.isdir(path) else [path]
+        for name in files:
+            with open(name, 'rb') as f:
+                data = f.read(max_size)
+            if not data:
+                continue
+            samples.append(data)
+            total += len(data)
+            if total >= max_total:
+                return samples
+    return samples
+
+
+def save_dictionary(dictionary, dict_dir=DICT_DIR):
+    """Store dictionary as <id>.fcd and make it the LATEST; returns its path."""
+    os.makedirs(dict_dir, exist_ok=True)
+    path = os.path.join(dict_dir, f'{dictionary.dict_id:08x}.fcd')
+    with open(path, 'wb') as f:
+        f.write(DICT_HEADER.pack(DICT_MAGIC, dictionary.codec.codec_id, dictionary.dict_id) + dictionary.data)
+    with open(os.path.join(dict_dir, 'LATEST.part'), 'w') as f:
+        f.write(f'{dictionary.dict_id:08x}\n')
+    os.replace(os.path.join(dict_dir, 'LATEST.part'), os.path.join(dict_dir, 'LATEST'))
+    return path
+
+
+def load_dictionary(dict_dir=DICT_DIR, dict_id=None):
+    """The dictionary with dict_id from dict_dir, or the LATEST one."""
+    if dict_id is None:
+        try:
+            with open(os.path.join(dict_dir, 'LATEST')) as f:
+                dict_id = int(f.read().strip(), 16)
+        except FileNotFoundError:
+            raise ValueError(f"no dictionary in {dict_dir}; run train first")
+    try:
+        with open(os.path.join(dict_dir, f'{dict_id:08x}.fcd'), 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        raise ValueError(f"dictionary {dict_id:08x} is not in {dict_dir}")
+    magic, codec_id, stored_id = DICT_HEADER.unpack(content[:DICT_HEADER.size])
+    if magic != DICT_MAGIC or codec_id not in Codecs.CODEC_IDS:
+        raise ValueError(f"dictionary {dict_id:08x} is damaged or needs a missing codec")
+    dictionary = Dictionary(Codecs.CODEC_IDS[codec_id].name, content[DICT_HEADER.size:])
+    if dictionary.dict_id != stored_id:
+        raise ValueError(f"dictionary {dict_id:08x} is damaged")
+    return dictionary
+
+
+def compress_bytes(dictionary, data, level=None):
+    level = Codecs.check_level(dictionary.codec, level)
+    header = FILE_HEADER.pack(FILE_MAGIC, dictionary.codec.codec_id, level, dictionary.dict_id, zlib.crc32(data))
+    return header + dictionary.compress(data, level)
+
+
+def read_file_header(data):
+    if len(data) < FILE_HEADER.size or data[:2] != FILE_MAGIC:
+        raise ValueError("not a dictionary-compressed file")
+    _, codec_id, _, dict_id, crc = FILE_HEADER.unpack(data[:FILE_HEADER.size])
+    return codec_id, dict_id, crc
+
+
+def decompress_bytes(data, dict_dir=DICT_DIR, cache=None):
+    """Original bytes of data, loading (and caching) the dictionary its header names."""
+    _, dict_id, crc = read_file_header(data)
+    cache = {} if cache is None else cache
+    if dict_id not in cache:
+        cache[dict_id] = load_dictionary(dict_dir, dict_id)
+    original = cache[dict_id].decompress(data[FILE_HEADER.size:])
+    if zlib.crc32(original) != crc:
+        raise ValueError("CRC mismatch")
+    return original
+
+
+_worker_dictionary = None
+_worker_cache = {}
+
+
+def _init_worker(dict_dir, dict_id):
+    global _worker_dictionary
+    if dict_id != -1:
+        _worker_dictionary = load_dictionary(dict_dir, dict_id)
+
+
+def _compress_one(source, target, level):
+    with open(source, 'rb') as f:
+        data = f.read()
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    output = compress_bytes(_worker_dictionary, data, level)
+    with open(target, 'wb') as f:
+        f.write(output)
+    return len(data), len(output)
+
+
+def _decompress_one(source, target, dict_dir):
+    with open(source, 'rb') as f:
+        data = f.read()
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    output = decompress_bytes(data, dict_dir, _worker_cache)
+    with open(target, 'wb') as f:
+        f.write(output)
+    return len(data), len(output)
+
+
+def batch(source_dir, target_dir, dict_dir=DICT_DIR, dict_id=None, level=None, workers=None, decompress=False):
+    """(De)compress every file under source_dir into target_dir; returns (files, read, written)."""
+    names = walk_parallel(source_dir, workers)
+    if decompress:
+        names = [name for name in names if name.endswith(SUFFIX)]
+        targets = [os.path.join(target_dir, name[:-len(SUFFIX)]) for name in names]
+        task, extra, init_id = _decompress_one, dict_dir, -1
+    else:
+        # Resolve LATEST once so every worker uses the same version
+        dictionary = load_dictionary(dict_dir, dict_id)
+        dict_id = dictionary.dict_id
+        # Rejected here rather than once per file in the workers
+        Codecs.check_level(dictionary.codec, level)
+        targets = [os.path.join(target_dir, name + SUFFIX) for name in names]
+        task, extra, init_id = _compress_one, level, dict_id
+    sources = [os.path.join(source_dir, name) for name in names]
+    read = written = 0
+    with ProcessPoolExecutor(workers or default_workers(), initializer=_init_worker,
+                             initargs=(dict_dir, init_id)) as pool:
+        # Files are tiny: hand them out in large chunks so IPC does not dominate
+        for n_read, n_written in pool.map(task, sources, targets, [extra] * len(sources), chunksize=256):
+            read += n_read
+            written += n_written
+    return len(sources), read, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress small files with a shared trained dictionary")
+    parser.add_argument("command", choices=["train", "compress", "decompress", "batch", "unbatch"])
+    parser.add_argument("paths", nargs="+", help="train: SAMPLES...; others: INPUT OUTPUT")
+    parser.add_argument("--dict-dir", default=DICT_DIR)
+    parser.add_argument("--dict-id", type=lambda value: int(value, 16), default=None,
+                        help="dictionary version (hex id) to compress with (default: LATEST)")
+    parser.add_argument("--codec", choices=["zlib", "zstd"], default=None,
+                        help="train: dictionary type (default: zstd if installed, else zlib)")
+    parser.add_argument("--size", type=int, default=None, help="train: dictionary size in bytes")
+    parser.add_argument("--level", type=int, default=None)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="processes (default: CPU count)")
+    args = parser.parse_args()
+    if args.command != "train" and len(args.paths) != 2:
+        parser.error(f"{args.command} needs input and output")
+
+    start = time.perf_counter()
+    try:
+        if args.command == "train":
+            samples = load_samples(args.paths)
+            dictionary = train(samples, args.codec, args.size)
+            path = save_dictionary(dictionary, args.dict_dir)
+            level = dictionary.codec.default_level
+            plain = sum(len(Codecs.compress_bytes(dictionary.codec, level, data)) for data in samples)
+            trained = sum(len(compress_bytes(dictionary, data)) for data in samples)
+            print(f"{dictionary.codec.name} dictionary {dictionary.dict_id:08x} ({len(dictionary.data)} bytes) "
+                  f"-> {path}", file=sys.stderr)
+            print(f"{len(samples)} samples: {sum(map(len, samples))} bytes -> {plain} without, "
+                  f"{trained} with the dictionary", file=sys.stderr)
+        elif args.command in ("compress", "decompress"):
+            with open_binary(args.paths[0], 'rb') as f_in:
+                data = f_in.read()
+            if args.command == "compress":
+                output = compress_bytes(load_dictionary(args.dict_dir, args.dict_id), data, args.level)
+            else:
+                output = decompress_bytes(data, args.dict_dir)
+            with open_binary(args.paths[1], 'wb') as f_out:
+                f_out.write(output)
+            print(f"{len(data)} -> {len(output)} bytes", file=sys.stderr)
+        else:
+            files, read, written = batch(args.paths[0], args.paths[1], args.dict_dir, args.dict_id, args.level,
+                                         args.workers, decompress=args.command == "unbatch")
+            elapsed = time.perf_counter() - start
+            print(f"{files} files, {read} -> {written} bytes in {elapsed:.2f}s "
+                  f"({files / max(elapsed, 1e-9):.0f} files/s)", file=sys.stderr)
+    except ERRORS as e:
+        sys.exit(f"Error {VERBS[args.command]}: {e}")
+
+if __name__ == "__main__":
+    main()
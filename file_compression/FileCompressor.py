@@ -1,30 +1,175 @@
+"""File compression tool: a Tk GUI, a command line and helpers for server.py.
+
+Compression and decompression stream through zlib ``compressobj`` and
+``decompressobj`` with one reusable buffer of ``CHUNK_SIZE`` bytes, so memory
+stays constant whatever the file size and output starts immediately. Both
+accept paths or binary file-like objects ('-' is stdin/stdout on the command
+line).
+
+    python FileCompressor.py                       # GUI
+    python FileCompressor.py compress big.log big.log.z
+    python FileCompressor.py decompress big.log.z - | less
+"""
+import argparse
+import contextlib
 import os
+import sys
 import zlib
-import tkinter as tk
-from tkinter import filedialog, messagebox
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+except ImportError:
+    # Headless use from the command line or server.py
+    tk = None
+
+CHUNK_SIZE = 256 * 1024
+ZLIB_WBITS = zlib.MAX_WBITS
+GZIP_WBITS = zlib.MAX_WBITS | 16
+# Accept either a zlib or a gzip header when decompressing
+AUTO_WBITS = zlib.MAX_WBITS | 32
+
+
+@contextlib.contextmanager
+def open_binary(file, mode):
+    """Yield a binary file object for a path, '-' (stdin/stdout) or an open file-like object."""
+    if file == '-':
+        yield sys.stdin.buffer if 'r' in mode else sys.stdout.buffer
+    elif isinstance(file, (str, bytes, os.PathLike)):
+        with open(file, mode) as f:
+            yield f
+    else:
+        yield file
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def walk_parallel(root, workers=None):
+    """Relative paths of the regular files under root, sorted; directories are listed concurrently."""
+    def scan(directory):
+        files, subdirs = [], []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(os.path.relpath(entry.path, root))
+        return files, subdirs
+
+    found = []
+    with ThreadPoolExecutor(workers or default_workers()) as pool:
+        pending = {pool.submit(scan, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                found.extend(files)
+                pending.update(pool.submit(scan, directory) for directory in subdirs)
+    return sorted(found)
+
+
+class PrefixedReader:
+    """File-like object replaying prefix (bytes already read) before the rest of f."""
+    def __init__(self, prefix, f):
+        self.prefix = prefix
+        self.f = f
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.f.read(size)
+        data = self.prefix if size < 0 else self.prefix[:size]
+        self.prefix = self.prefix[len(data):]
+        if size < 0 or len(data) < size:
+            data += self.f.read(-1 if size < 0 else size - len(data))
+        return data
+
+
+def read_chunks(f_in, chunk_size=CHUNK_SIZE):
+    """Yield views of one reusable buffer filled from f_in until EOF."""
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    readinto = getattr(f_in, 'readinto', None)
+    while True:
+        if readinto is not None:
+            n = readinto(buffer)
+            if not n:
+                break
+            yield view[:n]
+        else:
+            data = f_in.read(chunk_size)
+            if not data:
+                break
+            yield data
+
+
+def compress_stream(f_in, f_out, level=zlib.Z_DEFAULT_COMPRESSION, wbits=ZLIB_WBITS, chunk_size=CHUNK_SIZE):
+    """Compress f_in into f_out chunk by chunk; returns (bytes read, bytes written)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+    read = written = 0
+    for chunk in read_chunks(f_in, chunk_size):
+        read += len(chunk)
+        data = compressor.compress(chunk)
+        if data:
+            f_out.write(data)
+            written += len(data)
+    data = compressor.flush()
+    f_out.write(data)
+    return read, written + len(data)
+
+
+def decompress_stream(f_in, f_out, wbits=AUTO_WBITS, chunk_size=CHUNK_SIZE):
+    """Decompress f_in into f_out, never inflating more than chunk_size bytes at once.
+
+    Concatenated gzip members (as written by ``cat a.gz b.gz`` or pigz) are
+    decompressed one after another. Returns (bytes read, bytes written).
+    """
+    decompressor = zlib.decompressobj(wbits)
+    read = written = 0
+    for chunk in read_chunks(f_in, chunk_size):
+        read += len(chunk)
+        data = bytes(chunk)
+        while data:
+            output = decompressor.decompress(data, chunk_size)
+            f_out.write(output)
+            written += len(output)
+            if decompressor.eof:
+                data = decompressor.unused_data
+                if data:
+                    decompressor = zlib.decompressobj(wbits)
+            else:
+                data = decompressor.unconsumed_tail
+    output = decompressor.flush()
+    f_out.write(output)
+    written += len(output)
+    if not decompressor.eof:
+        raise zlib.error("compressed stream is truncated")
+    return read, written
+
+
+def compress_file(input_file, output_file, level=zlib.Z_DEFAULT_COMPRESSION, codec=None):
+    """Compress a file (path or binary file object) using zlib, or a Codecs codec ('auto' picks one)"""
+    with open_binary(input_file, 'rb') as f_in, open_binary(output_file, 'wb') as f_out:
+        if codec is None:
+            return compress_stream(f_in, f_out, level)
+        import Codecs
+        level = None if level == zlib.Z_DEFAULT_COMPRESSION else level
+        _, _, read, written = Codecs.compress_stream(f_in, f_out, codec, level)
+        return read, written
 
-def compress_file(input_file, output_file):
-    """Compress a file using zlib"""
-    try:
-        with open(input_file, 'rb') as f_in:
-            with open(output_file, 'wb') as f_out:
-                f_out.write(zlib.compress(f_in.read()))
-        return True
-    except Exception as e:
-        messagebox.showerror("Error", f"Error compressing file: {e}")
-        return False
 
 def decompress_file(input_file, output_file):
-    """Decompress a file using zlib"""
-    try:
-        with open(input_file, 'rb') as f_in:
-            with open(output_file, 'wb') as f_out:
-                f_out.write(zlib.decompress(f_in.read()))
-
-        return True
-    except Exception as e:
-        messagebox.showerror("Error", f"Error decompressing file: {e}")
-        return False
+    """Decompress a zlib, gzip or Codecs container file (path or binary file object)"""
+    import Codecs
+    with open_binary(input_file, 'rb') as f_in, open_binary(output_file, 'wb') as f_out:
+        magic = f_in.read(len(Codecs.MAGIC))
+        f_in = PrefixedReader(magic, f_in)
+        if magic == Codecs.MAGIC:
+            _, read, written = Codecs.decompress_stream(f_in, f_out)
+            return read, written
+        return decompress_stream(f_in, f_out)
 
 def select_file():
     return filedialog.askopenfilename()
@@ -40,8 +185,12 @@ def compress_action():
     if not output_file:
         return
 
-    if compress_file(input_file, output_file):
-        messagebox.showinfo("Success", "File compressed successfully.")
+    try:
+        compress_file(input_file, output_file)
+    except Exception as e:
+        messagebox.showerror("Error", f"Error compressing file: {e}")
+        return
+    messagebox.showinfo("Success", "File compressed successfully.")
 
 
 def decompress_action():
@@ -52,10 +201,14 @@ def decompress_action():
     if not output_file:
         return
 
-    if decompress_file(input_file, output_file):
-        messagebox.showinfo("Success", "File decompressed successfully.")
+    try:
+        decompress_file(input_file, output_file)
+    except Exception as e:
+        messagebox.showerror("Error", f"Error decompressing file: {e}")
+        return
+    messagebox.showinfo("Success", "File decompressed successfully.")
 
-def main():
+def run_gui():
     root = tk.Tk()
     root.title("File Compression Tool")
 
@@ -72,5 +225,27 @@ def main():
 
     root.mainloop()
 
+def main():
+    if len(sys.argv) == 1:
+        run_gui()
+        return
+    parser = argparse.ArgumentParser(description="Compress or decompress files with zlib")
+    parser.add_argument("command", choices=["compress", "decompress"])
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("output", help="output file, or - for stdout")
+    parser.add_argument("-l", "--level", type=int, default=zlib.Z_DEFAULT_COMPRESSION)
+    parser.add_argument("-c", "--codec", default=None,
+                        help="write a Codecs container with this codec, or auto (default: plain zlib)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "compress":
+            read, written = compress_file(args.input, args.output, args.level, args.codec)
+        else:
+            read, written = decompress_file(args.input, args.output)
+    except (OSError, ValueError, zlib.error) as e:
+        sys.exit(f"Error {args.command.replace('ss', 'ssing')} file: {e}")
+    print(f"{read} -> {written} bytes", file=sys.stderr)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,212 @@
+"""Multi-core gzip compression in the style of pigz.
+
+The input is cut into ``BLOCK_SIZE`` blocks that are deflated concurrently on
+a thread pool (zlib releases the GIL while it works). Two output layouts:
+
+* default: a single standard gzip member. Each block is primed with the last
+  32 KiB of the previous block as a preset dictionary and ends on a byte
+  boundary (``Z_SYNC_FLUSH``), so the concatenated blocks form one deflate
+  stream with almost the ratio of single-threaded gzip. Any ``gunzip`` reads
+  it, but decompression of a single member is inherently sequential.
+* ``independent``: one gzip member per block, each carrying its compressed
+  size in a gzip extra field (subfield ``PZ``, like BGZF). Still plain gzip to
+  ``gunzip``; ``decompress_parallel`` uses the sizes to inflate members on all
+  cores. Blocks lose the dictionary, so the ratio is slightly worse.
+
+    python ParallelGzip.py compress big.log big.log.gz -j 8
+    python ParallelGzip.py compress big.log big.log.gz --independent
+    python ParallelGzip.py decompress big.log.gz big.log
+"""
+import argparse
+import collections
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from Codecs import iter_decompress
+from FileCompressor import PrefixedReader, decompress_stream, default_workers, open_binary
+
+BLOCK_SIZE = 1024 * 1024
+DICT_SIZE = 32 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+FLAG_EXTRA = 0x04
+OS_UNKNOWN = 255
+EXTRA_ID = b'PZ'
+# magic, method, flags, mtime, xfl, os, xlen, subfield id, subfield len, member size
+INDEPENDENT_HEADER = struct.Struct('<2sBBIBBH2sHI')
+
+
+def gzip_header(flags=0):
+    return struct.pack('<2sBBIBB', GZIP_MAGIC, zlib.DEFLATED, flags, 0, 0, OS_UNKNOWN)
+
+
+def gzip_trailer(crc, size):
+    return struct.pack('<II', crc, size & 0xffffffff)
+
+
+def deflate_block(block, dictionary, level, last):
+    """Raw deflate of block, primed with dictionary, ending byte aligned (or final if last)."""
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(block)
+    return data + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def gzip_member(block, level):
+    """A complete gzip member for block, with its own size in the PZ extra field."""
+    deflated = deflate_block(block, None, level, last=True)
+    trailer = gzip_trailer(zlib.crc32(block), len(block))
+    size = INDEPENDENT_HEADER.size + len(deflated) + len(trailer)
+    header = INDEPENDENT_HEADER.pack(GZIP_MAGIC, zlib.DEFLATED, FLAG_EXTRA, 0, 0, OS_UNKNOWN,
+                                     8, EXTRA_ID, 4, size)
+    return header + deflated + trailer
+
+
+def _ordered(pool, tasks, window):
+    """Submit tasks (callable, args) keeping at most window in flight; yield results in order."""
+    pending = collections.deque()
+    for fn, args in tasks:
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_compress_parallel(f_in, level=6, block_size=BLOCK_SIZE, workers=None, independent=False, stats=None):
+    """Yield the gzip stream of f_in piece by piece as blocks finish; stats['read'] counts input bytes."""
+    workers = workers or default_workers()
+    stats = {} if stats is None else stats
+    stats['read'] = 0
+    crc = 0
+
+    def tasks():
+        nonlocal crc
+        previous = None
+        block = f_in.read(block_size)
+        while block:
+            following = f_in.read(block_size)
+            stats['read'] += len(block)
+            if independent:
+                yield gzip_member, (block, level)
+            else:
+                crc = zlib.crc32(block, crc)
+                dictionary = previous[-DICT_SIZE:] if previous else None
+                yield deflate_block, (block, dictionary, level, not following)
+            previous, block = block, following
+
+    if not independent:
+        yield gzip_header()
+    with ThreadPoolExecutor(workers) as pool:
+        # Twice as many blocks as workers in flight keeps every core busy with bounded memory
+        yield from _ordered(pool, tasks(), workers * 2)
+    if independent:
+        if not stats['read']:
+            yield gzip_member(b'', level)
+    else:
+        if not stats['read']:
+            yield deflate_block(b'', None, level, last=True)
+        yield gzip_trailer(crc, stats['read'])
+
+
+def compress_parallel(f_in, f_out, level=6, block_size=BLOCK_SIZE, workers=None, independent=False):
+    """Gzip f_in into f_out using workers threads; returns (bytes read, bytes written)."""
+    stats = {}
+    written = 0
+    for data in iter_compress_parallel(f_in, level, block_size, workers, independent, stats):
+        f_out.write(data)
+        written += len(data)
+    return stats['read'], written
+
+
+def read_members(f_in, header):
+    """Yield whole PZ gzip members from f_in, starting with the already read header."""
+    while header:
+        if len(header) < INDEPENDENT_HEADER.size:
+            raise zlib.error("truncated gzip member header")
+        magic, method, flags, _, _, _, xlen, extra_id, _, size = INDEPENDENT_HEADER.unpack(header)
+        if magic != GZIP_MAGIC or not flags & FLAG_EXTRA or xlen != 8 or extra_id != EXTRA_ID:
+            raise zlib.error("not a parallel gzip member")
+        body = f_in.read(size - len(header))
+        if len(body) != size - len(header):
+            raise zlib.error("truncated gzip member")
+        yield header + body
+        header = f_in.read(INDEPENDENT_HEADER.size)
+
+
+def inflate_member(member):
+    """Gunzip one PZ member, stopping as soon as it inflates past the size its trailer declares."""
+    # ISIZE is the size mod 2**32; members are one block, far below that
+    declared = struct.unpack('<I', member[-4:])[0]
+    # wbits 31: gzip framing, so zlib checks the member's CRC and length
+    decompressor = zlib.decompressobj(31)
+    parts, size = [], 0
+    for output in iter_decompress(decompressor, member):
+        size += len(output)
+        if size > declared:
+            raise zlib.error("gzip member inflates beyond its declared size")
+        parts.append(output)
+    if not decompressor.eof:
+        raise zlib.error("truncated gzip member")
+    return b''.join(parts)
+
+
+def decompress_parallel(f_in, f_out, workers=None):
+    """Gunzip f_in into f_out; returns (bytes read, bytes written).
+
+    Output of ``compress_parallel(independent=True)`` is inflated on all
+    cores; any other gzip or zlib input is decompressed sequentially.
+    """
+    workers = workers or default_workers()
+    header = f_in.read(INDEPENDENT_HEADER.size)
+    fields = INDEPENDENT_HEADER.unpack(header) if len(header) == INDEPENDENT_HEADER.size else None
+    if fields is None or fields[0] != GZIP_MAGIC or not fields[2] & FLAG_EXTRA or fields[7] != EXTRA_ID:
+        return decompress_stream(PrefixedReader(header, f_in), f_out)
+
+    read = written = 0
+    members = read_members(f_in, header)
+    with ThreadPoolExecutor(workers) as pool:
+        def tasks():
+            nonlocal read
+            for member in members:
+                read += len(member)
+                yield inflate_member, (member,)
+        for data in _ordered(pool, tasks(), workers * 2):
+            f_out.write(data)
+            written += len(data)
+    return read, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel gzip compression and decompression")
+    parser.add_argument("command", choices=["compress", "decompress"])
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("output", help="output file, or - for stdout")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="threads (default: CPU count)")
+    parser.add_argument("-l", "--level", type=int, default=6, choices=range(0, 10))
+    parser.add_argument("-b", "--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--independent", action="store_true",
+                        help="one gzip member per block, so decompression can run in parallel too")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        with open_binary(args.input, 'rb') as f_in, open_binary(args.output, 'wb') as f_out:
+            if args.command == "compress":
+                read, written = compress_parallel(f_in, f_out, args.level, args.block_size,
+                                                  args.workers, args.independent)
+            else:
+                read, written = decompress_parallel(f_in, f_out, args.workers)
+    except (OSError, zlib.error) as e:
+        sys.exit(f"Error {args.command.replace('ss', 'ssing')} file: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"{read} -> {written} bytes in {elapsed:.2f}s "
+          f"({max(read, written) / elapsed / 1e6:.1f} MB/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Seekable compressed files: read any byte range without decompressing the rest.
+
+Container format (``.fcs``), written by ``compress_seekable``::
+
+    header   MAGIC, codec id, level, block size
+    blocks   each block compressed independently with a Codecs codec
+    index    per block: uncompressed offset, compressed offset, compressed
+             size, uncompressed size, CRC32 of the uncompressed bytes
+    footer   index offset, block count, FOOTER_MAGIC
+
+``SeekableReader.read_range(offset, length)`` binary-searches the index and
+decompresses only the blocks overlapping the range.
+
+Existing gzip files get a side index (``<file>.fci``) from ``index_gzip``.
+Entry points are the start of every gzip member (concatenated, BGZF or
+``ParallelGzip --independent`` files) and, inside a member, byte-aligned
+sync-flush points (pigz and ``ParallelGzip`` output) at least ``span``
+bytes apart; those store the 32 KiB window needed to resume inflating. A
+plain ``gzip`` file has no such points, so its index has one entry and
+reads still start from the beginning.
+
+    python SeekableContainer.py create big.log big.fcs --codec zlib
+    python SeekableContainer.py read big.fcs 5000000000 1048576 > slice
+    python SeekableContainer.py index big.log.gz
+    python SeekableContainer.py read big.log.gz 5000000000 1048576 > slice
+"""
+import argparse
+import bisect
+import os
+import struct
+import sys
+import zlib
+
+import Codecs
+from FileCompressor import open_binary
+
+MAGIC = b'FCSK\x01'
+FOOTER_MAGIC = b'FCSKIDX1'
+HEADER = struct.Struct('<5sBBI')
+INDEX_ENTRY = struct.Struct('<QQIII')
+FOOTER = struct.Struct('<QI8s')
+BLOCK_SIZE = 1024 * 1024
+
+GZIP_INDEX_MAGIC = b'FCGZIDX1'
+GZIP_INDEX_HEADER = struct.Struct('<8sIQ')
+GZIP_INDEX_ENTRY = struct.Struct('<QQBI')
+KIND_MEMBER = 0
+KIND_SYNC = 1
+WINDOW_SIZE = 32 * 1024
+SPAN = 8 * 1024 * 1024
+SYNC_MARKER = b'\x00\x00\xff\xff'
+# Output compared against a fresh inflater before a sync point is trusted
+VERIFY_SIZE = 4096
+READ_SIZE = 64 * 1024
+
+
+def compress_seekable(f_in, f_out, codec='zlib', level=None, block_size=BLOCK_SIZE):
+    """Write f_in as a seekable container; returns (bytes read, bytes written)."""
+    codec = Codecs.get_codec(codec)
+    level = codec.default_level if level is None else level
+    f_out.write(HEADER.pack(MAGIC, codec.codec_id, level, block_size))
+    written = HEADER.size
+    read = 0
+    index = []
+    while True:
+        block = f_in.read(block_size)
+        if not block:
+            break
+        data = Codecs.compress_bytes(codec, level, block)
+        index.append(INDEX_ENTRY.pack(read, written, len(data), len(block), zlib.crc32(block)))
+        f_out.write(data)
+        read += len(block)
+        written += len(data)
+    index_offset = written
+    f_out.write(b''.join(index))
+    f_out.write(FOOTER.pack(index_offset, len(index), FOOTER_MAGIC))
+    return read, written + len(index) * INDEX_ENTRY.size + FOOTER.size
+
+
+class SeekableReader:
+    def __init__(self, f):
+        self.f = f
+        magic, codec_id, self.level, self.block_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("not a seekable container")
+        self.codec = Codecs.CODEC_IDS[codec_id]
+        f.seek(-FOOTER.size, os.SEEK_END)
+        index_offset, count, footer_magic = FOOTER.unpack(f.read(FOOTER.size))
+        if footer_magic != FOOTER_MAGIC:
+            raise ValueError("container index is missing (truncated file?)")
+        f.seek(index_offset)
+        raw = f.read(count * INDEX_ENTRY.size)
+        self.blocks = [INDEX_ENTRY.unpack_from(raw, i * INDEX_ENTRY.size) for i in range(count)]
+        self.offsets = [block[0] for block in self.blocks]
+        self.size = self.blocks[-1][0] + self.blocks[-1][3] if self.blocks else 0
+        self.cached = (None, None)
+
+    def read_block(self, i):
+        if self.cached[0] == i:
+            return self.cached[1]
+        _, compressed_offset, compressed_size, size, crc = self.blocks[i]
+        if size > self.block_size:
+            raise ValueError(f"block {i} is corrupt (larger than the block size)")
+        self.f.seek(compressed_offset)
+        parts, total = [], 0
+        # Stop as soon as the output runs past the declared size instead of inflating all of it
+        for output in Codecs.iter_decompress(self.codec.decompressor(), self.f.read(compressed_size), size + 1):
+            total += len(output)
+            if total > size:
+                raise ValueError(f"block {i} is corrupt (inflates beyond its size)")
+            parts.append(output)
+        data = b''.join(parts)
+        if len(data) != size or zlib.crc32(data) != crc:
+            raise ValueError(f"block {i} is corrupt (checksum mismatch)")
+        self.cached = (i, data)
+        return data
+
+    def read_range(self, offset, length):
+        """Uncompressed bytes [offset, offset + length), decompressing only the blocks they span."""
+        end = min(offset + length, self.size)
+        parts = []
+        i = bisect.bisect_right(self.offsets, offset) - 1
+        while 0 <= i < len(self.blocks) and offset < end:
+            start = self.blocks[i][0]
+            data = self.read_block(i)
+            parts.append(data[offset - start:end - start])
+            offset = start + len(data)
+            i += 1
+        return b''.join(parts)
+
+
+def parse_gzip_header(f, offset):
+    """Offset of the deflate data of the gzip member starting at offset."""
+    f.seek(offset)
+    fixed = f.read(10)
+    if len(fixed) != 10 or fixed[:2] != b'\x1f\x8b' or fixed[2] != zlib.DEFLATED:
+        raise ValueError(f"no gzip member at offset {offset}")
+    flags = fixed[3]
+    pos = offset + 10
+    if flags & 0x04:
+        f.seek(pos)
+        pos += 2 + struct.unpack('<H', f.read(2))[0]
+    for flag in (0x08, 0x10):
+        # Zero-terminated original file name and comment
+        if flags & flag:
+            f.seek(pos)
+            while True:
+                chunk = f.read(256)
+                if not chunk:
+                    raise ValueError("truncated gzip header")
+                end = chunk.find(b'\x00')
+                if end >= 0:
+                    pos += end + 1
+                    break
+                pos += len(chunk)
+    if flags & 0x02:
+        pos += 2
+    return pos
+
+
+def _raw_inflate(f, offset, window, size):
+    """Up to size bytes inflated from the raw deflate data at offset, primed with window."""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=window) if window else \
+        zlib.decompressobj(-zlib.MAX_WBITS)
+    f.seek(offset)
+    output = bytearray()
+    while len(output) < size and not decompressor.eof:
+        data = decompressor.unconsumed_tail or f.read(READ_SIZE)
+        if not data:
+            break
+        output += decompressor.decompress(data, size - len(output))
+    return bytes(output)
+
+
+def index_gzip(path, index_path=None, span=SPAN):
+    """Scan a gzip file and write its seek index; returns the number of entry points."""
+    index_path = index_path or path + '.fci'
+    entries = []
+    u = 0
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f, open(path, 'rb') as verify_f:
+        c = 0
+        while c < file_size:
+            data_start = parse_gzip_header(f, c)
+            entries.append((c, u, KIND_MEMBER, b''))
+            last_entry_u = u
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            history = bytearray()
+            pending = None
+            f.seek(data_start)
+            pos = data_start
+            crc = 0
+            while not decompressor.eof:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    raise ValueError("truncated gzip member")
+                # Feed up to and including each sync marker separately, so the output length
+                # right after a marker is the uncompressed offset of that point
+                pieces, start = [], 0
+                while True:
+                    marker = chunk.find(SYNC_MARKER, start)
+                    if marker < 0:
+                        pieces.append(chunk[start:])
+                        break
+                    pieces.append(chunk[start:marker + len(SYNC_MARKER)])
+                    start = marker + len(SYNC_MARKER)
+                for piece in pieces:
+                    if decompressor.eof:
+                        break
+                    output = decompressor.decompress(piece)
+                    crc = zlib.crc32(output, crc)
+                    u += len(output)
+                    pos += len(piece) - len(decompressor.unused_data)
+                    history += output
+                    if pending is not None and u - pending[1] >= VERIFY_SIZE:
+                        expected = bytes(history[len(history) - (u - pending[1]):][:VERIFY_SIZE])
+                        if _raw_inflate(verify_f, pending[0], pending[3], VERIFY_SIZE) == expected:
+                            entries.append(pending)
+                            last_entry_u = pending[1]
+                        pending = None
+                    if pending is None:
+                        del history[:max(len(history) - WINDOW_SIZE, 0)]
+                    if (piece.endswith(SYNC_MARKER) and not decompressor.eof and pending is None
+                            and u - last_entry_u >= span):
+                        pending = (pos, u, KIND_SYNC, bytes(history[-WINDOW_SIZE:]))
+            f.seek(pos)
+            trailer = f.read(8)
+            if len(trailer) != 8 or struct.unpack('<I', trailer[:4])[0] != crc:
+                raise ValueError(f"gzip member at offset {c} fails its CRC check")
+            c = pos + 8
+
+    with open(index_path + '.tmp', 'wb') as out:
+        out.write(GZIP_INDEX_HEADER.pack(GZIP_INDEX_MAGIC, len(entries), u))
+        for c, u_offset, kind, window in entries:
+            window = zlib.compress(window) if window else b''
+            out.write(GZIP_INDEX_ENTRY.pack(c, u_offset, kind, len(window)))
+            out.write(window)
+    os.replace(index_path + '.tmp', index_path)
+    return len(entries)
+
+
+class GzipIndexReader:
+    def __init__(self, f, index_path):
+        self.f = f
+        with open(index_path, 'rb') as idx:
+            magic, count, self.size = GZIP_INDEX_HEADER.unpack(idx.read(GZIP_INDEX_HEADER.size))
+            if magic != GZIP_INDEX_MAGIC:
+                raise ValueError("not a gzip seek index")
+            self.entries = []
+            for _ in range(count):
+                c, u, kind, window_size = GZIP_INDEX_ENTRY.unpack(idx.read(GZIP_INDEX_ENTRY.size))
+                window = zlib.decompress(idx.read(window_size)) if window_size else b''
+                self.entries.append((c, u, kind, window))
+        self.offsets = [entry[1] for entry in self.entries]
+
+    def read_range(self, offset, length):
+        """Uncompressed bytes [offset, offset + length), inflating from the nearest entry point."""
+        end = min(offset + length, self.size)
+        if offset >= end:
+            return b''
+        i = bisect.bisect_right(self.offsets, offset) - 1
+        output = bytearray()
+        skip = offset - self.entries[i][1]
+        while i < len(self.entries) and len(output) < end - offset:
+            c, u, kind, window = self.entries[i]
+            if kind == KIND_MEMBER:
+                c = parse_gzip_header(self.f, c)
+            data = _raw_inflate(self.f, c, window, skip + end - offset - len(output))
+            output += data[skip:]
+            skip = 0
+            # Continue from the next member if this one ended before the range did
+            i = bisect.bisect_right(self.offsets, u + len(data) - 1) if len(data) else len(self.entries)
+            while i < len(self.entries) and self.entries[i][2] != KIND_MEMBER:
+                i += 1
+        return bytes(output[:end - offset])
+
+
+def open_reader(f, path):
+    """A reader with read_range for a container, or for a gzip file with a side index."""
+    magic = f.read(len(MAGIC))
+    f.seek(0)
+    if magic == MAGIC:
+        return SeekableReader(f)
+    if not os.path.exists(path + '.fci'):
+        raise ValueError(f"{path} has no seek index; run: SeekableContainer.py index {path}")
+    return GzipIndexReader(f, path + '.fci')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seekable compressed containers and gzip seek indexes")
+    parser.add_argument("command", choices=["create", "read", "index"])
+    parser.add_argument("path", help="input file (create, index) or file to read from")
+    parser.add_argument("args", nargs="*", help="create: OUTPUT; read: OFFSET LENGTH")
+    parser.add_argument("--codec", default="zlib")
+    parser.add_argument("--level", type=int, default=None)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--span", type=int, default=SPAN, help="index: minimum distance between entry points")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "create":
+            if len(args.args) != 1:
+                parser.error("create needs INPUT OUTPUT")
+            with open_binary(args.path, 'rb') as f_in, open_binary(args.args[0], 'wb') as f_out:
+                read, written = compress_seekable(f_in, f_out, args.codec, args.level, args.block_size)
+            print(f"{read} -> {written} bytes", file=sys.stderr)
+        elif args.command == "index":
+            print(f"Indexed {index_gzip(args.path, span=args.span)} entry points", file=sys.stderr)
+        else:
+            if len(args.args) != 2:
+                parser.error("read needs FILE OFFSET LENGTH")
+            with open(args.path, 'rb') as f:
+                sys.stdout.buffer.write(open_reader(f, args.path).read_range(int(args.args[0]), int(args.args[1])))
+    except (OSError, ValueError, zlib.error) as e:
+        sys.exit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
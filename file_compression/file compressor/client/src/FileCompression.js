@@ -1,38 +1,60 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 
+const POLL_INTERVAL_MS = 1000;
+
 function FileCompression() {
   const [selectedFile, setSelectedFile] = useState(null);
-  const [compressedFileUrl, setCompressedFileUrl] = useState(null);
+  const [job, setJob] = useState(null);
+  const [uploadProgress, setUploadProgress] = useState(0);
+  const [error, setError] = useState(null);
 
   const handleFileChange = (event) => {
     setSelectedFile(event.target.files[0]);
   };
 
   const handleCompress = async () => {
+    if (!selectedFile) {
+      return;
+    }
     const formData = new FormData();
-    formData.append('file', 'test');
-    //formData.append('file', selectedFile);
+    formData.append('file', selectedFile);
 
+    setJob(null);
+    setError(null);
+    setUploadProgress(0);
     try {
-      const response = await axios.post('/compress', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-        responseType: 'blob',
+      // The server only stores the upload and queues a job; compression runs in its worker pool
+      const response = await axios.post('/jobs', formData, {
+        onUploadProgress: (event) => setUploadProgress(event.total ? event.loaded / event.total : 0),
       });
-
-      const url = window.URL.createObjectURL(new Blob([response.data]));
-      setCompressedFileUrl(url);
-
+      setJob({ id: response.data.id, status: 'queued', progress: 0 });
     } catch (error) {
       console.error('Error compressing file:', error);
+      setError('Upload failed');
     }
   };
 
+  useEffect(() => {
+    if (!job || job.status === 'done' || job.status === 'failed') {
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`/jobs/${job.id}`);
+        setJob(response.data);
+      } catch (error) {
+        console.error('Error fetching job status:', error);
+        setError('Lost track of the compression job');
+      }
+    }, POLL_INTERVAL_MS);
+    return () => clearTimeout(timer);
+  }, [job]);
+
   const downloadCompressedFile = () => {
+    // A plain link lets the browser stream the result to disk instead of holding it in memory
     const link = document.createElement('a');
-    link.href = compressedFileUrl;
+    link.href = `/jobs/${job.id}/result`;
     link.download = `${selectedFile.name}.gz`;
     link.click();
   };
@@ -43,9 +65,20 @@ function FileCompression() {
       <input type="file" onChange={handleFileChange} />
       <button onClick={handleCompress}>Compress</button>
 
-      {compressedFileUrl && (
+      {uploadProgress > 0 && !job && <p>Uploading: {Math.round(uploadProgress * 100)}%</p>}
+      {job && job.status === 'queued' && <p>Waiting in queue…</p>}
+      {job && job.status === 'running' && (
+        <p>
+          Compressing: {Math.round(job.progress * 100)}%
+          {job.throughput ? ` (${job.throughput.toFixed(1)} MB/s)` : ''}
+        </p>
+      )}
+      {job && job.status === 'failed' && <p>Compression failed: {job.error}</p>}
+      {error && <p>{error}</p>}
+
+      {job && job.status === 'done' && (
         <>
-          <p>Compressed file ready!</p>
+          <p>Compressed file ready! {job.input_size} → {job.bytes_written} bytes</p>
           <button onClick={downloadCompressedFile}>Download</button>
         </>
       )}
@@ -53,4 +86,4 @@ function FileCompression() {
   );
 }
 
-export default FileCompression;
\ No newline at end of file
+export default FileCompression;
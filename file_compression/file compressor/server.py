@@ -1,29 +1,166 @@
-from flask import Flask, request, send_file
-from io import BytesIO
-import gzip
+import os
+import sys
+import threading
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+
+# The compression helpers live in file_compression/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import CompressionJobs
+from FileCompressor import read_chunks
+from ParallelGzip import iter_compress_parallel
 
 app = Flask(__name__)
+UPLOAD_CHUNK_SIZE = 256 * 1024
+JOBS_DIR = os.environ.get('COMPRESSION_JOBS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs'))
+JOB_WORKERS = int(os.environ.get('COMPRESSION_JOB_WORKERS', 0)) or None
+# Set to 0 when the queue is served by separate `CompressionJobs.py work` processes instead
+EMBEDDED_WORKERS = os.environ.get('COMPRESSION_EMBEDDED_WORKERS', '1') != '0'
+CompressionJobs.init_queue(JOBS_DIR)
+_workers_started = False
+_workers_lock = threading.Lock()
+
+
+@app.before_request
+def ensure_job_workers():
+    """Start the job workers in the process that serves requests, whatever runs the app.
+
+    This works the same under ``python server.py``, ``flask run`` and gunicorn;
+    the debug reloader's file-watching parent never serves a request, so it
+    never starts workers of its own.
+    """
+    global _workers_started
+    if _workers_started or not EMBEDDED_WORKERS:
+        return
+    with _workers_lock:
+        if not _workers_started:
+            CompressionJobs.start_workers(JOBS_DIR, JOB_WORKERS)
+            _workers_started = True
+
+
+class MultipartFileReader:
+    """File-like object over one file field of a multipart body, parsed as it arrives.
+
+    Unlike ``request.files`` nothing is spooled: bytes are pulled from the
+    request stream only as fast as the caller reads them.
+    """
+    def __init__(self, stream, boundary, field='file'):
+        self.stream = stream
+        self.decoder = MultipartDecoder(boundary)
+        self.field = field
+        self.buffer = bytearray()
+        self.in_file = False
+        self.stream_done = False
+
+    def _next_event(self):
+        while True:
+            event = self.decoder.next_event()
+            if not isinstance(event, NeedData):
+                return event
+            if self.stream_done:
+                raise ValueError("upload ended in the middle of the form data")
+            chunk = self.stream.read(UPLOAD_CHUNK_SIZE)
+            self.stream_done = not chunk
+            self.decoder.receive_data(chunk or None)
+
+    def open_file(self):
+        """Advance to the file field; returns its filename, or None if the form has none."""
+        while True:
+            event = self._next_event()
+            if isinstance(event, Epilogue):
+                return None
+            if isinstance(event, File) and event.name == self.field:
+                self.in_file = True
+                return event.filename
+
+    def read(self, size=-1):
+        while self.in_file and (size < 0 or len(self.buffer) < size):
+            event = self._next_event()
+            if isinstance(event, Data):
+                self.buffer += event.data
+                self.in_file = event.more_data
+            else:
+                self.in_file = False
+        size = len(self.buffer) if size < 0 else size
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
 
 @app.route('/compress', methods=['POST'])
 def compress_file():
-    if 'file' not in request.files:
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
         return 'No file part', 400
 
-    file = request.files['file']
-    if file.filename == '':
+    upload = MultipartFileReader(request.stream, boundary.encode('latin-1'))
+    try:
+        filename = upload.open_file()
+    except ValueError as e:
+        return str(e), 400
+    if filename is None:
+        return 'No file part', 400
+    if filename == '':
         return 'No selected file', 400
 
-    file_contents = file.read()
+    # Compress blocks on all cores as the upload arrives and send each one as soon as
+    # it is ready, so memory stays bounded and the download starts right away
+    response = Response(stream_with_context(iter_compress_parallel(upload)), mimetype='application/gzip')
+    response.headers.set('Content-Disposition', 'attachment', filename=f'{filename}.gz')
+    return response
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Save the upload under JOBS_DIR and queue it; compression happens in the worker processes"""
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        return jsonify({'error': 'No file part'}), 400
+    level = request.args.get('level', -1, type=int)
+    if level not in range(-1, 10):
+        return jsonify({'error': 'level must be between -1 and 9'}), 400
+
+    upload = MultipartFileReader(request.stream, boundary.encode('latin-1'))
+    try:
+        filename = upload.open_file()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if filename is None:
+        return jsonify({'error': 'No file part'}), 400
+    if filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    job_id = CompressionJobs.new_job_id()
+    path = CompressionJobs.input_path(JOBS_DIR, job_id)
+    try:
+        with open(path, 'wb') as f_out:
+            for chunk in read_chunks(upload, UPLOAD_CHUNK_SIZE):
+                f_out.write(chunk)
+    except ValueError as e:
+        os.remove(path)
+        return jsonify({'error': str(e)}), 400
+
+    CompressionJobs.submit(JOBS_DIR, job_id, filename, level)
+    return jsonify({'id': job_id, 'status_url': f'/jobs/{job_id}', 'result_url': f'/jobs/{job_id}/result'}), 202
+
 
-    # Compress the file using gzip
-    compressed_data = BytesIO()
-    with gzip.GzipFile(mode='wb', fileobj=compressed_data) as f:
-        f.write(file_contents)
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = CompressionJobs.status(JOBS_DIR, job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
 
-    compressed_data.seek(0)
 
-    return send_file(compressed_data, mimetype='application/gzip', as_attachment=True,
-                     download_name=f'{file.filename}.gz')
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = CompressionJobs.status(JOBS_DIR, job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job['status'] != CompressionJobs.DONE:
+        return jsonify({'error': f"Job is {job['status']}", 'status': job['status']}), 409
+    return send_file(CompressionJobs.output_path(JOBS_DIR, job_id), mimetype='application/gzip',
+                     as_attachment=True, download_name=f"{job['filename']}.gz")
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)